@@ -0,0 +1,189 @@
+# -*- coding: utf-8 -*-
+"""
+Motor de áudio espacial.
+
+Renderiza um som em qualquer azimute usando pan de potência constante,
+atraso interaural (ITD) e atenuação por distância. Todo o processamento é
+feito com NumPy sobre o array inteiro de amostras (ou sobre um lote de
+posições de uma vez), e os buffers prontos ficam num cache LRU limitado em
+bytes, com chave (som, faixa de azimute, faixa de distância).
+
+A renderização deve acontecer no carregamento (pre_renderizar); obter() só
+renderiza na hora quando a posição ainda não está no cache.
+"""
+import math
+from collections import OrderedDict
+
+import numpy as np
+import pygame
+
+TAXA_AMOSTRAGEM = 44100
+
+# Modelo esférico de cabeça (Woodworth): raio em metros e velocidade do som em m/s
+RAIO_CABECA = 0.0875
+VELOCIDADE_SOM = 343.0
+
+# Quantas posições são renderizadas por chamada a renderizar_lote em pre_renderizar
+TAMANHO_LOTE = 16
+
+# Distância em que o som toca com ganho 1.0; mais perto não amplifica
+DISTANCIA_REFERENCIA = 1.0
+
+# Azimutes aproximados das direções fixas do jogo (graus, negativo = esquerda).
+# Em 75 graus o canal oposto fica perto de 0.13, próximo do pan antigo de 0.1.
+AZIMUTES_DIRECOES = {"esquerda": -75.0, "centro": 0.0, "direita": 75.0}
+
+
+def atraso_interaural(azimute_graus, taxa=TAXA_AMOSTRAGEM):
+    """Retorna o atraso interaural em amostras (positivo = ouvido direito atrasado)."""
+    theta = np.radians(np.clip(azimute_graus, -90.0, 90.0))
+    segundos = (RAIO_CABECA / VELOCIDADE_SOM) * (np.sin(theta) + theta)
+    return np.rint(-segundos * taxa).astype(np.int64)
+
+
+def ganhos_potencia_constante(azimute_graus):
+    """Retorna (ganho_esquerdo, ganho_direito) para o pan de potência constante."""
+    posicao = (np.clip(azimute_graus, -90.0, 90.0) + 90.0) / 180.0
+    angulo = posicao * (math.pi / 2)
+    return np.cos(angulo), np.sin(angulo)
+
+
+def atenuacao_distancia(distancia):
+    """Atenuação pelo inverso da distância, limitada a 1.0 perto do ouvinte."""
+    return DISTANCIA_REFERENCIA / np.maximum(np.asarray(distancia, dtype=np.float32), DISTANCIA_REFERENCIA)
+
+
+def renderizar_lote(mono, azimutes, distancias, taxa=TAXA_AMOSTRAGEM):
+    """
+    Renderiza um sinal mono (float32) em várias posições de uma vez.
+    Retorna um array int16 de forma (posicoes, amostras + atraso_maximo, 2).
+    """
+    azimutes = np.atleast_1d(np.asarray(azimutes, dtype=np.float32))
+    distancias = np.broadcast_to(np.asarray(distancias, dtype=np.float32), azimutes.shape)
+
+    ganho_esq, ganho_dir = ganhos_potencia_constante(azimutes)
+    ganho = atenuacao_distancia(distancias)
+    atrasos = atraso_interaural(azimutes, taxa)
+    atraso_max = int(np.abs(atrasos).max()) if atrasos.size else 0
+
+    n = mono.shape[0]
+    saida = np.zeros((azimutes.shape[0], n + atraso_max, 2), dtype=np.float32)
+
+    # Atraso só no ouvido mais distante da fonte
+    atraso_esq = np.maximum(-atrasos, 0)
+    atraso_dir = np.maximum(atrasos, 0)
+
+    # Índices de escrita de cada posição: (posicoes, amostras)
+    base = np.arange(n)
+    linhas = np.arange(azimutes.shape[0])[:, None]
+    saida[linhas, base + atraso_esq[:, None], 0] = mono * (ganho_esq * ganho)[:, None]
+    saida[linhas, base + atraso_dir[:, None], 1] = mono * (ganho_dir * ganho)[:, None]
+
+    np.clip(saida, -32768, 32767, out=saida)
+    return saida.astype(np.int16)
+
+
+def para_mono(amostras):
+    """Converte um array de amostras (mono ou estéreo) para mono float32."""
+    amostras = np.asarray(amostras, dtype=np.float32)
+    if amostras.ndim == 2:
+        return amostras.mean(axis=1)
+    return amostras
+
+
+class MotorEspacial:
+    """Renderizador espacial com cache LRU de buffers limitado em bytes."""
+
+    def __init__(self, limite_bytes=32 * 1024 * 1024, passo_azimute=5.0, passo_distancia=0.5,
+                 taxa=TAXA_AMOSTRAGEM):
+        self.limite_bytes = limite_bytes
+        self.passo_azimute = passo_azimute
+        self.passo_distancia = passo_distancia
+        self.taxa = taxa
+        self.fontes = {}
+        self.originais = {}
+        self.cache = OrderedDict()
+        self.bytes_em_cache = 0
+        self.acertos = 0
+        self.falhas = 0
+        self.despejos = 0
+
+    def registrar(self, chave, som):
+        """Guarda a fonte mono de um Sound (ou array) para renderizações futuras."""
+        if isinstance(som, pygame.mixer.Sound):
+            som = pygame.sndarray.array(som)
+        self.fontes[chave] = para_mono(som)
+
+    def faixas(self, azimute, distancia):
+        """Quantiza a posição para as faixas usadas como chave do cache."""
+        faixa_az = int(round(max(-90.0, min(90.0, azimute)) / self.passo_azimute))
+        faixa_dist = int(round(max(0.0, distancia) / self.passo_distancia))
+        return faixa_az, faixa_dist
+
+    def _guardar(self, chave_cache, buffer):
+        som = pygame.sndarray.make_sound(buffer)
+        tamanho = buffer.nbytes
+        self.cache[chave_cache] = (som, tamanho)
+        self.bytes_em_cache += tamanho
+        while self.bytes_em_cache > self.limite_bytes and len(self.cache) > 1:
+            _, (_, tamanho_antigo) = self.cache.popitem(last=False)
+            self.bytes_em_cache -= tamanho_antigo
+            self.despejos += 1
+        return som
+
+    def pre_renderizar(self, chave, azimutes, distancias=(DISTANCIA_REFERENCIA,)):
+        """Renderiza em lote todas as combinações de azimutes e distâncias ainda fora do cache."""
+        mono = self.fontes[chave]
+        pendentes = []
+        vistas = set()
+        for distancia in distancias:
+            for azimute in azimutes:
+                faixa_az, faixa_dist = self.faixas(azimute, distancia)
+                chave_cache = (chave, faixa_az, faixa_dist)
+                if chave_cache not in self.cache and chave_cache not in vistas:
+                    vistas.add(chave_cache)
+                    pendentes.append((chave_cache, faixa_az * self.passo_azimute, faixa_dist * self.passo_distancia))
+        # Lotes pequenos limitam a memória temporária do array float32
+        for inicio in range(0, len(pendentes), TAMANHO_LOTE):
+            lote = pendentes[inicio:inicio + TAMANHO_LOTE]
+            buffers = renderizar_lote(mono, [p[1] for p in lote], [p[2] for p in lote], self.taxa)
+            for (chave_cache, _, _), buffer in zip(lote, buffers):
+                self._guardar(chave_cache, np.ascontiguousarray(buffer))
+        return len(pendentes)
+
+    def obter(self, chave, azimute, distancia=DISTANCIA_REFERENCIA):
+        """Retorna o Sound da posição pedida, renderizando só se não estiver no cache."""
+        faixa_az, faixa_dist = self.faixas(azimute, distancia)
+        chave_cache = (chave, faixa_az, faixa_dist)
+        item = self.cache.get(chave_cache)
+        if item is not None:
+            self.cache.move_to_end(chave_cache)
+            self.acertos += 1
+            return item[0]
+        self.falhas += 1
+        buffer = renderizar_lote(self.fontes[chave], faixa_az * self.passo_azimute,
+                                 faixa_dist * self.passo_distancia, self.taxa)[0]
+        return self._guardar(chave_cache, buffer)
+
+    def renderizador_direcoes(self):
+        """
+        Retorna uma função (som, direcao) -> Sound para o BancoSonsDirecionais,
+        usando os azimutes de AZIMUTES_DIRECOES. A chave é o id() do Sound, que fica
+        guardado em self.originais para o id não ser reaproveitado por outro objeto.
+        """
+        def renderizar(som, direcao):
+            chave = id(som)
+            if chave not in self.fontes:
+                self.registrar(chave, som)
+                self.originais[chave] = som
+            return self.obter(chave, AZIMUTES_DIRECOES.get(direcao, 0.0))
+        return renderizar
+
+    def estatisticas(self):
+        return {
+            "acertos": self.acertos,
+            "falhas": self.falhas,
+            "despejos": self.despejos,
+            "entradas": len(self.cache),
+            "bytes": self.bytes_em_cache,
+        }
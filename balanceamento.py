@@ -0,0 +1,137 @@
+# -*- coding: utf-8 -*-
+"""
+Varredura de balanceamento das dificuldades.
+
+Para cada dificuldade, monta uma grade de valores em torno do preset
+(tempo_base_entre_obstaculos, aceleracao_por_ponto, min_tempo_obstaculo,
+caixa_probabilidade), simula lotes de partidas Monte Carlo em um pool de
+processos usando todos os núcleos e agrega as distribuições de pontos e de
+sobrevivência com NumPy. O resultado é uma tabela CSV compacta, uma linha
+por ponto da grade.
+
+Uso: python balanceamento.py [--dificuldades 1 2 3 4] [--partidas 2000] [--saida balanceamento.csv]
+"""
+import argparse
+import csv
+import itertools
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from simulacao import DIFICULDADES, TEMPO_MINIMO_OBSTACULO, ConfigDificuldade, JogadorHumano, simular_partida
+
+# Multiplicadores aplicados ao preset para montar a grade
+FATORES_TEMPO_BASE = (0.8, 0.9, 1.0, 1.1, 1.2)
+FATORES_ACELERACAO = (0.6, 0.8, 1.0, 1.2, 1.4)
+MINIMOS_TEMPO = (TEMPO_MINIMO_OBSTACULO, 0.3, 0.5) # Abaixo do primeiro, o mixer perde sons
+FATORES_CAIXA = (0.5, 1.0, 2.0)
+
+# Partidas por tarefa enviada ao pool (lotes grandes diluem o custo de IPC)
+PARTIDAS_POR_TAREFA = 500
+
+# Marcos de sobrevivência, em segundos simulados
+MARCOS_SOBREVIVENCIA = (30, 60, 120, 300)
+
+COLUNAS = (
+    ["dificuldade", "tempo_base", "aceleracao", "min_tempo", "caixa_prob", "partidas",
+     "pontos_media", "pontos_p10", "pontos_p50", "pontos_p90", "nivel_p50", "duracao_p50"]
+    + [f"sobrevive_{m}s" for m in MARCOS_SOBREVIVENCIA]
+)
+
+
+def montar_grade(config):
+    """Retorna a lista de ConfigDificuldade da grade em torno de um preset."""
+    grade = []
+    for f_base, f_acel, minimo, f_caixa in itertools.product(
+            FATORES_TEMPO_BASE, FATORES_ACELERACAO, MINIMOS_TEMPO, FATORES_CAIXA):
+        grade.append(ConfigDificuldade(
+            config.texto,
+            round(config.tempo_base_entre_obstaculos * f_base, 4),
+            round(config.aceleracao_por_ponto * f_acel, 5),
+            minimo,
+            max(1, round(config.caixa_probabilidade * f_caixa)),
+        ))
+    return grade
+
+
+def simular_tarefa(args):
+    """Executada no processo filho: simula um lote e devolve arrays compactos."""
+    indice, config, partidas, semente = args
+    jogador = JogadorHumano()
+    pontos = np.empty(partidas, dtype=np.int32)
+    duracoes = np.empty(partidas, dtype=np.float32)
+    for i in range(partidas):
+        placar = simular_partida(config, jogador, semente + i, max_obstaculos=5000)
+        pontos[i] = placar["pontos"]
+        duracoes[i] = placar["duracao"]
+    return indice, pontos, duracoes
+
+
+def agregar(config, pontos, duracoes):
+    """Resume as distribuições de uma célula da grade em uma linha da tabela."""
+    p10, p50, p90 = np.percentile(pontos, (10, 50, 90))
+    sobrevivencia = (duracoes[:, None] >= np.asarray(MARCOS_SOBREVIVENCIA, dtype=np.float32)).mean(axis=0)
+    linha = [
+        config.texto, config.tempo_base_entre_obstaculos, config.aceleracao_por_ponto,
+        config.min_tempo_obstaculo, config.caixa_probabilidade, int(pontos.size),
+        round(float(pontos.mean()), 2), round(float(p10), 1), round(float(p50), 1), round(float(p90), 1),
+        int(np.median(pontos // 10 + 1)), round(float(np.median(duracoes)), 1),
+    ]
+    return linha + [round(float(s), 4) for s in sobrevivencia]
+
+
+def varrer(niveis, partidas, processos=None, semente=0):
+    """Roda a grade das dificuldades pedidas e retorna as linhas da tabela."""
+    grade = [c for nivel in niveis for c in montar_grade(DIFICULDADES[nivel])]
+
+    tarefas = []
+    for indice, config in enumerate(grade):
+        for inicio in range(0, partidas, PARTIDAS_POR_TAREFA):
+            # A mesma semente em todas as células: as diferenças vêm só dos parâmetros
+            tarefas.append((indice, config, min(PARTIDAS_POR_TAREFA, partidas - inicio), semente + inicio))
+
+    pontos = [[] for _ in grade]
+    duracoes = [[] for _ in grade]
+    with ProcessPoolExecutor(max_workers=processos or os.cpu_count()) as pool:
+        for indice, p, d in pool.map(simular_tarefa, tarefas, chunksize=4):
+            pontos[indice].append(p)
+            duracoes[indice].append(d)
+
+    return [agregar(config, np.concatenate(pontos[i]), np.concatenate(duracoes[i]))
+            for i, config in enumerate(grade)]
+
+
+def salvar_tabela(linhas, caminho):
+    with open(caminho, "w", newline="", encoding="utf-8") as arquivo:
+        escritor = csv.writer(arquivo)
+        escritor.writerow(COLUNAS)
+        escritor.writerows(linhas)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Varredura de balanceamento das dificuldades do Corrida Cega.")
+    parser.add_argument("--dificuldades", type=int, nargs="+", default=sorted(DIFICULDADES), choices=sorted(DIFICULDADES))
+    parser.add_argument("--partidas", type=int, default=2000, help="partidas simuladas por ponto da grade")
+    parser.add_argument("--processos", type=int, default=None, help="padrão: todos os núcleos")
+    parser.add_argument("--semente", type=int, default=0)
+    parser.add_argument("--saida", default="balanceamento.csv")
+    args = parser.parse_args()
+
+    inicio = time.perf_counter()
+    linhas = varrer(args.dificuldades, args.partidas, args.processos, args.semente)
+    salvar_tabela(linhas, args.saida)
+    decorrido = time.perf_counter() - inicio
+
+    total = len(linhas) * args.partidas
+    print(f"{len(linhas)} configurações, {total} partidas em {decorrido:.1f} s ({total / decorrido:.0f} partidas/s). Tabela em {args.saida}")
+
+    # Mostra o preset atual de cada dificuldade para comparação
+    for nivel in args.dificuldades:
+        preset = DIFICULDADES[nivel]
+        for linha in linhas:
+            if linha[0] == preset.texto and tuple(linha[1:5]) == (
+                    preset.tempo_base_entre_obstaculos, preset.aceleracao_por_ponto,
+                    preset.min_tempo_obstaculo, preset.caixa_probabilidade):
+                print(f"Preset {preset.texto}: pontos p50 {linha[8]:.0f}, duração p50 {linha[11]} s, sobrevive 60 s: {linha[13]:.0%}")
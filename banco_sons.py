@@ -0,0 +1,369 @@
+# -*- coding: utf-8 -*-
+"""
+Banco de pistas direcionais pré-renderizadas.
+
+Cada som de obstáculo é convertido uma única vez, no carregamento, para as
+direções "esquerda", "centro" e "direita", e cada pista ganha variantes
+aceleradas (mais curtas e mais agudas) para as faixas de FATORES_VELOCIDADE.
+Durante o jogo, despachar um obstáculo passa a ser apenas uma consulta ao
+dicionário, escolhendo a variante que cabe no intervalo atual entre
+obstáculos, seguida de .play().
+
+Com pan_por_volume, o banco guarda cada pista uma vez só, sem direção, e a
+direção é aplicada na hora de tocar pelo volume esquerdo/direito do canal
+(GANHOS_DIRECAO): nenhuma cópia por direção no banco e nenhuma alocação por
+pista, nem no caminho de conversão (teste de autofalantes).
+"""
+import os
+import random
+import sys
+import time
+
+import pygame
+
+DIRECOES = ("esquerda", "centro", "direita")
+
+# Sons que viram pistas direcionais durante o jogo
+NOMES_PISTAS = ("obstaculos_varios", "centro", "cima", "caixa")
+
+# Quanto do volume sobra no canal oposto à direção do som
+FATOR_REDUCAO_PAN = 0.1
+
+# Volume (esquerdo, direito) do canal por direção: o mesmo pan de panear_amostras
+GANHOS_DIRECAO = {
+    "esquerda": (1.0, FATOR_REDUCAO_PAN),
+    "centro": (1.0, 1.0),
+    "direita": (FATOR_REDUCAO_PAN, 1.0),
+}
+
+# Faixas de velocidade das pistas: 1.0 é o som original; 2.0 dura metade e soa uma oitava acima
+FATORES_VELOCIDADE = (1.0, 1.25, 1.5, 2.0, 2.5)
+
+
+def nome_pista_para_evento(nome_evento):
+    """Converte o nome do evento do jogo para o nome do som no banco."""
+    if nome_evento in ("esquerda", "direita"):
+        return "obstaculos_varios"
+    return nome_evento
+
+
+def panear_amostras(som_array, direcao, fator=FATOR_REDUCAO_PAN):
+    """
+    Aplica o pan fixo do jogo a um array de amostras (mono ou estéreo).
+    Retorna um novo array int16 estéreo.
+    """
+    import numpy as np
+    som_array = som_array.astype(np.float32)
+
+    if som_array.ndim == 1:
+        som_array = np.stack((som_array, som_array), axis=-1)
+
+    if direcao == "esquerda":
+        som_array[:, 1] *= fator
+    elif direcao == "direita":
+        som_array[:, 0] *= fator
+
+    return som_array.astype(np.int16)
+
+
+def acelerar_amostras(som_array, fatores):
+    """
+    Reamostra um array (amostras, canais) para todos os fatores de uma vez
+    (interpolação linear): fator 2.0 deixa o som com metade da duração e uma
+    oitava acima. Retorna uma lista de arrays do mesmo tipo, um por fator.
+    """
+    import numpy as np
+    n = som_array.shape[0]
+    comprimentos = [max(1, int(n / fator)) for fator in fatores]
+    # Posições fracionárias de todas as variantes concatenadas: um único gather vetorizado
+    posicoes = np.concatenate([np.arange(comprimento, dtype=np.float64) * fator
+                               for comprimento, fator in zip(comprimentos, fatores)])
+    base = np.minimum(posicoes.astype(np.int64), n - 1)
+    seguinte = np.minimum(base + 1, n - 1)
+    fracao = (posicoes - base).astype(np.float32)
+    if som_array.ndim > 1:
+        fracao = fracao[:, None]
+    dados = som_array.astype(np.float32)
+    saida = dados[base] + (dados[seguinte] - dados[base]) * fracao
+    saida = np.clip(saida, -32768, 32767).astype(som_array.dtype)
+    return np.split(saida, np.cumsum(comprimentos)[:-1])
+
+
+def variantes_velocidade(som, fatores=FATORES_VELOCIDADE):
+    """Um Sound por fator (o fator 1.0 devolve o próprio som)."""
+    import numpy as np
+    acelerados = [fator for fator in fatores if fator != 1.0]
+    arrays = iter(acelerar_amostras(pygame.sndarray.array(som), acelerados)) if acelerados else iter(())
+    return [som if fator == 1.0 else pygame.sndarray.make_sound(np.ascontiguousarray(next(arrays))) for fator in fatores]
+
+
+def renderizar_direcional(som, direcao):
+    """Cria um novo Sound com o pan da direção pedida (caminho por chamada)."""
+    return pygame.sndarray.make_sound(panear_amostras(pygame.sndarray.array(som), direcao))
+
+
+class BancoSonsDirecionais:
+    """
+    Guarda, por (nome do som, direção), as variantes já paneadas (pistas) e,
+    para cada faixa de velocidade, a duração da mais longa e as variantes aceleradas (faixas).
+    """
+
+    def __init__(self, canais=None, pan_por_volume=False):
+        self.pistas = {}
+        self.faixas = {}
+        self.canais = canais # GerenciadorCanais; sem ele, as pistas tocam em qualquer canal livre
+        # Pan pelo volume do canal: uma cópia por pista, todas as direções apontando para ela
+        self.pan_por_volume = pan_por_volume
+        self.acertos = 0
+        self.falhas = 0
+
+    def construir(self, sons_carregados, nomes=NOMES_PISTAS, direcoes=DIRECOES, renderizador=None,
+                  fatores=FATORES_VELOCIDADE):
+        """
+        Renderiza todas as pistas e suas faixas de velocidade. Deve ser chamado uma
+        vez, após carregar os sons. 'renderizador' é uma função (som, direcao) -> Sound;
+        o padrão é o pan fixo do jogo. Com pan_por_volume (e sem renderizador), as
+        pistas ficam como foram carregadas, uma vez por som.
+        """
+        if renderizador is None:
+            renderizador = renderizar_direcional
+            if self.pan_por_volume:
+                return self._construir_sem_direcao(sons_carregados, nomes, direcoes, fatores)
+        self.pan_por_volume = False # Renderizador próprio (áudio espacial): o pan já está nas amostras
+        # Monta num dicionário novo e troca no fim: pode rodar numa thread de carregamento
+        pistas = {}
+        faixas = {}
+        for nome in nomes:
+            valor = sons_carregados.get(nome)
+            if valor is None:
+                continue
+            originais = [s for s in (valor if isinstance(valor, list) else [valor]) if s is not None]
+            if not originais:
+                continue
+            for direcao in direcoes:
+                variantes = []
+                for som in originais:
+                    try:
+                        variantes.append(renderizador(som, direcao))
+                    except Exception as e:
+                        # print(f"AVISO: Falha ao pré-renderizar '{nome}' para '{direcao}': {e}")
+                        pass
+                if variantes:
+                    pistas[(nome, direcao)] = variantes
+                    try:
+                        por_variante = [variantes_velocidade(som, fatores) for som in variantes]
+                    except Exception as e:
+                        # print(f"AVISO: Falha ao acelerar '{nome}' para '{direcao}': {e}")
+                        por_variante = [[som] for som in variantes]
+                    faixas[(nome, direcao)] = [
+                        (max(sons[i].get_length() for sons in por_variante), [sons[i] for sons in por_variante])
+                        for i in range(len(por_variante[0]))
+                    ]
+        self.faixas = faixas
+        self.pistas = pistas
+        return self
+
+    def _construir_sem_direcao(self, sons_carregados, nomes, direcoes, fatores):
+        """Faixas de velocidade de cada som, uma vez; as chaves de todas as direções compartilham as listas."""
+        pistas = {}
+        faixas = {}
+        for nome in nomes:
+            valor = sons_carregados.get(nome)
+            if valor is None:
+                continue
+            variantes = [s for s in (valor if isinstance(valor, list) else [valor]) if s is not None]
+            if not variantes:
+                continue
+            try:
+                por_variante = [variantes_velocidade(som, fatores) for som in variantes]
+            except Exception as e:
+                # print(f"AVISO: Falha ao acelerar '{nome}': {e}")
+                por_variante = [[som] for som in variantes]
+            faixas_nome = [
+                (max(sons[i].get_length() for sons in por_variante), [sons[i] for sons in por_variante])
+                for i in range(len(por_variante[0]))
+            ]
+            for direcao in direcoes:
+                pistas[(nome, direcao)] = variantes
+                faixas[(nome, direcao)] = faixas_nome
+        self.faixas = faixas
+        self.pistas = pistas
+        return self
+
+    def obter(self, nome_evento, direcao, intervalo=None):
+        """
+        Retorna um Sound pronto para tocar, ou None se não houver pista no banco.
+        Com 'intervalo' (segundos até o próximo obstáculo), escolhe a faixa de velocidade
+        mais lenta cuja pista cabe nele; se nenhuma couber, a mais rápida.
+        """
+        if direcao not in DIRECOES:
+            direcao = "centro" # "cima" e "caixa" tocam sem pan, como no centro
+        chave = (nome_pista_para_evento(nome_evento), direcao)
+        if intervalo is None:
+            variantes = self.pistas.get(chave)
+        else:
+            variantes = None
+            for duracao, variantes in self.faixas.get(chave, ()):
+                if duracao <= intervalo:
+                    break
+        if not variantes:
+            self.falhas += 1
+            return None
+        self.acertos += 1
+        if len(variantes) == 1:
+            return variantes[0]
+        return random.choice(variantes)
+
+    def tocar(self, nome_evento, direcao, intervalo=None):
+        """Toca a pista pré-renderizada. Retorna False se ela não estiver no banco."""
+        som = self.obter(nome_evento, direcao, intervalo)
+        if som is None:
+            return False
+        self.reproduzir(som, nome_evento, direcao if self.pan_por_volume else None)
+        return True
+
+    def reproduzir(self, som, nome=None, direcao=None):
+        """
+        Toca no grupo de canais das pistas (ou em qualquer canal livre, sem gerenciador).
+        Com 'direcao', o pan é aplicado pelo volume do canal, sem copiar o som.
+        """
+        volume = GANHOS_DIRECAO.get(direcao, GANHOS_DIRECAO["centro"]) if direcao is not None else None
+        if self.canais is not None:
+            return self.canais.tocar("pista", som, nome=nome, volume=volume)
+        canal = som.play()
+        if canal is not None and volume is not None:
+            canal.set_volume(*volume) # Sem gerenciador o canal só é conhecido depois do play
+        return canal
+
+    def contadores(self):
+        return {"acertos": self.acertos, "falhas": self.falhas, "pistas": len(self.pistas)}
+
+    def zerar_contadores(self):
+        self.acertos = 0
+        self.falhas = 0
+
+
+def medir_latencia_despacho(banco, sons_carregados, repeticoes=200):
+    """
+    Compara o tempo de despacho do banco com a conversão NumPy feita a cada
+    chamada (comportamento anterior de tocar_som_direcional).
+    Retorna um dicionário com as médias e medianas em milissegundos.
+    """
+    import numpy as np
+    eventos = [("esquerda", "esquerda"), ("direita", "direita"), ("centro", "centro"),
+               ("cima", "cima"), ("caixa", "caixa")]
+
+    def por_chamada(nome_evento, direcao):
+        valor = sons_carregados.get(nome_pista_para_evento(nome_evento))
+        originais = [s for s in (valor if isinstance(valor, list) else [valor]) if s is not None]
+        banco.reproduzir(renderizar_direcional(random.choice(originais), direcao), nome_evento)
+
+    resultados = {}
+    for rotulo, funcao in (("por_chamada", por_chamada), ("banco", banco.tocar)):
+        tempos = np.empty(repeticoes * len(eventos), dtype=np.float64)
+        i = 0
+        for _ in range(repeticoes):
+            for nome_evento, direcao in eventos:
+                inicio = time.perf_counter()
+                funcao(nome_evento, direcao)
+                tempos[i] = time.perf_counter() - inicio
+                i += 1
+        pygame.mixer.stop()
+        resultados[rotulo] = {
+            "media_ms": float(tempos.mean() * 1000),
+            "mediana_ms": float(np.median(tempos) * 1000),
+            "p99_ms": float(np.percentile(tempos, 99) * 1000),
+        }
+    resultados["ganho_mediana"] = resultados["por_chamada"]["mediana_ms"] / max(resultados["banco"]["mediana_ms"], 1e-9)
+    return resultados
+
+
+def memoria_banco(banco):
+    """Bytes de amostras guardados no banco (cada Sound contado uma vez)."""
+    vistos = {}
+    for faixas in banco.faixas.values():
+        for _, variantes in faixas:
+            for som in variantes:
+                vistos[id(som)] = som
+    return sum(len(som.get_raw()) for som in vistos.values())
+
+
+def comparar_pan(sons_carregados, canais=None, repeticoes=200):
+    """
+    Compara o pan copiado nas amostras (conversão por chamada e banco com uma
+    cópia por direção) com o pan no volume do canal (banco com uma cópia por
+    som, e o som avulso do teste de autofalantes). Mede o tempo de despacho, a
+    memória alocada em cada despacho (pico do tracemalloc, que vê os arrays do
+    NumPy) e a memória de amostras de cada banco.
+    """
+    import numpy as np
+    import tracemalloc
+    por_direcao = BancoSonsDirecionais(canais).construir(sons_carregados)
+    por_volume = BancoSonsDirecionais(canais, pan_por_volume=True).construir(sons_carregados)
+    eventos = [("esquerda", "esquerda"), ("direita", "direita"), ("centro", "centro"),
+               ("cima", "cima"), ("caixa", "caixa")]
+    som_teste = sons_carregados.get("centro")
+
+    def conversao(nome_evento, direcao):
+        por_direcao.reproduzir(renderizar_direcional(som_teste, direcao), nome_evento)
+
+    def avulso_volume(nome_evento, direcao):
+        por_volume.reproduzir(som_teste, nome_evento, direcao)
+
+    caminhos = (("conversao", conversao), ("banco_direcoes", lambda e, d: por_direcao.tocar(e, d, 0.5)),
+                ("banco_volume", lambda e, d: por_volume.tocar(e, d, 0.5)), ("avulso_volume", avulso_volume))
+    resultados = {}
+    for rotulo, funcao in caminhos:
+        tempos = np.empty(repeticoes * len(eventos), dtype=np.float64)
+        i = 0
+        for _ in range(repeticoes):
+            for nome_evento, direcao in eventos:
+                inicio = time.perf_counter()
+                funcao(nome_evento, direcao)
+                tempos[i] = time.perf_counter() - inicio
+                i += 1
+        # Alocação numa segunda passada: o tracemalloc deixaria a primeira mais lenta
+        tracemalloc.start()
+        alocado = 0
+        for nome_evento, direcao in eventos * 10:
+            antes = tracemalloc.get_traced_memory()[0]
+            tracemalloc.reset_peak()
+            funcao(nome_evento, direcao)
+            alocado += tracemalloc.get_traced_memory()[1] - antes
+        tracemalloc.stop()
+        pygame.mixer.stop()
+        resultados[rotulo] = {"mediana_us": float(np.median(tempos) * 1e6),
+                              "p99_us": float(np.percentile(tempos, 99) * 1e6),
+                              "alocado_bytes": alocado / (len(eventos) * 10)}
+    resultados["memoria_direcoes"] = memoria_banco(por_direcao)
+    resultados["memoria_volume"] = memoria_banco(por_volume)
+    return resultados
+
+
+if __name__ == "__main__":
+    # Benchmark: python banco_sons.py [repeticoes] [--pan]
+    os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+    os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+    os.chdir(os.path.dirname(os.path.abspath(__file__)))
+    import play
+    play.inicializar(com_fala=False)
+    play.futuro_banco_sons.result() # Espera o carregamento em segundo plano
+
+    argumentos = [a for a in sys.argv[1:] if not a.startswith("--")]
+    repeticoes = int(argumentos[0]) if argumentos else 200
+    if "--pan" in sys.argv:
+        resultado = comparar_pan(play.loaded_sounds, play.canais, repeticoes)
+        for rotulo in ("conversao", "banco_direcoes", "banco_volume", "avulso_volume"):
+            r = resultado[rotulo]
+            print(f"{rotulo:15s} mediana {r['mediana_us']:8.1f} us  p99 {r['p99_us']:8.1f} us  alocado {r['alocado_bytes']:10.0f} bytes por despacho")
+        print(f"Amostras no banco: uma cópia por direção {resultado['memoria_direcoes'] / 2 ** 20:.2f} MiB, "
+              f"pan no canal {resultado['memoria_volume'] / 2 ** 20:.2f} MiB")
+        pygame.quit()
+        sys.exit(0)
+    resultado = medir_latencia_despacho(play.banco_sons, play.loaded_sounds, repeticoes)
+    for rotulo in ("por_chamada", "banco"):
+        r = resultado[rotulo]
+        print(f"{rotulo:12s} média {r['media_ms']:.4f} ms  mediana {r['mediana_ms']:.4f} ms  p99 {r['p99_ms']:.4f} ms")
+    print(f"Ganho (mediana): {resultado['ganho_mediana']:.1f}x")
+    print(f"Contadores do banco: {play.banco_sons.contadores()}")
+    pygame.quit()
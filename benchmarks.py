@@ -0,0 +1,211 @@
+# -*- coding: utf-8 -*-
+"""
+Microbenchmarks dos caminhos quentes de áudio e do loop do jogo.
+
+Roda no Linux com os drivers dummy do SDL (vídeo e áudio; use
+SDL_AUDIODRIVER=disk para exercitar a mixagem de verdade). Cada benchmark
+guarda a mediana, em microssegundos, de várias repetições. Os resultados
+podem ser salvos como baseline JSON e, nas execuções seguintes, comparados
+com ela: o script sai com código 1 se algum benchmark ficar mais lento que
+a baseline além do limite configurado.
+
+Uso:
+    python benchmarks.py --salvar-baseline
+    python benchmarks.py [--limite 0.5] [--baseline benchmarks_baseline.json]
+"""
+import argparse
+import gc
+import json
+import os
+import platform
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+
+import pygame
+
+import play
+from pacote_sons import abrir_pacote, construir_pacote, fontes_do_pacote
+from simulacao import ACAO_CERTA
+
+BASELINE_PADRAO = "benchmarks_baseline.json"
+LIMITE_PADRAO = 0.5 # 50% mais lento que a baseline conta como regressão
+RODADAS = 5
+
+# Tamanho das rajadas de eventos sintéticos para get_all_pygame_events
+TAMANHOS_RAJADA = (10, 100, 1000)
+
+EVENTOS_OBSTACULO = ("esquerda", "direita", "centro", "cima", "caixa")
+
+# Os benchmarks de reprodução param o mixer antes de cada repetição (fora do tempo
+# medido), para que todo .play() encontre um canal livre e o resultado não dependa
+# de quantos sons ainda estavam tocando.
+
+
+def preparar():
+    """Drivers dummy, pasta do jogo e o jogo inicializado sem voz, com os sons carregados."""
+    os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+    os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+    os.chdir(os.path.dirname(os.path.abspath(__file__)))
+    play.inicializar(com_fala=False)
+    play.futuro_banco_sons.result() # Espera o carregamento em segundo plano
+
+
+def medir(funcao, repeticoes, preparar=None, rodadas=RODADAS):
+    """
+    Executa a função 'repeticoes' vezes por rodada e retorna a menor mediana
+    entre as rodadas, em microssegundos (a menor mediana filtra o ruído da máquina).
+    """
+    medianas = []
+    gc.disable() # Coletas do GC no meio da medição viram ruído
+    try:
+        for _ in range(rodadas):
+            tempos = []
+            for _ in range(repeticoes):
+                if preparar is not None:
+                    preparar()
+                inicio = time.perf_counter()
+                funcao()
+                tempos.append(time.perf_counter() - inicio)
+            medianas.append(statistics.median(tempos))
+    finally:
+        gc.enable()
+    return min(medianas) * 1e6
+
+
+def bench_carregamento_sons(extensao=".wav", repeticoes=10):
+    """Decodifica os arquivos com a extensão pedida (os MP3 são os jingles; a música fica em streaming)."""
+    caminhos = [caminho for caminho in fontes_do_pacote(play.sons_paths) if caminho.endswith(extensao)]
+
+    def carregar():
+        for caminho in caminhos:
+            pygame.mixer.Sound(os.path.join(os.getcwd(), caminho))
+    return medir(carregar, repeticoes)
+
+
+def bench_carregamento_pacote():
+    """
+    O caminho que o jogo usa desde o pacote de sons: abrir_pacote (mmap e o
+    hash das fontes) e um Sound de cada fatia, sobre um pacote montado numa pasta temporária.
+    """
+    caminhos = fontes_do_pacote(play.sons_paths)
+    pasta = tempfile.mkdtemp(prefix="bench_pacote_")
+    arquivo = construir_pacote(caminhos, os.path.join(pasta, "sons.ccpk"))
+
+    def carregar():
+        pacote = abrir_pacote(caminhos, arquivo)
+        sons = [pacote.som(caminho) for caminho in caminhos]
+        del sons
+        pacote.fechar()
+    try:
+        return medir(carregar, 10)
+    finally:
+        shutil.rmtree(pasta, ignore_errors=True)
+
+
+def bench_tocar_som_direcional():
+    indice = [0]
+
+    def despachar():
+        evento = EVENTOS_OBSTACULO[indice[0] % len(EVENTOS_OBSTACULO)]
+        indice[0] += 1
+        play.tocar_som_direcional(evento, evento)
+    return medir(despachar, 500, preparar=pygame.mixer.stop)
+
+
+def bench_tocar_som():
+    return medir(lambda: play.tocar_som("desviou"), 500, preparar=pygame.mixer.stop)
+
+
+def bench_iteracao_loop():
+    """
+    Uma volta do loop principal com obstáculo: coleta de eventos, sorteio no
+    motor, pista direcional, resolução, telemetria e som de resposta.
+    """
+    config = play.config_dificuldade(4)
+    motor = play.MotorJogo(config, semente=1, janela_reacao=play.tempo_janela_reacao)
+    registro = play.RegistroLatencias()
+
+    def iteracao():
+        play.get_all_pygame_events()
+        motor.ultimo_tempo_evento = -1e9 # Força o obstáculo a estar devido
+        if motor.obstaculo_devido():
+            obstaculo = motor.gerar_obstaculo()
+            play.tocar_som_direcional(obstaculo.tipo, obstaculo.tipo)
+            resultado = motor.resolver(obstaculo, ACAO_CERTA[obstaculo.tipo], 0.3)
+            registro.registrar(obstaculo.tipo, config.texto, 0.3, resultado.desviou, 0.0)
+            play.tocar_som("desviou")
+            motor.colisoes = 0
+    return medir(iteracao, 500, preparar=pygame.mixer.stop)
+
+
+def bench_eventos_rajada(tamanho):
+    teclas = list(play.TECLAS_ACOES)
+
+    def postar():
+        pygame.event.clear()
+        for i in range(tamanho):
+            pygame.event.post(pygame.event.Event(pygame.KEYDOWN, key=teclas[i % len(teclas)], unicode=""))
+    return medir(play.get_all_pygame_events, 200, preparar=postar)
+
+
+def rodar_benchmarks():
+    resultados = {
+        "carregamento_sons_wav": bench_carregamento_sons(".wav"),
+        "carregamento_sons_mp3": bench_carregamento_sons(".mp3", repeticoes=3),
+        "carregamento_pacote": bench_carregamento_pacote(),
+        "tocar_som_direcional": bench_tocar_som_direcional(),
+        "tocar_som": bench_tocar_som(),
+        "iteracao_loop": bench_iteracao_loop(),
+    }
+    for tamanho in TAMANHOS_RAJADA:
+        resultados[f"get_all_pygame_events_{tamanho}"] = bench_eventos_rajada(tamanho)
+    play.jogo_encerrar = False # As rajadas não têm Escape, mas garante o estado
+    return resultados
+
+
+def comparar(resultados, baseline, limite):
+    """Retorna a lista de (nome, atual, base, variação) que passaram do limite."""
+    regressoes = []
+    for nome, atual in resultados.items():
+        base = baseline.get(nome)
+        if base is None or base <= 0:
+            continue
+        variacao = atual / base - 1
+        if variacao > limite:
+            regressoes.append((nome, atual, base, variacao))
+    return regressoes
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Microbenchmarks do Corrida Cega.")
+    parser.add_argument("--baseline", default=BASELINE_PADRAO)
+    parser.add_argument("--salvar-baseline", action="store_true", help="grava os resultados atuais como baseline")
+    parser.add_argument("--limite", type=float, default=LIMITE_PADRAO, help="regressão tolerada (0.5 = 50%%)")
+    args = parser.parse_args()
+
+    preparar()
+    resultados = rodar_benchmarks()
+    for nome, valor in resultados.items():
+        print(f"{nome:32s} {valor:12.2f} us")
+
+    if args.salvar_baseline:
+        with open(args.baseline, "w", encoding="utf-8") as arquivo:
+            json.dump({"maquina": platform.node(), "python": platform.python_version(),
+                       "pygame": pygame.version.ver, "resultados": resultados}, arquivo, indent=2)
+        print(f"Baseline salva em {args.baseline}")
+        sys.exit(0)
+
+    if not os.path.exists(args.baseline):
+        print(f"Sem baseline em {args.baseline}; rode com --salvar-baseline primeiro.")
+        sys.exit(0)
+
+    with open(args.baseline, encoding="utf-8") as arquivo:
+        baseline = json.load(arquivo)["resultados"]
+    regressoes = comparar(resultados, baseline, args.limite)
+    for nome, atual, base, variacao in regressoes:
+        print(f"REGRESSÃO {nome}: {atual:.2f} us contra {base:.2f} us na baseline (+{variacao:.0%})")
+    pygame.quit()
+    sys.exit(1 if regressoes else 0)
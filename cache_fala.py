@@ -0,0 +1,85 @@
+# -*- coding: utf-8 -*-
+"""
+Cache em disco de frases fixas já sintetizadas.
+
+As frases que o jogo repete sempre (opções dos menus, "Nível N", contagem de
+vidas, "Vamos lá!") são gravadas em WAV pelo próprio backend de fala, uma
+vez, e depois tocadas pelo mixer em vez de sintetizadas de novo. O nome do
+arquivo é o hash do texto, da voz e da taxa de fala: trocar de voz ou de
+taxa gera outro conjunto de arquivos. Textos livres (como a pontuação final)
+não estão no cache e continuam indo para a síntese ao vivo.
+"""
+import hashlib
+import os
+import threading
+
+from canais import PRIORIDADE_CRITICA
+from carregador_sons import carregar_som
+
+PASTA_CACHE = "cache_fala"
+
+
+def chave_frase(texto, voz, taxa):
+    return hashlib.sha1(f"{voz}\n{taxa}\n{texto}".encode("utf-8")).hexdigest()
+
+
+class CacheFrases:
+    """Frases pré-renderizadas: arquivos em 'pasta' e os Sounds já carregados em memória."""
+
+    def __init__(self, voz, taxa, pasta=PASTA_CACHE, canais=None):
+        self.voz = voz
+        self.taxa = taxa
+        self.pasta = pasta
+        self.canais = canais # GerenciadorCanais: a fala usa o seu próprio grupo de canais
+        self.sons = {}
+        self.lock = threading.Lock()
+        os.makedirs(pasta, exist_ok=True)
+
+    def caminho(self, texto):
+        return os.path.join(self.pasta, chave_frase(texto, self.voz, self.taxa) + ".wav")
+
+    def obter(self, texto):
+        """Sound da frase, se ela já foi renderizada; None caso contrário."""
+        with self.lock:
+            som = self.sons.get(texto)
+        if som is None and os.path.exists(self.caminho(texto)):
+            som = carregar_som(self.caminho(texto))
+            if som is not None:
+                with self.lock:
+                    self.sons[texto] = som
+        return som
+
+    def renderizar(self, backend, texto):
+        """
+        Grava a frase com o backend (se ainda não estiver em disco) e a carrega
+        na memória. Roda na thread de fala, dona do motor de síntese.
+        """
+        destino = self.caminho(texto)
+        if not os.path.exists(destino):
+            salvar = getattr(backend, "salvar", None)
+            if salvar is None:
+                return False # Backend sem síntese para arquivo (nulo): só fala ao vivo
+            temporario = destino + ".tmp.wav"
+            try:
+                if not salvar(texto, temporario) or not os.path.getsize(temporario):
+                    return False
+                os.replace(temporario, destino)
+            except OSError as e:
+                # print(f"AVISO: Falha ao gravar a frase '{texto}' no cache: {e}")
+                return False
+        return self.obter(texto) is not None
+
+    def tocar(self, texto, interrupcao):
+        """
+        Toca a frase pelo mixer e espera ela terminar ou 'interrupcao' ser ligada.
+        Retorna False se a frase não estiver no cache (ou não houver canal livre).
+        """
+        som = self.obter(texto)
+        if som is None:
+            return False
+        canal = self.canais.tocar("fala", som, PRIORIDADE_CRITICA, texto) if self.canais is not None else som.play()
+        if canal is None:
+            return False
+        if interrupcao.wait(som.get_length()):
+            canal.stop()
+        return True
@@ -0,0 +1,281 @@
+# -*- coding: utf-8 -*-
+"""
+Calibração da saída de áudio, guardada por computador em calibracao.json.
+
+Duas medidas:
+- Menor buffer estável do mixer: para cada tamanho de TAMANHOS_BUFFER, do
+  menor para o maior, o mixer é reaberto e um clipe curto é tocado várias
+  vezes num canal com evento de fim. O evento é postado pela thread de
+  áudio do SDL quando o clipe acaba de ser mixado, então cada clipe mede o
+  ritmo real da thread de áudio; com o loop ocupado (CARGA_QUADRO por
+  clipe, como um quadro pesado do jogo), um buffer pequeno demais faz os
+  fins chegarem atrasados. O tamanho é estável se no máximo
+  FRACAO_ATRASOS_MAX dos clipes atrasam mais que um período do buffer
+  (mais TOLERANCIA_ATRASO) em relação à mediana.
+- Latência da saída, por toque: um clique a cada PERIODO_TOQUE segundos e
+  o jogador aperta espaço junto com cada clique que ouve. A mediana de
+  (tecla - disparo do clique), sem os primeiros toques (o jogador ainda
+  pegando o ritmo), é o atraso entre o jogo mandar tocar e o jogador
+  ouvir. Quem toca junto com um ritmo tende a se adiantar um pouco, então
+  a medida tende a ficar abaixo da latência real, nunca acima.
+
+A janela de reação do jogo é somada da latência medida (até LATENCIA_MAXIMA),
+para quem tem uma saída lenta (Bluetooth, por exemplo) não ser punido por ela.
+
+Testável com os drivers dummy ou disk do SDL: --simular-latencia posta as
+teclas do toque com o atraso dado, e a medida tem que bater com ele.
+
+Uso: python calibracao.py [--simular-latencia SEGUNDOS] [--salvar]
+"""
+import json
+import os
+import random
+import statistics
+import sys
+import threading
+import time
+from datetime import datetime
+
+import pygame
+
+from placar import nome_computador
+
+ARQUIVO_CALIBRACAO = "calibracao.json"
+
+BUFFER_PADRAO = 512
+TAMANHOS_BUFFER = (128, 256, 512, 1024, 2048)
+
+# Teste do buffer: clipes por tamanho, duração do clipe e trabalho do loop a cada clipe
+CLIPES_POR_BUFFER = 30
+DURACAO_CLIPE = 0.08
+CARGA_QUADRO = 0.01
+TOLERANCIA_ATRASO = 0.005
+FRACAO_ATRASOS_MAX = 0.1
+
+# Teste de toque: cliques, intervalo entre eles e quantos toques iniciais são descartados
+TOQUES = 16
+PERIODO_TOQUE = 0.75
+TOQUES_DESCARTADOS = 4
+TOQUES_MINIMOS = 6
+DISPERSAO_MAXIMA = 0.06 # Desvio absoluto mediano acima disso: toques fora do ritmo, medida descartada
+
+# Limite da compensação da janela de reação
+LATENCIA_MAXIMA = 0.3
+
+EVENTO_FIM_CLIPE = pygame.USEREVENT + 5
+EVENTO_TOQUE_SIMULADO = pygame.USEREVENT + 6
+
+
+def carregar_calibracao(caminho=ARQUIVO_CALIBRACAO, computador=None):
+    """Calibração deste computador ({} se não houver)."""
+    try:
+        with open(caminho, "r", encoding="utf-8") as arquivo:
+            dados = json.load(arquivo)
+    except (OSError, ValueError):
+        return {}
+    calibracao = dados.get(computador or nome_computador(), {})
+    return calibracao if isinstance(calibracao, dict) else {}
+
+
+def salvar_calibracao(calibracao, caminho=ARQUIVO_CALIBRACAO, computador=None):
+    """Grava a calibração deste computador sem mexer na dos outros."""
+    try:
+        with open(caminho, "r", encoding="utf-8") as arquivo:
+            dados = json.load(arquivo)
+    except (OSError, ValueError):
+        dados = {}
+    dados[computador or nome_computador()] = dict(calibracao, data=datetime.now().isoformat(timespec="seconds"))
+    temporario = caminho + ".tmp"
+    with open(temporario, "w", encoding="utf-8") as arquivo:
+        json.dump(dados, arquivo, indent=2, ensure_ascii=False)
+    os.replace(temporario, caminho)
+
+
+def buffer_calibrado(calibracao):
+    return int(calibracao.get("buffer", BUFFER_PADRAO))
+
+
+def janela_compensada(janela, calibracao):
+    """Janela de reação somada da latência de saída medida (limitada a LATENCIA_MAXIMA)."""
+    latencia = calibracao.get("latencia")
+    if not latencia or latencia < 0:
+        return janela
+    return janela + min(latencia, LATENCIA_MAXIMA)
+
+
+def gerar_clique(duracao=0.03, frequencia_tom=1000.0, volume=0.6):
+    """Clique curto (tom com decaimento) no formato atual do mixer."""
+    import numpy as np
+    frequencia, _, canais = pygame.mixer.get_init()
+    t = np.arange(int(frequencia * duracao)) / frequencia
+    onda = np.sin(2 * np.pi * frequencia_tom * t) * np.exp(-t / (duracao / 4)) * volume * 32767
+    amostras = onda.astype(np.int16)
+    if canais > 1:
+        amostras = np.repeat(amostras[:, None], canais, axis=1)
+    return pygame.sndarray.make_sound(np.ascontiguousarray(amostras))
+
+
+def gerar_silencio(duracao=DURACAO_CLIPE):
+    """Clipe silencioso no formato atual do mixer (o teste do buffer não precisa ser ouvido)."""
+    frequencia, tamanho, canais = pygame.mixer.get_init()
+    return pygame.mixer.Sound(buffer=bytes(int(frequencia * duracao) * canais * (abs(tamanho) // 8)))
+
+
+def _cancelado():
+    """Escape ou fechar a janela interrompem a calibração. Só lê esses eventos da fila."""
+    for evento in pygame.event.get(eventtype=[pygame.QUIT, pygame.KEYDOWN]):
+        if evento.type == pygame.QUIT or evento.key == pygame.K_ESCAPE:
+            return True
+    return False
+
+
+def medir_buffer(canal, som, clipes=CLIPES_POR_BUFFER, carga=CARGA_QUADRO):
+    """
+    Toca 'som' 'clipes' vezes em 'canal' e mede, pelo evento de fim do canal,
+    quanto cada um levou. Retorna a lista de durações (s) ou None se cancelado.
+    """
+    canal.set_endevent(EVENTO_FIM_CLIPE)
+    duracoes = []
+    try:
+        pygame.event.clear(EVENTO_FIM_CLIPE)
+        for _ in range(clipes):
+            inicio = time.perf_counter()
+            canal.play(som)
+            # Trabalho do loop principal enquanto a thread de áudio mixa
+            while time.perf_counter() - inicio < carga:
+                pass
+            limite = inicio + som.get_length() * 4 + 0.5
+            while not pygame.event.get(eventtype=EVENTO_FIM_CLIPE):
+                if time.perf_counter() > limite:
+                    break # Fim perdido: conta como atraso
+                time.sleep(0.0005)
+            duracoes.append(time.perf_counter() - inicio)
+            if _cancelado():
+                return None
+    finally:
+        canal.set_endevent()
+    return duracoes
+
+
+def avaliar_buffer(duracoes, buffer, frequencia):
+    """Retorna {"buffer", "mediana", "atrasos", "estavel"} de uma série de medir_buffer."""
+    periodo = buffer / frequencia
+    mediana = statistics.median(duracoes)
+    atrasos = sum(1 for duracao in duracoes if duracao - mediana > periodo + TOLERANCIA_ATRASO)
+    return {"buffer": buffer, "mediana": mediana, "atrasos": atrasos,
+            "estavel": atrasos <= FRACAO_ATRASOS_MAX * len(duracoes)}
+
+
+def menor_buffer_estavel(reabrir_mixer, obter_canal, tamanhos=TAMANHOS_BUFFER, clipes=CLIPES_POR_BUFFER):
+    """
+    Reabre o mixer com cada tamanho (reabrir_mixer(buffer)) e mede a
+    estabilidade. Para no primeiro estável; se nenhum for, fica o maior.
+    Retorna (buffer, resultados) ou (None, resultados) se cancelado. O mixer
+    fica aberto com o buffer escolhido.
+    """
+    resultados = []
+    for buffer in tamanhos:
+        reabrir_mixer(buffer)
+        duracoes = medir_buffer(obter_canal(), gerar_silencio(), clipes)
+        if duracoes is None:
+            return None, resultados
+        resultado = avaliar_buffer(duracoes, buffer, pygame.mixer.get_init()[0])
+        resultados.append(resultado)
+        if resultado["estavel"]:
+            return buffer, resultados
+    return tamanhos[-1], resultados
+
+
+def _simular_toques(cliques, latencia, parar, rng):
+    """Posta um 'espaço' por clique, 'latencia' segundos depois dele (com um pouco de variação humana)."""
+    for instante in cliques:
+        alvo = instante + latencia + rng.gauss(0.0, 0.01)
+        while not parar.is_set() and time.perf_counter() < alvo:
+            time.sleep(0.0005)
+        if parar.is_set():
+            return
+        pygame.event.post(pygame.event.Event(pygame.KEYDOWN, key=pygame.K_SPACE, unicode=" ", mod=0, scancode=0))
+
+
+def medir_latencia_toque(canal, som, toques=TOQUES, periodo=PERIODO_TOQUE, simular=None):
+    """
+    Toca 'toques' cliques e casa cada espaço com o clique mais próximo.
+    Retorna {"latencia", "dispersao", "toques", "valida"} ou None se cancelado.
+    Com simular=segundos, as teclas são postadas por uma thread com esse atraso.
+    """
+    inicio = time.perf_counter() + 0.5
+    cliques = [inicio + i * periodo for i in range(toques)]
+    parar = threading.Event()
+    if simular is not None:
+        threading.Thread(target=_simular_toques, args=(cliques, simular, parar, random.Random(1)),
+                         name="toque simulado", daemon=True).start()
+    diferencas = []
+    proximo = 0
+    fim = cliques[-1] + periodo
+    pygame.event.clear(pygame.KEYDOWN)
+    try:
+        while time.perf_counter() < fim:
+            if proximo < toques and time.perf_counter() >= cliques[proximo]:
+                canal.play(som)
+                cliques[proximo] = time.perf_counter() # Instante real do disparo
+                proximo += 1
+            for evento in pygame.event.get(eventtype=[pygame.QUIT, pygame.KEYDOWN]):
+                if evento.type == pygame.QUIT or evento.key == pygame.K_ESCAPE:
+                    return None
+                if evento.key == pygame.K_SPACE and proximo:
+                    agora = time.perf_counter()
+                    clique = min(cliques[:proximo], key=lambda instante: abs(agora - instante))
+                    diferencas.append((cliques.index(clique), agora - clique))
+            time.sleep(0.0005)
+    finally:
+        parar.set()
+
+    # Um toque por clique (o primeiro), sem os iniciais
+    por_clique = {}
+    for indice, diferenca in diferencas:
+        por_clique.setdefault(indice, diferenca)
+    validas = [diferenca for indice, diferenca in sorted(por_clique.items()) if indice >= TOQUES_DESCARTADOS]
+    if len(validas) < TOQUES_MINIMOS:
+        return {"latencia": None, "dispersao": None, "toques": len(validas), "valida": False}
+    latencia = statistics.median(validas)
+    dispersao = statistics.median(abs(diferenca - latencia) for diferenca in validas)
+    return {"latencia": latencia, "dispersao": dispersao, "toques": len(validas),
+            "valida": dispersao <= DISPERSAO_MAXIMA}
+
+
+if __name__ == "__main__":
+    os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+    os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+    os.chdir(os.path.dirname(os.path.abspath(__file__)))
+    simular = float(sys.argv[sys.argv.index("--simular-latencia") + 1]) if "--simular-latencia" in sys.argv else None
+    if simular is None and os.environ["SDL_VIDEODRIVER"] == "dummy":
+        simular = 0.1 # Sem janela de verdade não há teclas: o toque é simulado
+        print("Driver de vídeo dummy: toques simulados com 100 ms de atraso.")
+
+    pygame.init()
+    pygame.display.set_mode((100, 100))
+
+    def reabrir_mixer(buffer):
+        pygame.mixer.quit()
+        pygame.mixer.init(frequency=44100, size=-16, channels=2, buffer=buffer)
+
+    buffer, resultados = menor_buffer_estavel(reabrir_mixer, lambda: pygame.mixer.Channel(0))
+    for r in resultados:
+        print(f"buffer {r['buffer']:5d}: mediana {r['mediana'] * 1000:6.1f} ms, {r['atrasos']:2d} atrasos "
+              f"({'estável' if r['estavel'] else 'instável'})")
+    if buffer is None:
+        sys.exit(1)
+    print(f"Menor buffer estável: {buffer}")
+
+    toque = medir_latencia_toque(pygame.mixer.Channel(0), gerar_clique(), simular=simular)
+    if toque is None or not toque["valida"]:
+        print(f"Toques insuficientes ou fora do ritmo: {toque}")
+        pygame.quit()
+        sys.exit(1)
+    print(f"Latência por toque: {toque['latencia'] * 1000:.1f} ms (dispersão {toque['dispersao'] * 1000:.1f} ms, {toque['toques']} toques)")
+    if "--salvar" in sys.argv:
+        salvar_calibracao({"buffer": buffer, "latencia": toque["latencia"], "dispersao": toque["dispersao"]})
+        print(f"Gravado em {ARQUIVO_CALIBRACAO} para {nome_computador()}")
+    pygame.quit()
+    erro = abs(toque["latencia"] - simular) if simular is not None else 0.0
+    sys.exit(1 if erro > 0.02 else 0)
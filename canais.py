@@ -0,0 +1,179 @@
+# -*- coding: utf-8 -*-
+"""
+Gerenciador de canais do mixer.
+
+Cada categoria de som (pista de obstáculo, resposta, jingle, fala do cache)
+tem o seu grupo fixo de canais reservados, para que uma rajada de pistas
+nunca ocupe os canais das respostas. Dentro do grupo, quando todos os canais
+estão tocando, o som novo rouba o canal da voz de menor prioridade (a mais
+antiga, no empate); se todas forem mais importantes que ele, o som novo é
+descartado. Um som crítico pode ainda usar os canais dos grupos de
+EMPRESTIMOS (uma resposta crítica rouba antes uma pista do que outra
+resposta crítica). Os contadores mostram, por categoria, quantos sons foram
+tocados e descartados e quantas vozes foram roubadas, separando as críticas
+(colisão, vida extra).
+
+Uso (teste de carga): python canais.py [segundos] [intervalo]
+(o intervalo padrão é o menor que o jogo usa, TEMPO_MINIMO_OBSTACULO)
+"""
+import sys
+import threading
+import time
+
+import pygame
+
+PRIORIDADE_BAIXA = 0
+PRIORIDADE_NORMAL = 1
+PRIORIDADE_CRITICA = 2
+
+# Categoria: número de canais do grupo (na ordem em que os canais são numerados)
+GRUPOS = (
+    ("jingle", 1),
+    ("fala", 1),
+    ("resposta", 4),
+    ("pista", 6),
+)
+
+# Grupos cujos canais um som crítico da categoria pode usar quando o seu está cheio
+EMPRESTIMOS = {"resposta": ("pista",)}
+
+# Prioridade das respostas do jogo: perder uma colisão ou uma vida extra engana o jogador
+PRIORIDADE_RESPOSTAS = {"colisao": PRIORIDADE_CRITICA, "vida": PRIORIDADE_CRITICA, "desviou": PRIORIDADE_NORMAL}
+
+
+def prioridade_resposta(nome_som):
+    return PRIORIDADE_RESPOSTAS.get(nome_som, PRIORIDADE_NORMAL)
+
+
+class Voz:
+    __slots__ = ("canal", "categoria", "prioridade", "inicio", "nome")
+
+    def __init__(self, canal, categoria):
+        self.canal = canal
+        self.categoria = categoria
+        self.prioridade = PRIORIDADE_BAIXA
+        self.inicio = 0.0
+        self.nome = None
+
+
+class GerenciadorCanais:
+    """
+    Reserva todos os canais do mixer (Sound.play() deixa de escolher canal
+    sozinho) e os distribui pelos grupos de GRUPOS.
+    """
+
+    def __init__(self, grupos=GRUPOS, emprestimos=EMPRESTIMOS):
+        total = sum(quantidade for _, quantidade in grupos)
+        self.total_canais = total
+        self.reservar()
+        self.grupos = {}
+        proximo = 0
+        for categoria, quantidade in grupos:
+            self.grupos[categoria] = [Voz(pygame.mixer.Channel(proximo + i), categoria) for i in range(quantidade)]
+            proximo += quantidade
+        self.emprestimos = emprestimos
+        self.lock = threading.Lock() # A fala do cache toca a partir da thread de fala
+        self.total_tocados = 0 # Acumulado desde o início (não é zerado com os contadores)
+        self.zerar_contadores()
+
+    def reservar(self):
+        """Cria e reserva os canais no mixer; chamado de novo quando o mixer é reaberto (que os zera)."""
+        if pygame.mixer.get_num_channels() < self.total_canais:
+            pygame.mixer.set_num_channels(self.total_canais)
+        pygame.mixer.set_reserved(self.total_canais)
+
+    def canal(self, categoria):
+        """Primeiro canal do grupo (para quem controla o canal diretamente, como os jingles)."""
+        return self.grupos[categoria][0].canal
+
+    def tocar(self, categoria, som, prioridade=PRIORIDADE_NORMAL, nome=None, volume=None):
+        """
+        Toca 'som' num canal do grupo da categoria, roubando uma voz menos
+        importante se preciso. 'volume' é um par (esquerdo, direito) aplicado ao
+        canal: o pan sai do mixer, sem copiar as amostras. Retorna o Channel, ou
+        None se o som foi descartado.
+        """
+        with self.lock:
+            vozes = self.grupos[categoria]
+            if prioridade >= PRIORIDADE_CRITICA:
+                for outra in self.emprestimos.get(categoria, ()):
+                    vozes = vozes + self.grupos[outra]
+            contador = self.contagem[categoria]
+            voz = None
+            for candidata in vozes:
+                if not candidata.canal.get_busy():
+                    voz = candidata
+                    break
+            if voz is None:
+                vitima = min(vozes, key=lambda v: (v.prioridade, v.inicio))
+                if vitima.prioridade > prioridade:
+                    contador["descartados"] += 1
+                    if prioridade >= PRIORIDADE_CRITICA:
+                        contador["descartados_criticos"] += 1
+                    return None
+                roubo = self.contagem[vitima.categoria]
+                roubo["roubados"] += 1
+                if vitima.prioridade >= PRIORIDADE_CRITICA:
+                    roubo["roubados_criticos"] += 1
+                voz = vitima
+            voz.prioridade = prioridade
+            voz.inicio = time.perf_counter()
+            voz.nome = nome
+            if volume is not None:
+                # O SDL_mixer descarta o pan do canal quando o som dele termina ou é
+                # interrompido: para o canal antes e aplica o pan antes do play
+                voz.canal.stop()
+                voz.canal.set_volume(*volume)
+            voz.canal.play(som)
+            contador["tocados"] += 1
+            self.total_tocados += 1
+            return voz.canal
+
+    def parar(self, categoria=None):
+        for nome, vozes in self.grupos.items():
+            if categoria is None or nome == categoria:
+                for voz in vozes:
+                    voz.canal.stop()
+
+    def ocupados(self, categoria):
+        return sum(1 for voz in self.grupos[categoria] if voz.canal.get_busy())
+
+    def contadores(self):
+        with self.lock:
+            return {categoria: dict(contador) for categoria, contador in self.contagem.items()}
+
+    def zerar_contadores(self):
+        self.contagem = {categoria: {"tocados": 0, "roubados": 0, "descartados": 0,
+                                     "roubados_criticos": 0, "descartados_criticos": 0}
+                         for categoria in self.grupos}
+
+
+if __name__ == "__main__":
+    # Teste de carga: um obstáculo a cada 'intervalo' segundos, cada um com a
+    # pista e uma resposta (colisão, vida extra ou desviou), pelo tempo pedido.
+    import os
+    import random
+    os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+    os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+    os.chdir(os.path.dirname(os.path.abspath(__file__)))
+    import play
+    from simulacao import TEMPO_MINIMO_OBSTACULO
+
+    play.inicializar(com_fala=False)
+    play.aguardar_sons_prontos()
+    segundos = float(sys.argv[1]) if len(sys.argv) > 1 else 10.0
+    intervalo = float(sys.argv[2]) if len(sys.argv) > 2 else TEMPO_MINIMO_OBSTACULO
+    play.canais.zerar_contadores()
+    fim = time.perf_counter() + segundos
+    obstaculos = 0
+    while time.perf_counter() < fim:
+        tipo = random.choice(("esquerda", "direita", "centro", "cima", "caixa"))
+        play.tocar_som_direcional(tipo, tipo)
+        play.tocar_som(random.choice(("colisao", "vida", "desviou")))
+        obstaculos += 1
+        time.sleep(intervalo)
+    print(f"{obstaculos} obstáculos em {segundos:.0f} s (um a cada {intervalo * 1000:.0f} ms)")
+    for categoria, contador in play.canais.contadores().items():
+        print(f"{categoria:9s} " + " ".join(f"{chave}={valor}" for chave, valor in contador.items()))
+    criticos = sum(c["descartados_criticos"] + c["roubados_criticos"] for c in play.canais.contadores().values())
+    sys.exit(1 if criticos else 0)
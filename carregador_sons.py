@@ -0,0 +1,100 @@
+# -*- coding: utf-8 -*-
+"""
+Carregamento paralelo e preguiçoso dos sons.
+
+Os sons críticos para o jogo são enviados primeiro a um pool de threads
+assim que o carregador é criado; os demais só são carregados no primeiro
+acesso. SonsCarregados se comporta como o antigo dicionário loaded_sounds,
+mas o acesso a uma chave espera apenas pelo som daquela chave.
+"""
+import os
+import threading
+from collections.abc import Mapping
+from concurrent.futures import ThreadPoolExecutor, wait
+
+import pygame
+
+# Sons tocados pelo mixer.music (streaming), que não viram Sound
+SONS_STREAMING = ("musica",)
+
+# Sons necessários antes do menu: pistas dos obstáculos e respostas do jogo
+SONS_CRITICOS = ("obstaculos_varios", "centro", "cima", "caixa", "colisao", "desviou", "vida")
+
+# Jingles curtos decodificados para a memória logo depois dos críticos (não bloqueiam o menu)
+SONS_PRE_CARREGADOS = ("inicio", "fim", "instrucoes")
+
+
+def carregar_som(caminho):
+    """Carrega um Sound; retorna None se o arquivo faltar ou não puder ser lido."""
+    try:
+        return pygame.mixer.Sound(os.path.join(os.getcwd(), caminho))
+    except pygame.error as e:
+        # print(f"ERRO: Falha ao carregar som '{caminho}': {e}. Este som não tocará.")
+        return None
+    except FileNotFoundError:
+        # print(f"ERRO: Arquivo de som '{caminho}' não encontrado. Este som não tocará.")
+        return None
+
+
+class SonsCarregados(Mapping):
+    """Dicionário somente leitura de sons carregados em segundo plano."""
+
+    def __init__(self, sons_paths, criticos=SONS_CRITICOS, pre_carregados=SONS_PRE_CARREGADOS,
+                 trabalhadores=4, carregar=carregar_som):
+        self.sons_paths = {chave: valor for chave, valor in sons_paths.items() if chave not in SONS_STREAMING}
+        self.criticos = tuple(chave for chave in criticos if chave in self.sons_paths)
+        self.carregar = carregar
+        self.executor = ThreadPoolExecutor(max_workers=trabalhadores, thread_name_prefix="carregador_sons")
+        self.futuros = {}
+        self.lock = threading.Lock()
+        for chave in self.criticos:
+            self._enviar(chave)
+        for chave in pre_carregados:
+            if chave in self.sons_paths:
+                self._enviar(chave)
+
+    def _enviar(self, chave):
+        """Envia o carregamento de uma chave ao pool (uma vez só) e retorna seus futuros."""
+        with self.lock:
+            futuros = self.futuros.get(chave)
+            if futuros is None:
+                valor = self.sons_paths[chave]
+                caminhos = valor if isinstance(valor, list) else [valor]
+                futuros = [self.executor.submit(self.carregar, caminho) for caminho in caminhos]
+                self.futuros[chave] = futuros
+            return futuros
+
+    def __getitem__(self, chave):
+        if chave not in self.sons_paths:
+            raise KeyError(chave)
+        futuros = self._enviar(chave) # Sob demanda para os sons não críticos
+        if isinstance(self.sons_paths[chave], list):
+            return [f.result() for f in futuros]
+        return futuros[0].result()
+
+    def __contains__(self, chave):
+        return chave in self.sons_paths
+
+    def __iter__(self):
+        return iter(self.sons_paths)
+
+    def __len__(self):
+        return len(self.sons_paths)
+
+    def enviar(self, funcao, *args):
+        """Agenda uma tarefa no mesmo pool (ex.: montar o banco de pistas após os críticos)."""
+        return self.executor.submit(funcao, *args)
+
+    def futuros_criticos(self):
+        return [f for chave in self.criticos for f in self.futuros[chave]]
+
+    def aguardar_criticos(self, timeout=None):
+        """Barreira de prontidão: espera os sons críticos. Retorna True se todos terminaram."""
+        _, pendentes = wait(self.futuros_criticos(), timeout=timeout)
+        return not pendentes
+
+    def criticos_prontos(self):
+        return all(f.done() for f in self.futuros_criticos())
+
+    def encerrar(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
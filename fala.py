@@ -0,0 +1,383 @@
+# -*- coding: utf-8 -*-
+"""
+Fila de fala com prioridade, numa thread dedicada.
+
+Quem fala só enfileira (falar() nunca bloqueia); a thread de fala tira as
+mensagens por prioridade e as entrega a um backend. Uma mensagem prioritária
+interrompe a fala atual. Mensagens com a mesma chave de coalescência
+substituem a que ainda está na fila (uma contagem de vidas antiga é trocada
+pela nova), e a fila é limitada: quando enche, a mensagem menos importante
+e mais antiga é descartada.
+
+Backends: pyttsx3 (SAPI no Windows, NSSS no macOS, eSpeak no Linux), nulo
+(descarta tudo) e gravação (guarda os textos, para testes). Com um cache de
+frases (cache_fala.py), as frases já renderizadas tocam pelo mixer em vez de
+passar pelo backend.
+"""
+import heapq
+import itertools
+import os
+import sys
+import threading
+import time
+import wave
+from collections import deque
+
+PRIORIDADE_NORMAL = 0
+PRIORIDADE_ALTA = 1
+
+TAMANHO_FILA = 16
+
+
+class Mensagem:
+    __slots__ = ("texto", "prioridade", "chave", "sequencia", "descartada")
+
+    def __init__(self, texto, prioridade, chave, sequencia):
+        self.texto = texto
+        self.prioridade = prioridade
+        self.chave = chave
+        self.sequencia = sequencia
+        self.descartada = False
+
+    def __lt__(self, outra):
+        # Maior prioridade primeiro; na mesma prioridade, a mais antiga primeiro
+        return (-self.prioridade, self.sequencia) < (-outra.prioridade, outra.sequencia)
+
+
+# Backends: falar() bloqueia até o fim da fala (ou até parar() ser chamado de outra thread).
+# preparar() é chamado pela FilaFala sob o lock, ao escolher a mensagem: zera a parada da fala
+# anterior ali, e não dentro de falar(), para que um parar() entre os dois não se perca.
+
+class BackendPyttsx3:
+    """pyttsx3 com o driver pedido (None = padrão da plataforma)."""
+
+    def __init__(self, driver=None, taxa=225):
+        self.driver = driver
+        self.taxa = taxa
+        self.engine = None
+        self.parada = False
+
+    def iniciar(self):
+        """Chamado na thread de fala: o motor (e o COM do SAPI) fica todo nessa thread."""
+        if self.driver == "sapi5":
+            try:
+                import comtypes
+                comtypes.CoInitialize()
+            except Exception:
+                pass
+        import pyttsx3
+        self.engine = pyttsx3.init(driverName=self.driver, debug=False)
+        self.engine.setProperty("rate", self.taxa)
+
+    def identificador(self):
+        """Driver e voz em uso (parte da chave do cache de frases)."""
+        return f"{self.driver or 'padrao'}:{self.engine.getProperty('voice')}"
+
+    def preparar(self):
+        self.parada = False
+
+    def falar(self, texto):
+        if self.parada:
+            return # parar() chegou antes de a fala começar
+        self.engine.say(texto)
+        self.engine.runAndWait()
+
+    def salvar(self, texto, caminho):
+        """Sintetiza o texto para um arquivo de áudio em vez de falar."""
+        self.engine.save_to_file(texto, caminho)
+        self.engine.runAndWait()
+        return os.path.exists(caminho)
+
+    def parar(self):
+        self.parada = True
+        if self.engine is not None:
+            try:
+                self.engine.stop()
+            except RuntimeError:
+                pass
+
+    def encerrar(self):
+        self.parar()
+
+
+class BackendNulo:
+    """Não fala nada; o jogo segue sem voz (útil em testes e servidores)."""
+
+    taxa = 0
+
+    def iniciar(self):
+        pass
+
+    def identificador(self):
+        return "nulo"
+
+    def preparar(self):
+        pass
+
+    def falar(self, texto):
+        pass
+
+    def parar(self):
+        pass
+
+    def encerrar(self):
+        pass
+
+
+class BackendGravacao:
+    """
+    Guarda cada texto falado (e se foi interrompido). Com 'segundos_por_caractere'
+    simula a duração da fala, para exercitar preempção e coalescência; salvar()
+    grava silêncio com essa mesma duração.
+    """
+
+    taxa = 0
+
+    def __init__(self, segundos_por_caractere=0.0):
+        self.segundos_por_caractere = segundos_por_caractere
+        self.falas = [] # (texto, concluida)
+        self.salvas = []
+        self.interromper = threading.Event()
+
+    def iniciar(self):
+        pass
+
+    def identificador(self):
+        return f"gravacao:{self.segundos_por_caractere}"
+
+    def salvar(self, texto, caminho):
+        quadros = max(1, int(22050 * len(texto) * self.segundos_por_caractere))
+        with wave.open(caminho, "wb") as arquivo:
+            arquivo.setnchannels(1)
+            arquivo.setsampwidth(2)
+            arquivo.setframerate(22050)
+            arquivo.writeframes(bytes(2 * quadros))
+        self.salvas.append(texto)
+        return True
+
+    def preparar(self):
+        self.interromper.clear()
+
+    def falar(self, texto):
+        interrompida = self.interromper.wait(len(texto) * self.segundos_por_caractere) if self.segundos_por_caractere else False
+        self.falas.append((texto, not interrompida))
+
+    def parar(self):
+        self.interromper.set()
+
+    def encerrar(self):
+        self.parar()
+
+
+def criar_backend(nome=None):
+    """
+    Cria o backend pelo nome ("sapi5", "espeak", "nsss", "pyttsx3", "nulo", "gravacao").
+    Sem nome, usa CORRIDA_CEGA_VOZ ou o padrão: SAPI no Windows, pyttsx3 nas outras plataformas.
+    """
+    nome = nome or os.environ.get("CORRIDA_CEGA_VOZ") or ("sapi5" if sys.platform == "win32" else "pyttsx3")
+    if nome == "nulo":
+        return BackendNulo()
+    if nome == "gravacao":
+        return BackendGravacao()
+    return BackendPyttsx3(driver=None if nome == "pyttsx3" else nome)
+
+
+class FilaFala:
+    """
+    Fila limitada de mensagens de fala e a thread que as consome.
+    'ociosa' fica ligado enquanto não há nada falando nem na fila; ele é
+    desligado já no falar(), sob o lock, para quem espera a fala não ver
+    um estado antigo. ao_terminar(mensagem, concluida) é chamado na thread de fala.
+    Tarefas (enviar_tarefa) só rodam quando não há fala na fila e não a deixam ocupada.
+    """
+
+    def __init__(self, backend, tamanho=TAMANHO_FILA, ao_terminar=None, lock=None, ociosa=None, cache=None):
+        self.backend = backend
+        self.cache = cache
+        self.tamanho = tamanho
+        self.ao_terminar = ao_terminar
+        self.lock = lock or threading.Lock() # Protege a fila e as chamadas de parada do backend
+        self.condicao = threading.Condition(self.lock)
+        self.ociosa = ociosa or threading.Event()
+        self.ociosa.set()
+        self.heap = []
+        self.por_chave = {}
+        self.pendentes = 0
+        self.sequencia = itertools.count()
+        self.atual = None
+        self.interrupcao = threading.Event()
+        self.tarefas = deque()
+        self.rodando = False
+        self.thread = None
+        self.erro_inicio = None
+        self.iniciada = threading.Event()
+        self.primeira_fala = None # perf_counter do início da primeira fala (tempo até a primeira fala)
+        # Contadores
+        self.enfileiradas = 0
+        self.coalescidas = 0
+        self.descartadas = 0
+        self.preempcoes = 0
+
+    def iniciar(self, timeout=5.0):
+        """
+        Inicia a thread de fala e espera o backend ficar pronto. Retorna False se ele falhar.
+        Com timeout=0 não espera: as falas já podem ser enfileiradas e saem quando ele subir.
+        """
+        self.rodando = True
+        self.thread = threading.Thread(target=self._executar, name="fala", daemon=True)
+        self.thread.start()
+        return self.pronta(timeout)
+
+    def pronta(self, timeout=None):
+        """Espera o backend terminar de iniciar. True se ele está pronto para falar."""
+        self.iniciada.wait(timeout)
+        return self.iniciada.is_set() and self.erro_inicio is None
+
+    def _remover(self, mensagem):
+        mensagem.descartada = True
+        self.pendentes -= 1
+        if mensagem.chave is not None and self.por_chave.get(mensagem.chave) is mensagem:
+            del self.por_chave[mensagem.chave]
+
+    def falar(self, texto, prioridade=PRIORIDADE_NORMAL, chave=None):
+        """Enfileira uma fala. Nunca bloqueia esperando a fala; retorna a Mensagem ou None se descartada."""
+        with self.condicao:
+            mensagem = Mensagem(texto, prioridade, chave, next(self.sequencia))
+
+            # Coalescência: a mensagem nova substitui a antiga com a mesma chave ainda na fila
+            antiga = self.por_chave.get(chave) if chave is not None else None
+            if antiga is not None:
+                self._remover(antiga)
+                self.coalescidas += 1
+
+            if self.pendentes >= self.tamanho:
+                # Fila cheia: sai a menos importante (e mais antiga); pode ser a própria nova
+                candidatas = [m for m in self.heap if not m.descartada]
+                pior = min(candidatas, key=lambda m: (m.prioridade, m.sequencia))
+                self.descartadas += 1
+                if mensagem.prioridade < pior.prioridade:
+                    return None
+                self._remover(pior)
+
+            heapq.heappush(self.heap, mensagem)
+            self.pendentes += 1
+            if len(self.heap) > 2 * self.pendentes:
+                # Mais descartadas que vivas no heap (coalescência em rajada): compacta
+                self.heap = [m for m in self.heap if not m.descartada]
+                heapq.heapify(self.heap)
+            if chave is not None:
+                self.por_chave[chave] = mensagem
+            self.enfileiradas += 1
+            self.ociosa.clear()
+
+            # Preempção: uma mensagem mais importante interrompe a que está sendo falada
+            atual = self.atual
+            if atual is not None and (prioridade > atual.prioridade or (prioridade >= PRIORIDADE_ALTA and prioridade >= atual.prioridade)):
+                self.interrupcao.set()
+                self.preempcoes += 1
+                self.backend.parar()
+
+            self.condicao.notify()
+            return mensagem
+
+    def parar(self, limpar_fila=True):
+        """Interrompe a fala atual e, por padrão, descarta o que estava na fila."""
+        with self.condicao:
+            if limpar_fila:
+                for mensagem in self.heap:
+                    mensagem.descartada = True
+                self.heap.clear()
+                self.por_chave.clear()
+                self.pendentes = 0
+            if self.atual is not None:
+                self.interrupcao.set()
+                self.backend.parar()
+
+    def enviar_tarefa(self, tarefa):
+        """Agenda tarefa(backend) na thread de fala, para quando não houver nada a falar."""
+        with self.condicao:
+            self.tarefas.append(tarefa)
+            self.condicao.notify()
+
+    def ocupada(self):
+        with self.lock:
+            return self.atual is not None or self.pendentes > 0
+
+    def profundidade(self):
+        """Mensagens esperando na fila (sem contar a que está sendo falada)."""
+        return self.pendentes
+
+    def _proxima(self):
+        while self.heap:
+            mensagem = heapq.heappop(self.heap)
+            if not mensagem.descartada:
+                self._remover(mensagem)
+                mensagem.descartada = False
+                return mensagem
+        return None
+
+    def _executar(self):
+        try:
+            self.backend.iniciar()
+        except Exception as e:
+            # print(f"ERRO CRÍTICO: Falha ao inicializar o backend de fala: {e}")
+            self.erro_inicio = e
+            self.rodando = False
+            self.ociosa.set()
+            self.iniciada.set()
+            return
+        self.iniciada.set()
+
+        while True:
+            with self.condicao:
+                mensagem = self._proxima()
+                while mensagem is None and not self.tarefas and self.rodando:
+                    self.ociosa.set()
+                    self.condicao.wait()
+                    mensagem = self._proxima()
+                if not self.rodando:
+                    return
+                if mensagem is None:
+                    self.ociosa.set()
+                    tarefa = self.tarefas.popleft()
+                else:
+                    self.atual = mensagem
+                    self.interrupcao.clear()
+                    self.backend.preparar()
+
+            if mensagem is None:
+                try:
+                    tarefa(self.backend)
+                except Exception as e:
+                    # print(f"AVISO: Erro numa tarefa da thread de fala: {e}")
+                    pass
+                continue
+
+            if self.primeira_fala is None:
+                self.primeira_fala = time.perf_counter()
+            try:
+                # Pode ter sido interrompida antes de começar; frase no cache toca pelo mixer
+                if not self.interrupcao.is_set() and not (self.cache is not None and self.cache.tocar(mensagem.texto, self.interrupcao)):
+                    self.backend.falar(mensagem.texto)
+            except Exception as e:
+                # print(f"AVISO: Erro do backend ao falar '{mensagem.texto}': {e}")
+                pass
+
+            with self.condicao:
+                concluida = not self.interrupcao.is_set()
+                self.atual = None
+            if self.ao_terminar:
+                self.ao_terminar(mensagem, concluida)
+
+    def encerrar(self, timeout=1.0):
+        with self.condicao:
+            self.rodando = False
+            self.condicao.notify()
+        self.backend.encerrar()
+        if self.thread is not None:
+            self.thread.join(timeout)
+
+    def contadores(self):
+        return {"enfileiradas": self.enfileiradas, "coalescidas": self.coalescidas,
+                "descartadas": self.descartadas, "preempcoes": self.preempcoes,
+                "profundidade": self.pendentes}
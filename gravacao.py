@@ -0,0 +1,158 @@
+# -*- coding: utf-8 -*-
+"""
+Gravação binária de sessões e replay em velocidade máxima.
+
+Uma sessão é a semente do gerador de obstáculos mais um log só de acréscimo
+com registros de largura fixa (REGISTRO): obstáculos, teclas de jogo e o
+placar final. O replay refaz a partida no MotorJogo com um RelogioVirtual,
+sem áudio nem fala, e confere se pontos, colisões e vidas extras batem.
+
+Uso: python gravacao.py arquivo.ccg [arquivo.ccg ...]
+"""
+import os
+import struct
+import sys
+from datetime import datetime
+
+from simulacao import ACOES, OBSTACULOS, MotorJogo, RelogioVirtual, config_dificuldade
+
+MAGICO = b"CCG1"
+
+# Cabeçalho: mágico, semente, opção de dificuldade, janela de reação
+CABECALHO = struct.Struct("<4sQBd")
+
+# Registro: tipo, código (obstáculo ou ação), número do obstáculo ou valor do placar, tempo
+REGISTRO = struct.Struct("<BBId")
+
+OBSTACULO = 1 # tempo = instante desde o início da partida
+TECLA = 2 # tempo = latência desde o início da pista
+SEM_TECLA = 3 # janela de reação acabou sem tecla de jogo
+PLACAR = 4 # código: 0 pontos, 1 colisões, 2 vidas extras
+
+CAMPOS_PLACAR = ("pontos", "colisoes", "vidas_extra")
+
+# Tamanho do buffer em memória antes de escrever no arquivo
+TAMANHO_BUFFER = 4096
+
+PASTA_GRAVACOES = "gravacoes"
+
+
+def caminho_nova_gravacao(pasta=PASTA_GRAVACOES):
+    """
+    Cria (vazio, com "xb") e retorna um arquivo de sessão novo. Duas partidas no
+    mesmo microssegundo, ou um arquivo que já exista, ganham um sufixo em vez de
+    acrescentar registros à gravação de outra sessão.
+    """
+    os.makedirs(pasta, exist_ok=True)
+    base = os.path.join(pasta, datetime.now().strftime("sessao_%Y%m%d_%H%M%S_%f"))
+    contador = 0
+    while True:
+        caminho = f"{base}.ccg" if contador == 0 else f"{base}_{contador}.ccg"
+        try:
+            open(caminho, "xb").close()
+            return caminho
+        except FileExistsError:
+            contador += 1
+
+
+class GravadorSessao:
+    """
+    Acumula os registros num bytearray e só escreve no arquivo em blocos,
+    para o custo no loop do jogo ser um struct.pack e uma cópia curta.
+    """
+
+    def __init__(self, caminho, semente, nivel, janela_reacao):
+        self.caminho = caminho
+        self.arquivo = open(caminho, "ab")
+        self.arquivo.write(CABECALHO.pack(MAGICO, semente, nivel, janela_reacao))
+        self.buffer = bytearray()
+        self.inicio = None
+
+    def _acrescentar(self, tipo, codigo, numero, tempo):
+        self.buffer += REGISTRO.pack(tipo, codigo, numero, tempo)
+        if len(self.buffer) >= TAMANHO_BUFFER:
+            self.descarregar()
+
+    def obstaculo(self, numero, obstaculo):
+        if self.inicio is None:
+            self.inicio = obstaculo.inicio
+        self._acrescentar(OBSTACULO, OBSTACULOS.index(obstaculo.tipo), numero, obstaculo.inicio - self.inicio)
+
+    def tecla(self, numero, acao, latencia):
+        self._acrescentar(TECLA, ACOES.index(acao), numero, latencia)
+
+    def sem_tecla(self, numero):
+        self._acrescentar(SEM_TECLA, 0, numero, 0.0)
+
+    def descarregar(self):
+        self.arquivo.write(self.buffer)
+        self.buffer.clear()
+
+    def fechar(self, motor):
+        """Grava o placar final e fecha o arquivo."""
+        for codigo, campo in enumerate(CAMPOS_PLACAR):
+            self._acrescentar(PLACAR, codigo, getattr(motor, campo), 0.0)
+        self.descarregar()
+        self.arquivo.close()
+
+
+def ler_gravacao(caminho):
+    """Retorna (semente, nivel, janela_reacao, registros) de um arquivo de sessão."""
+    with open(caminho, "rb") as arquivo:
+        dados = arquivo.read()
+    magico, semente, nivel, janela = CABECALHO.unpack_from(dados, 0)
+    if magico != MAGICO:
+        raise ValueError(f"{caminho} não é uma gravação do Corrida Cega")
+    corpo = memoryview(dados)[CABECALHO.size:]
+    corpo = corpo[:len(corpo) - len(corpo) % REGISTRO.size]
+    return semente, nivel, janela, list(REGISTRO.iter_unpack(corpo))
+
+
+def reproduzir(caminho):
+    """
+    Refaz a partida gravada no MotorJogo e compara com o placar gravado.
+    Retorna (confere, placar_replay, placar_gravado).
+    """
+    semente, nivel, janela, registros = ler_gravacao(caminho)
+    relogio = RelogioVirtual()
+    motor = MotorJogo(config_dificuldade(nivel), relogio=relogio, semente=semente, janela_reacao=janela)
+
+    placar_gravado = {}
+    confere = True
+    for tipo, codigo, numero, tempo in registros:
+        if tipo == OBSTACULO:
+            relogio.avancar_ate(tempo)
+            obstaculo = motor.gerar_obstaculo()
+            if obstaculo.tipo != OBSTACULOS[codigo] or obstaculo.numero != numero:
+                confere = False # A semente não reproduz a mesma sequência de obstáculos
+        elif tipo in (TECLA, SEM_TECLA):
+            # Vários obstáculos podem estar no ar: o registro diz qual deles foi resolvido
+            obstaculo = motor.pendentes.get(numero)
+            if obstaculo is None:
+                confere = False
+            elif tipo == TECLA:
+                motor.resolver(obstaculo, ACOES[codigo], tempo)
+            else:
+                motor.resolver(obstaculo)
+        elif tipo == PLACAR:
+            placar_gravado[CAMPOS_PLACAR[codigo]] = numero
+
+    placar_replay = {campo: getattr(motor, campo) for campo in CAMPOS_PLACAR}
+    confere = confere and placar_replay == placar_gravado
+    return confere, placar_replay, placar_gravado
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print(__doc__.strip().splitlines()[-1])
+        sys.exit(2)
+
+    falhas = 0
+    for caminho in sys.argv[1:]:
+        confere, replay, gravado = reproduzir(caminho)
+        if confere:
+            print(f"OK    {caminho}: {replay}")
+        else:
+            falhas += 1
+            print(f"FALHA {caminho}: replay {replay}, gravado {gravado}")
+    sys.exit(1 if falhas else 0)
@@ -0,0 +1,340 @@
+# -*- coding: utf-8 -*-
+"""
+Instrumentação do loop do jogo, ligada por CORRIDA_CEGA_PERFIL=1 ou --perfil.
+
+Cada quadro do loop (uma volta: espera por eventos, processamento) guarda o
+tempo de espera e de trabalho, os eventos processados, os sons despachados
+e a profundidade da fila de fala; cada aquisição disputada do lock da fala
+guarda quanto a thread esperou. Tudo vai para buffers circulares
+pré-alocados, sem alocação por quadro. No fim, o perfil é exportado como
+JSON de trace do Chrome (abre em chrome://tracing ou no Perfetto) e resumido
+numa tabela.
+
+Desligado, criar_perfil() retorna um PerfilDesligado, cujos métodos não
+fazem nada, e medir_lock() devolve o próprio lock, sem invólucro. O numpy só
+é importado quando o perfil está ligado.
+
+A LinhaTempo registra as fases da abertura do jogo (importação, mixer,
+janela, primeira fala, sons prontos); python play.py --tempo-inicio imprime
+essa linha do tempo junto com o resumo de python -X importtime.
+"""
+import itertools
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+from datetime import datetime
+
+PASTA_PERFIS = "perfis"
+
+# Capacidade dos buffers circulares (os registros mais antigos são sobrescritos)
+CAPACIDADE_QUADROS = 65536
+CAPACIDADE_ESPERAS = 16384
+CAPACIDADE_MARCAS = 1024
+
+PERCENTIS = (50, 95, 99)
+
+
+def perfil_pedido():
+    return os.environ.get("CORRIDA_CEGA_PERFIL") == "1" or "--perfil" in sys.argv
+
+
+def criar_perfil(ativo=None):
+    """Perfil ligado se pedido (variável de ambiente ou --perfil); senão, o desligado."""
+    if ativo is None:
+        ativo = perfil_pedido()
+    return Perfil() if ativo else PerfilDesligado()
+
+
+class PerfilDesligado:
+    """Não mede nada: o custo no loop é só a chamada de um método vazio."""
+
+    ativo = False
+
+    def medir_lock(self, lock, nome):
+        return lock
+
+    def inicio_quadro(self):
+        pass
+
+    def fim_quadro(self, eventos, sons, profundidade_fala):
+        pass
+
+    def marca(self, nome):
+        pass
+
+    def encerrar(self):
+        pass
+
+
+class LockMedido:
+    """
+    Invólucro de um threading.Lock que registra o tempo de espera das
+    aquisições disputadas. Aquisições livres só incrementam um contador.
+    Serve também de lock para threading.Condition.
+    """
+
+    def __init__(self, lock, perfil, nome, codigo):
+        self.lock = lock
+        self.perfil = perfil
+        self.nome = nome
+        self.codigo = codigo
+        self.aquisicoes = 0 # Só as bloqueantes: a Condition testa o lock com acquire(False)
+
+    def acquire(self, blocking=True, timeout=-1):
+        if self.lock.acquire(False):
+            if blocking:
+                self.aquisicoes += 1
+            return True
+        if not blocking:
+            return False
+        self.aquisicoes += 1
+        inicio = time.perf_counter()
+        obtido = self.lock.acquire(True, timeout)
+        self.perfil.registrar_espera(self.codigo, inicio, time.perf_counter() - inicio)
+        return obtido
+
+    def release(self):
+        self.lock.release()
+
+    def locked(self):
+        return self.lock.locked()
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, *excecao):
+        self.release()
+
+
+class Perfil:
+    """Buffers circulares de quadros, esperas de lock e marcas, e a exportação deles."""
+
+    ativo = True
+
+    def __init__(self, capacidade_quadros=CAPACIDADE_QUADROS, capacidade_esperas=CAPACIDADE_ESPERAS):
+        import numpy as np
+        self.origem = time.perf_counter()
+        self.capacidade_quadros = capacidade_quadros
+        self.quadro_inicio = np.zeros(capacidade_quadros, dtype=np.float64)
+        self.quadro_espera = np.zeros(capacidade_quadros, dtype=np.float64)
+        self.quadro_trabalho = np.zeros(capacidade_quadros, dtype=np.float64)
+        self.quadro_eventos = np.zeros(capacidade_quadros, dtype=np.int32)
+        self.quadro_sons = np.zeros(capacidade_quadros, dtype=np.int32)
+        self.quadro_fala = np.zeros(capacidade_quadros, dtype=np.int16)
+        self.quadros = 0
+        self.inicio_atual = None
+        self.fim_anterior = None
+        self.sons_anterior = None
+
+        self.capacidade_esperas = capacidade_esperas
+        self.espera_inicio = np.zeros(capacidade_esperas, dtype=np.float64)
+        self.espera_duracao = np.zeros(capacidade_esperas, dtype=np.float64)
+        self.espera_thread = np.zeros(capacidade_esperas, dtype=np.int16)
+        self.espera_lock = np.zeros(capacidade_esperas, dtype=np.int16)
+        self.proxima_espera = itertools.count() # next() é atômico: esperas vêm de várias threads
+        self.esperas = 0
+        self.threads = {} # ident -> (índice, nome)
+        self.locks = {} # nome -> LockMedido
+
+        self.marcas = [None] * CAPACIDADE_MARCAS
+        self.proxima_marca = itertools.count()
+
+    def medir_lock(self, lock, nome):
+        medido = LockMedido(lock, self, nome, len(self.locks))
+        self.locks[nome] = medido
+        return medido
+
+    def _indice_thread(self):
+        thread = threading.current_thread()
+        item = self.threads.get(thread.ident)
+        if item is None:
+            item = self.threads.setdefault(thread.ident, (len(self.threads), thread.name))
+        return item[0]
+
+    def registrar_espera(self, codigo, inicio, duracao):
+        n = next(self.proxima_espera)
+        i = n % self.capacidade_esperas
+        self.espera_inicio[i] = inicio
+        self.espera_duracao[i] = duracao
+        self.espera_thread[i] = self._indice_thread()
+        self.espera_lock[i] = codigo
+        self.esperas = n + 1
+
+    def inicio_quadro(self):
+        """Chamado quando a espera por eventos do quadro termina."""
+        self.inicio_atual = time.perf_counter()
+
+    def fim_quadro(self, eventos, sons, profundidade_fala):
+        """Fecha o quadro. 'sons' é o total acumulado de sons despachados (a diferença vai para o quadro)."""
+        fim = time.perf_counter()
+        inicio = self.inicio_atual if self.inicio_atual is not None else fim
+        i = self.quadros % self.capacidade_quadros
+        self.quadro_inicio[i] = inicio
+        self.quadro_espera[i] = inicio - self.fim_anterior if self.fim_anterior is not None else 0.0
+        self.quadro_trabalho[i] = fim - inicio
+        self.quadro_eventos[i] = eventos
+        self.quadro_sons[i] = sons - self.sons_anterior if self.sons_anterior is not None else 0
+        self.quadro_fala[i] = profundidade_fala
+        self.quadros += 1
+        self.fim_anterior = fim
+        self.sons_anterior = sons
+        self.inicio_atual = None
+
+    def marca(self, nome):
+        """Marca instantânea no trace (ex.: um erro que antes só tinha um print comentado)."""
+        n = next(self.proxima_marca)
+        self.marcas[n % CAPACIDADE_MARCAS] = (time.perf_counter(), self._indice_thread(), nome)
+
+    def _quadros_em_ordem(self):
+        import numpy as np
+        n = min(self.quadros, self.capacidade_quadros)
+        return np.argsort(self.quadro_inicio[:n], kind="stable") # O buffer pode ter dado a volta
+
+    def _esperas_validas(self):
+        return slice(0, min(self.esperas, self.capacidade_esperas))
+
+    def _us(self, instante):
+        return (instante - self.origem) * 1e6
+
+    def trace(self):
+        """Eventos no formato JSON de trace do Chrome ("traceEvents")."""
+        eventos = [{"name": "process_name", "ph": "M", "pid": 1, "args": {"name": "Corrida Cega"}}]
+        principal = self._indice_thread_principal()
+        for indice, nome in self.threads.values():
+            eventos.append({"name": "thread_name", "ph": "M", "pid": 1, "tid": indice, "args": {"name": nome}})
+
+        for i in self._quadros_em_ordem():
+            ts = self._us(self.quadro_inicio[i])
+            eventos.append({"name": "quadro", "ph": "X", "pid": 1, "tid": principal, "ts": ts,
+                            "dur": self.quadro_trabalho[i] * 1e6,
+                            "args": {"eventos": int(self.quadro_eventos[i]), "sons": int(self.quadro_sons[i]),
+                                     "espera_ms": self.quadro_espera[i] * 1000}})
+            eventos.append({"name": "fila de fala", "ph": "C", "pid": 1, "ts": ts,
+                            "args": {"profundidade": int(self.quadro_fala[i])}})
+
+        nomes_locks = list(self.locks)
+        validas = self._esperas_validas()
+        for inicio, duracao, thread, lock in zip(self.espera_inicio[validas], self.espera_duracao[validas],
+                                                 self.espera_thread[validas], self.espera_lock[validas]):
+            eventos.append({"name": f"espera {nomes_locks[lock]}", "ph": "X", "pid": 1, "tid": int(thread),
+                            "ts": self._us(inicio), "dur": duracao * 1e6})
+
+        for marca in self.marcas:
+            if marca is not None:
+                instante, thread, nome = marca
+                eventos.append({"name": nome, "ph": "i", "s": "t", "pid": 1, "tid": thread, "ts": self._us(instante)})
+        return {"traceEvents": eventos, "displayTimeUnit": "ms"}
+
+    def _indice_thread_principal(self):
+        principal = threading.main_thread()
+        item = self.threads.get(principal.ident)
+        if item is None:
+            item = self.threads.setdefault(principal.ident, (len(self.threads), principal.name))
+        return item[0]
+
+    def exportar(self, caminho):
+        with open(caminho, "w", encoding="utf-8") as arquivo:
+            json.dump(self.trace(), arquivo)
+
+    def resumo(self):
+        """Números do perfil: quadros, eventos, sons, fila de fala e esperas de cada lock (tempos em ms)."""
+        import numpy as np
+        n = min(self.quadros, self.capacidade_quadros)
+        trabalho = self.quadro_trabalho[:n] * 1000
+        resumo = {"quadros": self.quadros, "eventos": int(self.quadro_eventos[:n].sum()),
+                  "sons": int(self.quadro_sons[:n].sum()),
+                  "fala_max": int(self.quadro_fala[:n].max()) if n else 0,
+                  "fala_media": float(self.quadro_fala[:n].mean()) if n else 0.0}
+        for p in PERCENTIS:
+            resumo[f"quadro_p{p}"] = float(np.percentile(trabalho, p)) if n else None
+        resumo["quadro_max"] = float(trabalho.max()) if n else None
+
+        validas = self._esperas_validas()
+        resumo["locks"] = {}
+        for codigo, (nome, lock) in enumerate(self.locks.items()):
+            esperas = self.espera_duracao[validas][self.espera_lock[validas] == codigo] * 1000
+            resumo["locks"][nome] = {"aquisicoes": lock.aquisicoes, "disputadas": int(esperas.size),
+                                     "espera_total": float(esperas.sum()),
+                                     "espera_p99": float(np.percentile(esperas, 99)) if esperas.size else 0.0,
+                                     "espera_max": float(esperas.max()) if esperas.size else 0.0}
+        return resumo
+
+    def formatar(self):
+        """Tabela do resumo, para imprimir no fim."""
+        r = self.resumo()
+        linhas = [f"{'quadros':22s} {r['quadros']:>10d}",
+                  f"{'eventos processados':22s} {r['eventos']:>10d}",
+                  f"{'sons despachados':22s} {r['sons']:>10d}",
+                  f"{'fila de fala média':22s} {r['fala_media']:>10.2f}",
+                  f"{'fila de fala máxima':22s} {r['fala_max']:>10d}"]
+        for chave in [f"quadro_p{p}" for p in PERCENTIS] + ["quadro_max"]:
+            valor = r[chave]
+            linhas.append(f"{chave + ' (ms)':22s} " + (f"{valor:>10.3f}" if valor is not None else f"{'-':>10s}"))
+        for nome, lock in r["locks"].items():
+            linhas.append(f"{nome}: {lock['aquisicoes']} aquisições, {lock['disputadas']} disputadas, "
+                          f"espera total {lock['espera_total']:.3f} ms, p99 {lock['espera_p99']:.3f} ms, máx {lock['espera_max']:.3f} ms")
+        return "\n".join(linhas)
+
+    def encerrar(self, pasta=PASTA_PERFIS):
+        """Imprime o resumo e grava o trace em pasta/perfil_AAAAMMDD_HHMMSS.json. Retorna o caminho."""
+        print(self.formatar())
+        try:
+            os.makedirs(pasta, exist_ok=True)
+            caminho = os.path.join(pasta, datetime.now().strftime("perfil_%Y%m%d_%H%M%S.json"))
+            self.exportar(caminho)
+        except OSError as e:
+            # print(f"AVISO: Falha ao gravar o trace do perfil: {e}")
+            return None
+        print(f"Trace: {caminho}")
+        return caminho
+
+
+class LinhaTempo:
+    """Instantes (perf_counter) das fases da abertura, medidos a partir de 'origem'."""
+
+    def __init__(self, origem=None):
+        self.origem = origem if origem is not None else time.perf_counter()
+        self.fases = []
+
+    def marcar(self, fase, instante=None):
+        """Registra o fim de uma fase (agora, ou no instante dado)."""
+        self.fases.append((fase, instante if instante is not None else time.perf_counter()))
+
+    def formatar(self):
+        """Uma linha por fase: tempo desde a origem e duração da fase, em ms."""
+        linhas = []
+        anterior = self.origem
+        for fase, instante in sorted(self.fases, key=lambda item: item[1]):
+            linhas.append(f"{fase:32s} {(instante - self.origem) * 1000:8.1f} ms  (+{(instante - anterior) * 1000:.1f})")
+            anterior = instante
+        return "\n".join(linhas)
+
+
+def resumo_importtime(modulo="play", quantos=10):
+    """
+    Importa 'modulo' num processo novo com python -X importtime e retorna
+    (total_us, [(tempo_acumulado_us, nome), ...]): o tempo da importação inteira
+    e os módulos importados diretamente por ele mais caros, do maior para o menor.
+    """
+    saida = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {modulo}"],
+                           capture_output=True, text=True).stderr
+    filhos = []
+    total = None
+    for linha in saida.splitlines():
+        partes = linha.split("|")
+        if len(partes) != 3 or not partes[1].strip().isdigit():
+            continue
+        acumulado, nome = int(partes[1]), partes[2]
+        recuo = (len(nome) - len(nome.lstrip()) - 1) // 2 # O -X importtime recua dois espaços por nível
+        if recuo == 0:
+            if nome.strip() == modulo:
+                total = acumulado
+                break
+            filhos = [] # Outro módulo de primeiro nível (a partida do interpretador)
+        elif recuo == 1:
+            filhos.append((acumulado, nome.strip()))
+    return total, sorted(filhos, reverse=True)[:quantos]
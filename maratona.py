@@ -0,0 +1,243 @@
+# -*- coding: utf-8 -*-
+"""
+Teste de maratona: horas de jogo em tempo simulado, procurando vazamento de memória.
+
+Roda o caminho de áudio real do play.py (pistas direcionais, respostas, fala
+de nível, gravação de sessão, telemetria, placar) com os drivers dummy do
+SDL e a voz nula, mas com o relógio virtual da simulação: um jogador
+modelado enfrenta um obstáculo a cada INTERVALO_MARATONA segundos simulados
+(vários no ar ao mesmo tempo, cada um com o seu prazo), sem esperar pelo
+relógio de parede, e uma partida nova começa assim que a anterior acaba. A cada AMOSTRA_SEGUNDOS simulados são medidos a memória do
+Python (tracemalloc), o RSS do processo e os Sounds vivos. O teste falha se
+alguma das medidas crescer de forma sustentada depois do aquecimento.
+
+Com --renderizar, toda pista passa pela conversão na hora
+(renderizar_direcional -> make_sound), que cria um Sound novo por obstáculo.
+
+Uso: python maratona.py [horas] [--renderizar] [--intervalo SEGUNDOS]
+"""
+import argparse
+import gc
+import heapq
+import itertools
+import math
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+import weakref
+
+import numpy as np
+
+from simulacao import TEMPO_MINIMO_OBSTACULO
+
+# O menor intervalo do jogo: com a reação do jogador mais longa que ele, os obstáculos se sobrepõem
+INTERVALO_MARATONA = TEMPO_MINIMO_OBSTACULO
+AMOSTRA_SEGUNDOS = 60.0
+
+# Fração inicial das amostras ignorada (caches e buffers circulares ainda enchendo)
+AQUECIMENTO = 0.25
+
+# Crescimento máximo tolerado entre o fim do aquecimento e o fim do teste
+LIMITE_TRACEMALLOC = 2 * 1024 * 1024
+LIMITE_RSS = 32 * 1024 * 1024
+LIMITE_SONS = 32
+
+
+def rss_atual():
+    """RSS do processo em bytes (None se a plataforma não expõe)."""
+    try:
+        with open("/proc/self/statm") as arquivo:
+            return int(arquivo.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        pass
+    try:
+        import psutil
+        return psutil.Process().memory_info().rss
+    except ImportError:
+        return None
+
+
+def contar_sons(pygame):
+    """
+    Troca pygame.mixer.Sound por uma subclasse que se registra num WeakSet
+    (Sound não é rastreado pelo gc). Precisa rodar antes de o jogo criar sons.
+    """
+    vivos = weakref.WeakSet()
+
+    class SomContado(pygame.mixer.Sound):
+        def __init__(self, *args, **kwargs):
+            super().__init__(*args, **kwargs)
+            vivos.add(self)
+
+    pygame.mixer.Sound = SomContado
+    return vivos
+
+
+def crescimento_sustentado(tempos, valores, limite, aquecimento=AQUECIMENTO):
+    """
+    Crescimento (pela reta de mínimos quadrados) depois do aquecimento, e se ele
+    é sustentado: maior que 'limite' e com o menor valor do último terço acima do
+    maior do primeiro terço. Retorna (crescimento, falhou).
+    """
+    inicio = int(len(valores) * aquecimento)
+    tempos = np.asarray(tempos[inicio:], dtype=np.float64)
+    valores = np.asarray(valores[inicio:], dtype=np.float64)
+    if len(valores) < 6:
+        return 0.0, False
+    inclinacao = np.polyfit(tempos, valores, 1)[0]
+    crescimento = inclinacao * (tempos[-1] - tempos[0])
+    terco = len(valores) // 3
+    sustentado = valores[-terco:].min() > valores[:terco].max()
+    return float(crescimento), bool(crescimento > limite and sustentado)
+
+
+def maratona(horas, intervalo=INTERVALO_MARATONA, renderizar=False, semente=1, amostra=AMOSTRA_SEGUNDOS):
+    """Joga 'horas' simuladas e retorna a lista de amostras (dicionários)."""
+    os.environ["SDL_VIDEODRIVER"] = "dummy"
+    os.environ["SDL_AUDIODRIVER"] = "dummy"
+    os.environ["CORRIDA_CEGA_VOZ"] = "nulo"
+    import pygame
+    pygame.mixer.pre_init(44100, -16, 2, 512)
+    sons_vivos = contar_sons(pygame)
+
+    import play
+    from fala import BackendNulo
+    from gravacao import GravadorSessao
+    from placar import PlacarSessoes
+    from simulacao import TEMPO_MINIMO_ENTRE_TECLAS, JogadorHumano, MotorJogo, RelogioVirtual, config_dificuldade
+
+    play.inicializar(backend_fala=BackendNulo())
+    play.aguardar_sons_prontos()
+    # O placar da maratona vai para um banco temporário, não para o placar.db do jogador
+    play.placar_sessoes.encerrar()
+    pasta = tempfile.mkdtemp(prefix="maratona_")
+    play.placar_sessoes = PlacarSessoes(os.path.join(pasta, "placar.db"))
+
+    nivel = 4
+    config = config_dificuldade(nivel)._replace(tempo_base_entre_obstaculos=intervalo, aceleracao_por_ponto=0.0,
+                                                 min_tempo_obstaculo=intervalo)
+    # A reação passa do intervalo: vários obstáculos ficam no ar e os prazos vencem pelo heap
+    jogador = JogadorHumano(tempo_medio=intervalo * 2.5, desvio=intervalo * 0.75, intervalo_conforto=intervalo)
+    rng = random.Random(semente)
+    som_teste = play.loaded_sounds["centro"] if renderizar else None
+
+    relogio = RelogioVirtual()
+    tracemalloc.start()
+    amostras = []
+    proxima_amostra = 0.0
+    partidas = 0
+    obstaculos = 0
+    max_pendentes = 0
+    inicio_real = time.perf_counter()
+    fim = horas * 3600.0
+
+    def concluir(obstaculo, resultado, latencia):
+        play.registro_latencias.registrar(obstaculo.tipo, config.texto, latencia, resultado.desviou)
+        if not resultado.desviou:
+            play.tocar_som("colisao")
+        elif resultado.ganhou_vida:
+            play.tocar_som("vida")
+        else:
+            play.tocar_som("desviou")
+        if resultado.subiu_nivel:
+            play.falar_nivel_progresso(motor.pontos)
+
+    while relogio.agora() < fim and not play.jogo_encerrar:
+        motor = MotorJogo(config, relogio=relogio, rng=rng, janela_reacao=play.tempo_janela_reacao)
+        gravador = GravadorSessao(os.devnull, semente, nivel, play.tempo_janela_reacao)
+        inicio_partida = relogio.agora()
+        partidas += 1
+        teclas = [] # Heap de (instante, sequência, ação), como em simulacao.simular_partida
+        sequencia = itertools.count()
+        ultima_tecla = -math.inf
+        while not motor.fim_de_jogo and relogio.agora() < fim:
+            proximo = motor.proximo_obstaculo_em()
+            if teclas and teclas[0][0] <= proximo:
+                instante, _, acao = heapq.heappop(teclas)
+            else:
+                instante, acao = proximo, None
+            relogio.avancar_ate(instante)
+
+            # Prazos vencidos antes deste instante: colisões
+            for obstaculo in motor.vencidos(instante):
+                resultado = motor.resolver(obstaculo)
+                gravador.sem_tecla(obstaculo.numero)
+                concluir(obstaculo, resultado, None)
+                if resultado.fim_de_jogo:
+                    break
+            if motor.fim_de_jogo:
+                break
+
+            if acao is not None:
+                obstaculo = motor.casar_tecla(acao)
+                if obstaculo is not None:
+                    latencia = instante - obstaculo.inicio
+                    resultado = motor.resolver(obstaculo, acao, latencia)
+                    gravador.tecla(obstaculo.numero, acao, latencia)
+                    concluir(obstaculo, resultado, latencia)
+            else:
+                obstaculo = motor.gerar_obstaculo()
+                obstaculos += 1
+                max_pendentes = max(max_pendentes, len(motor.pendentes))
+                gravador.obstaculo(obstaculo.numero, obstaculo)
+                play.tocar_som_direcional(obstaculo.tipo, obstaculo.tipo, sound_obj=som_teste, intervalo=motor.tempo_entre_obstaculos)
+                acao, latencia = jogador.reagir(obstaculo, motor, rng)
+                if acao is not None:
+                    ultima_tecla = max(obstaculo.inicio + latencia, ultima_tecla + TEMPO_MINIMO_ENTRE_TECLAS)
+                    heapq.heappush(teclas, (ultima_tecla, next(sequencia), acao))
+            play.get_all_pygame_events() # Esvazia a fila do SDL (fim das falas, por exemplo)
+
+            if relogio.agora() >= proxima_amostra:
+                gc.collect()
+                amostras.append({"tempo": relogio.agora(), "real": time.perf_counter() - inicio_real,
+                                 "obstaculos": obstaculos, "partidas": partidas, "max_pendentes": max_pendentes,
+                                 "tracemalloc": tracemalloc.get_traced_memory()[0],
+                                 "rss": rss_atual(), "sons": len(sons_vivos)})
+                proxima_amostra += amostra
+
+        gravador.fechar(motor)
+        play.registrar_partida(motor, nivel, semente, relogio.agora() - inicio_partida, None, motor.fim_de_jogo)
+
+    tracemalloc.stop()
+    play.placar_sessoes.encerrar()
+    play.fila_fala.encerrar()
+    play.loaded_sounds.encerrar()
+    pygame.quit()
+    return amostras
+
+
+if __name__ == "__main__":
+    os.chdir(os.path.dirname(os.path.abspath(__file__)))
+    parser = argparse.ArgumentParser(description="Teste de maratona em tempo simulado, procurando vazamento de memória.")
+    parser.add_argument("horas", nargs="?", type=float, default=2.0, help="horas simuladas")
+    parser.add_argument("--intervalo", type=float, default=INTERVALO_MARATONA, help="segundos simulados entre obstáculos")
+    parser.add_argument("--renderizar", action="store_true", help="converte cada pista na hora (um Sound novo por obstáculo)")
+    args = parser.parse_args()
+    horas, renderizar = args.horas, args.renderizar
+
+    amostras = maratona(horas, args.intervalo, renderizar)
+    ultima = amostras[-1]
+    print(f"{horas:g} h simuladas, {ultima['obstaculos']} obstáculos em {ultima['partidas']} partidas, "
+          f"até {ultima['max_pendentes']} no ar, {ultima['real']:.1f} s reais "
+          f"({'conversão na hora' if renderizar else 'banco de pistas'})")
+    print(f"{'tempo (min)':>11s} {'tracemalloc (KiB)':>18s} {'RSS (MiB)':>10s} {'Sounds':>7s}")
+    passo = max(1, len(amostras) // 12)
+    for amostra in amostras[::passo] + ([ultima] if (len(amostras) - 1) % passo else []):
+        rss = f"{amostra['rss'] / 2 ** 20:10.1f}" if amostra["rss"] is not None else f"{'-':>10s}"
+        print(f"{amostra['tempo'] / 60:11.0f} {amostra['tracemalloc'] / 1024:18.1f} {rss} {amostra['sons']:7d}")
+
+    tempos = [a["tempo"] for a in amostras]
+    falhas = []
+    for chave, limite, unidade, escala in (("tracemalloc", LIMITE_TRACEMALLOC, "KiB", 1024),
+                                           ("rss", LIMITE_RSS, "MiB", 2 ** 20),
+                                           ("sons", LIMITE_SONS, "Sounds", 1)):
+        if any(a[chave] is None for a in amostras):
+            continue
+        crescimento, falhou = crescimento_sustentado(tempos, [a[chave] for a in amostras], limite)
+        print(f"{chave}: crescimento depois do aquecimento {crescimento / escala:+.1f} {unidade}{' (FALHA)' if falhou else ''}")
+        if falhou:
+            falhas.append(chave)
+    sys.exit(1 if falhas else 0)
@@ -0,0 +1,191 @@
+# -*- coding: utf-8 -*-
+"""
+Pacote de sons pré-decodificados.
+
+O passo de build decodifica todos os sons (WAV e os MP3 curtos) para o
+formato nativo do mixer (44.1 kHz, int16, estéreo) e grava tudo num único
+arquivo indexado. No jogo, o arquivo é mapeado em memória e cada Sound é
+criado a partir de uma fatia (memoryview) do mapa, sem decodificar nem
+copiar no lado do Python. O pygame copia a fatia para o seu próprio buffer,
+e então as páginas do mapa são devolvidas ao sistema (madvise), para que o
+som não fique residente duas vezes.
+
+O índice guarda o formato do mixer e, de cada arquivo de origem, o caminho,
+o tamanho e o mtime_ns (e um hash do conteúdo, calculado só no build). Na
+abertura basta um os.stat por arquivo: se algum mudar, o pacote é considerado
+inválido e o jogo volta a decodificar os arquivos (e reconstrói o pacote em
+segundo plano).
+
+Uso (build): python pacote_sons.py
+"""
+import hashlib
+import json
+import mmap
+import os
+import struct
+import sys
+
+import pygame
+
+ARQUIVO_PACOTE = "sons.ccpk"
+MAGICO = b"CCPK"
+VERSAO = 2
+
+# Mágico, versão, tamanho do índice JSON
+CABECALHO = struct.Struct("<4sII")
+
+# Cada som começa numa fronteira de página, para o madvise liberar só as suas páginas
+ALINHAMENTO = mmap.PAGESIZE
+
+FORMATO_NATIVO = (44100, -16, 2)
+
+# Sons que continuam em streaming pelo mixer.music e ficam fora do pacote
+FORA_DO_PACOTE = ("musica",)
+
+
+def fontes_do_pacote(sons_paths):
+    """Lista, sem repetição e em ordem estável, os arquivos que vão para o pacote."""
+    caminhos = []
+    for chave, valor in sons_paths.items():
+        if chave in FORA_DO_PACOTE:
+            continue
+        for caminho in (valor if isinstance(valor, list) else [valor]):
+            if caminho not in caminhos:
+                caminhos.append(caminho)
+    return caminhos
+
+
+def assinatura_fontes(caminhos):
+    """[caminho, tamanho, mtime_ns] de cada arquivo de origem (tamanho e mtime None se ausente)."""
+    assinatura = []
+    for caminho in caminhos:
+        try:
+            info = os.stat(os.path.join(os.getcwd(), caminho))
+            assinatura.append([caminho, info.st_size, info.st_mtime_ns])
+        except OSError:
+            assinatura.append([caminho, None, None])
+    return assinatura
+
+
+def hash_fontes(caminhos, formato=FORMATO_NATIVO):
+    """Hash do conteúdo dos arquivos de origem e do formato do mixer."""
+    h = hashlib.sha256(repr((VERSAO, tuple(formato))).encode())
+    for caminho in caminhos:
+        h.update(caminho.encode("utf-8") + b"\0")
+        try:
+            with open(os.path.join(os.getcwd(), caminho), "rb") as arquivo:
+                h.update(arquivo.read())
+        except OSError:
+            h.update(b"<ausente>")
+    return h.hexdigest()
+
+
+def construir_pacote(caminhos, destino=ARQUIVO_PACOTE):
+    """
+    Decodifica os arquivos com o mixer já inicializado no formato nativo e
+    grava o pacote. Escreve num arquivo temporário e renomeia no fim.
+    """
+    formato = pygame.mixer.get_init()
+    # Antes de decodificar: um arquivo alterado durante o build deixa o pacote desatualizado
+    fontes = assinatura_fontes(caminhos)
+    entradas = {}
+    blocos = []
+    deslocamento = 0
+    for caminho in caminhos:
+        try:
+            bruto = pygame.mixer.Sound(os.path.join(os.getcwd(), caminho)).get_raw()
+        except (pygame.error, FileNotFoundError):
+            continue # Som ausente fica fora do pacote e cai no carregamento normal
+        entradas[caminho] = [deslocamento, len(bruto)]
+        blocos.append(bruto)
+        deslocamento += len(bruto)
+        deslocamento += -deslocamento % ALINHAMENTO
+    indice = json.dumps({
+        "hash": hash_fontes(caminhos, formato),
+        "formato": list(formato),
+        "fontes": fontes,
+        "entradas": entradas,
+    }).encode("utf-8")
+
+    inicio_dados = CABECALHO.size + len(indice)
+    inicio_dados += -inicio_dados % ALINHAMENTO
+
+    temporario = destino + ".tmp"
+    with open(temporario, "wb") as arquivo:
+        arquivo.write(CABECALHO.pack(MAGICO, VERSAO, len(indice)))
+        arquivo.write(indice)
+        for (caminho, (offset, tamanho)), bruto in zip(entradas.items(), blocos):
+            arquivo.seek(inicio_dados + offset)
+            arquivo.write(bruto)
+    os.replace(temporario, destino)
+    return destino
+
+
+class PacoteSons:
+    """Pacote mapeado em memória; som() cria um Sound a partir de uma fatia do mapa."""
+
+    def __init__(self, caminho, mapa, inicio_dados, entradas):
+        self.caminho = caminho
+        self.mapa = mapa
+        self.visao = memoryview(mapa)
+        self.inicio_dados = inicio_dados
+        self.entradas = entradas
+
+    def __contains__(self, caminho):
+        return caminho in self.entradas
+
+    def som(self, caminho):
+        """Cria o Sound do arquivo 'caminho'; retorna None se ele não estiver no pacote."""
+        entrada = self.entradas.get(caminho)
+        if entrada is None:
+            return None
+        inicio = self.inicio_dados + entrada[0]
+        som = pygame.mixer.Sound(buffer=self.visao[inicio:inicio + entrada[1]])
+        if hasattr(mmap, "MADV_DONTNEED"):
+            # O pygame já copiou as amostras: as páginas do mapa não precisam ficar residentes
+            tamanho_alinhado = entrada[1] + (-entrada[1] % ALINHAMENTO)
+            self.mapa.madvise(mmap.MADV_DONTNEED, inicio, min(tamanho_alinhado, len(self.mapa) - inicio))
+        return som
+
+    def fechar(self):
+        self.visao.release()
+        self.mapa.close()
+
+
+def abrir_pacote(caminhos, arquivo=ARQUIVO_PACOTE):
+    """
+    Abre e valida o pacote para a lista de arquivos de origem. Retorna None
+    se ele não existir, estiver corrompido ou se algum arquivo de origem mudou
+    de tamanho ou de mtime (só os.stat: o conteúdo não é lido).
+    """
+    try:
+        with open(arquivo, "rb") as f:
+            mapa = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    except (OSError, ValueError):
+        return None
+    try:
+        magico, versao, tamanho_indice = CABECALHO.unpack_from(mapa, 0)
+        if magico != MAGICO or versao != VERSAO:
+            raise ValueError("pacote de versão diferente")
+        indice = json.loads(bytes(mapa[CABECALHO.size:CABECALHO.size + tamanho_indice]))
+        formato = tuple(indice["formato"])
+        if formato != tuple(pygame.mixer.get_init() or ()) or indice["fontes"] != assinatura_fontes(caminhos):
+            raise ValueError("pacote desatualizado")
+    except (ValueError, KeyError, struct.error):
+        mapa.close()
+        return None
+    inicio_dados = CABECALHO.size + tamanho_indice
+    inicio_dados += -inicio_dados % ALINHAMENTO
+    return PacoteSons(arquivo, mapa, inicio_dados, indice["entradas"])
+
+
+if __name__ == "__main__":
+    os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+    os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+    os.chdir(os.path.dirname(os.path.abspath(__file__)))
+    import play # Traz sons_paths
+    play.inicializar_audio() # Mixer no formato do jogo, sem carregar os sons
+
+    caminhos = fontes_do_pacote(play.sons_paths)
+    destino = construir_pacote(caminhos, sys.argv[1] if len(sys.argv) > 1 else ARQUIVO_PACOTE)
+    print(f"{len(caminhos)} sons em {destino} ({os.path.getsize(destino) / 1024:.0f} KiB)")
@@ -0,0 +1,262 @@
+# -*- coding: utf-8 -*-
+"""
+Placar local: as partidas jogadas num banco SQLite.
+
+O banco fica em modo WAL, com índices por dificuldade e pontos, por data e
+por jogador, para o menu ler os melhores resultados e o recorde pessoal sem
+varrer a tabela. Quem registra uma partida só a põe na fila (registrar()
+nunca bloqueia); uma thread dedicada grava as partidas em lotes, numa
+transação por lote, e roda as tarefas lentas do fim de jogo (nome do
+computador, área de transferência) fora do loop principal.
+
+Uso: python placar.py [dificuldade] [quantidade]
+     python placar.py --carga [partidas]   (mede registro e consultas num banco temporário)
+"""
+import os
+import socket
+import sqlite3
+import sys
+import threading
+import time
+from collections import deque
+from datetime import datetime
+
+ARQUIVO_PLACAR = "placar.db"
+
+# Partidas gravadas por transação e espera máxima de uma partida na fila
+TAMANHO_LOTE = 32
+INTERVALO_GRAVACAO = 0.5
+
+COLUNAS = ("data", "jogador", "dificuldade", "pontos", "nivel", "colisoes", "vidas_extra",
+           "obstaculos", "duracao", "semente", "concluida", "gravacao")
+
+ESQUEMA = """
+CREATE TABLE IF NOT EXISTS partidas (
+    id INTEGER PRIMARY KEY,
+    data TEXT NOT NULL,
+    jogador TEXT NOT NULL,
+    dificuldade INTEGER NOT NULL,
+    pontos INTEGER NOT NULL,
+    nivel INTEGER NOT NULL,
+    colisoes INTEGER NOT NULL,
+    vidas_extra INTEGER NOT NULL,
+    obstaculos INTEGER NOT NULL,
+    duracao REAL NOT NULL,
+    semente TEXT,
+    concluida INTEGER NOT NULL,
+    gravacao TEXT
+);
+CREATE INDEX IF NOT EXISTS partidas_dificuldade_pontos ON partidas (dificuldade, pontos DESC);
+CREATE INDEX IF NOT EXISTS partidas_data ON partidas (data);
+CREATE INDEX IF NOT EXISTS partidas_jogador_pontos ON partidas (jogador, dificuldade, pontos DESC);
+"""
+
+INSERIR = f"INSERT INTO partidas ({', '.join(COLUNAS)}) VALUES ({', '.join('?' * len(COLUNAS))})"
+
+
+def abrir_banco(caminho):
+    conexao = sqlite3.connect(caminho, timeout=5.0)
+    conexao.row_factory = sqlite3.Row
+    conexao.execute("PRAGMA journal_mode=WAL")
+    conexao.execute("PRAGMA synchronous=NORMAL") # No WAL, só o checkpoint sincroniza o disco
+    conexao.executescript(ESQUEMA)
+    return conexao
+
+
+def nome_computador():
+    try:
+        return socket.gethostname()
+    except OSError:
+        return "desconhecido"
+
+
+class PlacarSessoes:
+    """
+    Fila de partidas a gravar e a thread que as grava. As consultas usam uma
+    conexão própria de leitura (no WAL, leitura e gravação não se bloqueiam).
+    O jogador padrão é o nome do computador, descoberto na thread do placar.
+    """
+
+    def __init__(self, caminho=ARQUIVO_PLACAR, tamanho_lote=TAMANHO_LOTE, intervalo=INTERVALO_GRAVACAO):
+        self.caminho = caminho
+        self.tamanho_lote = tamanho_lote
+        self.intervalo = intervalo
+        self.condicao = threading.Condition()
+        self.fila = deque()
+        self.tarefas = deque()
+        self.vazia = threading.Event()
+        self.vazia.set()
+        self.rodando = True
+        self.jogador = None
+        self.leitura = None
+        self.gravadas = 0
+        self.lotes = 0
+        self.erros = 0
+        self.thread = threading.Thread(target=self._executar, name="placar", daemon=True)
+        self.thread.start()
+
+    def registrar(self, partida):
+        """Enfileira uma partida (dicionário com as COLUNAS; data e jogador são opcionais)."""
+        partida.setdefault("data", datetime.now().isoformat(timespec="seconds"))
+        with self.condicao:
+            self.fila.append(partida)
+            self.vazia.clear()
+            if len(self.fila) == 1 or len(self.fila) >= self.tamanho_lote:
+                self.condicao.notify()
+
+    def enviar_tarefa(self, tarefa):
+        """Roda tarefa(placar) na thread do placar (ex.: copiar o resultado para a área de transferência)."""
+        with self.condicao:
+            self.tarefas.append(tarefa)
+            self.vazia.clear()
+            self.condicao.notify()
+
+    def nome_jogador(self):
+        """Nome do jogador (o do computador); chamado da thread do placar, onde gethostname pode demorar."""
+        if self.jogador is None:
+            self.jogador = nome_computador()
+        return self.jogador
+
+    def aguardar(self, timeout=None):
+        """Espera as partidas e tarefas enfileiradas terminarem. Retorna True se terminaram."""
+        with self.condicao:
+            self.condicao.notify()
+        return self.vazia.wait(timeout)
+
+    def _executar(self):
+        conexao = None
+        self.nome_jogador() # Antes de qualquer consulta: recorde_pessoal não resolve o nome fora daqui
+        while True:
+            with self.condicao:
+                while self.rodando and not self.tarefas and not self.fila:
+                    self.condicao.wait()
+                if self.rodando and not self.tarefas and len(self.fila) < self.tamanho_lote:
+                    self.condicao.wait(self.intervalo) # Junta mais partidas no mesmo lote
+                lote = [self.fila.popleft() for _ in range(min(len(self.fila), self.tamanho_lote))]
+                tarefas = list(self.tarefas)
+                self.tarefas.clear()
+                rodando = self.rodando
+
+            if lote:
+                try:
+                    if conexao is None:
+                        conexao = abrir_banco(self.caminho)
+                    jogador = self.nome_jogador()
+                    with conexao: # Uma transação por lote
+                        conexao.executemany(INSERIR, [
+                            tuple(partida.get("jogador", jogador) if coluna == "jogador" else partida.get(coluna)
+                                  for coluna in COLUNAS)
+                            for partida in lote])
+                    self.gravadas += len(lote)
+                    self.lotes += 1
+                except (sqlite3.Error, OSError) as e:
+                    # print(f"AVISO: Falha ao gravar {len(lote)} partidas no placar: {e}")
+                    self.erros += 1
+
+            for tarefa in tarefas:
+                try:
+                    tarefa(self)
+                except Exception as e:
+                    # print(f"AVISO: Erro numa tarefa do placar: {e}")
+                    pass
+
+            with self.condicao:
+                if not self.fila and not self.tarefas:
+                    self.vazia.set()
+                    if not rodando:
+                        break
+        if conexao is not None:
+            conexao.close()
+
+    def _consultar(self, sql, parametros):
+        if self.leitura is None:
+            self.leitura = abrir_banco(self.caminho)
+        return self.leitura.execute(sql, parametros).fetchall()
+
+    def melhores(self, dificuldade, quantidade=3):
+        """As 'quantidade' maiores pontuações de partidas concluídas na dificuldade."""
+        try:
+            return self._consultar(
+                "SELECT jogador, pontos, nivel, data FROM partidas "
+                "WHERE dificuldade = ? AND concluida = 1 ORDER BY pontos DESC LIMIT ?",
+                (dificuldade, quantidade))
+        except sqlite3.Error:
+            return []
+
+    def recorde_pessoal(self, dificuldade, jogador=None):
+        """
+        Maior pontuação do jogador (padrão: este computador) na dificuldade, ou None.
+        Sem jogador, e enquanto a thread do placar ainda não descobriu o nome, retorna None.
+        """
+        jogador = jogador or self.jogador
+        if jogador is None:
+            return None
+        try:
+            linhas = self._consultar(
+                "SELECT jogador, pontos, nivel, data FROM partidas "
+                "WHERE jogador = ? AND dificuldade = ? AND concluida = 1 ORDER BY pontos DESC LIMIT 1",
+                (jogador, dificuldade))
+        except sqlite3.Error:
+            return None
+        return linhas[0] if linhas else None
+
+    def contadores(self):
+        return {"gravadas": self.gravadas, "lotes": self.lotes, "erros": self.erros, "na_fila": len(self.fila)}
+
+    def encerrar(self, timeout=2.0):
+        """Grava o que ainda estiver na fila e para a thread."""
+        with self.condicao:
+            self.rodando = False
+            self.condicao.notify()
+        self.thread.join(timeout)
+        if self.leitura is not None:
+            self.leitura.close()
+            self.leitura = None
+
+
+if __name__ == "__main__":
+    os.chdir(os.path.dirname(os.path.abspath(__file__)))
+    from simulacao import DIFICULDADES, config_dificuldade
+
+    if "--carga" in sys.argv:
+        # Registra partidas sintéticas num banco temporário e mede o custo de cada etapa
+        import random
+        import tempfile
+        partidas = int(sys.argv[sys.argv.index("--carga") + 1]) if len(sys.argv) > sys.argv.index("--carga") + 1 else 20000
+        pasta = tempfile.mkdtemp()
+        placar = PlacarSessoes(os.path.join(pasta, "placar.db"))
+        rng = random.Random(1)
+        inicio = time.perf_counter()
+        pior = 0.0
+        for i in range(partidas):
+            antes = time.perf_counter()
+            placar.registrar({"jogador": f"jogador{rng.randrange(50)}", "dificuldade": rng.randint(1, 4),
+                              "pontos": rng.randrange(300), "nivel": 1, "colisoes": 3, "vidas_extra": 0,
+                              "obstaculos": 100, "duracao": 60.0, "semente": i, "concluida": 1, "gravacao": None})
+            pior = max(pior, time.perf_counter() - antes)
+        registro = time.perf_counter() - inicio
+        placar.aguardar()
+        gravacao = time.perf_counter() - inicio
+        antes = time.perf_counter()
+        for _ in range(1000):
+            placar.melhores(rng.randint(1, 4), 5)
+        consulta = (time.perf_counter() - antes) / 1000
+        antes = time.perf_counter()
+        for _ in range(1000):
+            placar.recorde_pessoal(rng.randint(1, 4), f"jogador{rng.randrange(50)}")
+        recorde = (time.perf_counter() - antes) / 1000
+        c = placar.contadores()
+        placar.encerrar()
+        print(f"registrar: {registro / partidas * 1e6:.1f} us por partida (pior {pior * 1e6:.0f} us)")
+        print(f"gravação: {partidas} partidas em {c['lotes']} lotes, {gravacao:.2f} s até o disco")
+        print(f"melhores: {consulta * 1e6:.0f} us; recorde pessoal: {recorde * 1e6:.0f} us")
+        sys.exit(1 if c["erros"] else 0)
+
+    dificuldades = [int(sys.argv[1])] if len(sys.argv) > 1 else list(DIFICULDADES)
+    quantidade = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+    placar = PlacarSessoes()
+    for dificuldade in dificuldades:
+        print(config_dificuldade(dificuldade).texto)
+        for posicao, linha in enumerate(placar.melhores(dificuldade, quantidade), 1):
+            print(f"  {posicao}. {linha['pontos']:4d} pontos, nível {linha['nivel']:2d}, {linha['jogador']}, {linha['data']}")
+    placar.encerrar()
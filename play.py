@@ -1,177 +1,185 @@
 # -*- coding: utf-8 -*-
+import time
+INICIO_IMPORTACAO = time.perf_counter() # Origem da linha do tempo da abertura
+
 import pygame
 import random
-import time
-import numpy as np
-import pyttsx3
-import pyperclip
 from datetime import datetime
 import threading
-import socket
 import os
 import sys
+from collections import deque
+
+from banco_sons import BancoSonsDirecionais, renderizar_direcional
+from carregador_sons import SonsCarregados, carregar_som
+from cache_fala import CacheFrases
+from calibracao import (BUFFER_PADRAO, buffer_calibrado, carregar_calibracao, gerar_clique, janela_compensada,
+                        medir_latencia_toque, menor_buffer_estavel, salvar_calibracao)
+from canais import GerenciadorCanais, prioridade_resposta
+from fala import PRIORIDADE_ALTA, PRIORIDADE_NORMAL, FilaFala, criar_backend
+from pacote_sons import abrir_pacote, construir_pacote, fontes_do_pacote
+from placar import PlacarSessoes
+from gravacao import GravadorSessao, caminho_nova_gravacao
+from instrumentacao import LinhaTempo, criar_perfil, resumo_importtime
+from simulacao import ACAO_CERTA, DIFICULDADES, MAX_COLISOES, MotorJogo, RelogioReal, config_dificuldade, linha_do_tempo
+from telemetria import RegistroLatencias
+from transmissao import criar_transmissao
 
 # Variáveis Globais de Controle
 jogo_encerrar = False
+inicializado = False
+
+# Fases da abertura (importação, mixer, janela, primeira fala, sons prontos), desde o início da importação
+linha_tempo = LinhaTempo(INICIO_IMPORTACAO)
+
+# Instrumentação do loop (CORRIDA_CEGA_PERFIL=1 ou --perfil): quadros, sons, fila de fala
+# e espera no lock da fala, exportados como trace do Chrome no fim. Desligada não mede nada.
+perfil = criar_perfil()
+
+# Transmissão ao vivo dos eventos da partida (CORRIDA_CEGA_TRANSMISSAO=endereço ou --transmitir):
+# JSON por linha para narradores e painéis, sem nunca segurar o loop. Criada em inicializar().
+transmissao = None
 
 # Variáveis Globais de Debounce
 last_home_press_time = 0
 last_v_press_time = 0
 debounce_interval = 0.3
 
-# Configuração de Voz SAPI, pyttsx3
-voz_sapi = None
-voz_sapi_ocupada = False # Variável global controlada pelos callbacks
-voz_sapi_lock = threading.Lock()
-voz_sapi_terminou_evento = threading.Event()
+# Áudio espacial (pan de potência constante + atraso interaural) nas pistas dos obstáculos
+# (CORRIDA_CEGA_ESPACIAL=1 ou --espacial). Desligado por padrão: mantém o pan fixo original do jogo.
+usar_audio_espacial = os.environ.get("CORRIDA_CEGA_ESPACIAL") == "1" or "--espacial" in sys.argv
+motor_espacial = None
 
-# NOVA THREAD PARA EXECUTAR O SAPI
-sapi_thread = None
+# Pan fixo das pistas aplicado pelo volume esquerdo/direito do canal, sobre a única
+# cópia de cada som (sem áudio espacial). Desligado: uma cópia paneada por direção.
+pan_por_volume = True
 
-def run_sapi_engine():
-    """Função para ser executada na thread persistente do SAPI."""
-    global voz_sapi
-    if voz_sapi:
-        try:
-            # print("DEBUG: [SAPI ENGINE THREAD] Iniciando runAndWait em thread dedicada.")
-            voz_sapi.runAndWait() # Loop principal do SAPI
-            # print("DEBUG: [SAPI ENGINE THREAD] runAndWait terminou.")
-        except Exception as e:
-            # print(f"ERRO: [SAPI ENGINE THREAD] Exceção na thread do SAPI: {e}")
-            global jogo_encerrar
-            jogo_encerrar = True # Se o motor falha, encerra o jogo
+# Modo de medição de CPU por janela de reação (CORRIDA_CEGA_MEDIR_CPU=1)
+medir_cpu_reacao = os.environ.get("CORRIDA_CEGA_MEDIR_CPU") == "1"
+medicoes_cpu_reacao = [] # (tempo de CPU, tempo de parede) de cada janela
 
-def inicializar_voz_sapi():
-    """Inicializa o pyttsx3 (SAPI) de forma segura e inicia sua thread."""
-    global voz_sapi, jogo_encerrar, sapi_thread, voz_sapi_ocupada
+# Volume da música de fundo: normal e abaixado durante os jingles (ducking)
+VOLUME_MUSICA = 0.7
+VOLUME_MUSICA_ABAIXADA = 0.2
+DURACAO_RAMPA_MUSICA = 0.3
+medicoes_transicao = [] # (jingle, latência até começar a tocar, lacuna até a música voltar)
 
-    try:
-        voz_sapi = pyttsx3.init(driverName='sapi5', debug=False)
-        voz_sapi.setProperty('rate', 225)
-        voz_sapi.connect('finished-utterance', on_speech_end)
+# Duração da janela de reação a cada obstáculo, em segundos
+tempo_janela_reacao = 0.7
 
-        # Inicia a thread do motor do SAPI UMA VEZ
-        sapi_thread = threading.Thread(target=run_sapi_engine, daemon=True)
-        sapi_thread.start()
-        # print("INFO: Thread para runAndWait do pyttsx3 iniciada.")
+# Calibração da saída de áudio deste computador (calibracao.json, opção C do menu):
+# buffer do mixer e latência medida por toque, somada à janela de reação
+calibracao_audio = {}
 
-        # Teste rápido do SAPI após inicialização da thread
-        try:
-            # print("DEBUG: [SAPI TESTE] Tentando uma fala de teste após inicialização da thread do SAPI...")
-            voz_sapi.say("Carregando...")
+# Latência (início da pista -> tecla) de cada obstáculo, por direção e dificuldade.
+# Com CORRIDA_CEGA_TELEMETRIA=1 os percentis são impressos no fim do jogo.
+registro_latencias = None # Criado em inicializar()
+resumo_latencias = None
+imprimir_telemetria = os.environ.get("CORRIDA_CEGA_TELEMETRIA") == "1"
+
+# Placar local (placar.db): partidas gravadas em lotes numa thread própria (criado em inicializar())
+placar_sessoes = None
+
+# Configuração de Voz: fila de fala com prioridade numa thread dedicada (fala.py).
+# O backend vem de CORRIDA_CEGA_VOZ (sapi5, espeak, nsss, nulo, gravacao); padrão SAPI no Windows.
+fila_fala = None
+cache_frases = None
+voz_sapi_lock = perfil.medir_lock(threading.Lock(), "voz_sapi_lock") # Protege a fila de fala e as paradas do backend
+voz_sapi_terminou_evento = threading.Event() # Ligado quando não há fala tocando nem na fila
+voz_sapi_terminou_evento.set()
 
-            # Aguarda o evento de término da fala de teste ou um timeout
-            # test_start = time.time() # Variável não usada
-            voz_sapi_terminou_evento.wait(timeout=2.0) # Espera até 2 segundos para a fala de teste terminar
+# Fim de cada fala, postado pela thread de fala na fila de eventos do Pygame
+EVENTO_FALA_TERMINOU = pygame.USEREVENT + 1
 
-            if voz_sapi_ocupada: # Se ainda estiver ocupado após o wait, algo deu errado
-                # print("AVISO: [SAPI TESTE] A fala de teste inicial não foi concluída. SAPI pode estar com problemas.")
-                voz_sapi.stop()
-                voz_sapi_ocupada = False
-                voz_sapi_terminou_evento.set()
-            # else:
-                # print("DEBUG: [SAPI TESTE] Fala de teste inicial aparentemente bem-sucedida.")
+# Mensagem do servidor de corrida (--rede) na fila: acorda o loop do jogo em rede
+EVENTO_REDE = pygame.USEREVENT + 2
 
-        except Exception as test_e:
-            # print(f"AVISO: [SAPI TESTE] Falha na fala de teste inicial do SAPI: {test_e}. SAPI pode não funcionar.")
-            pass # Não mostra erros de teste para o usuário final
+# Teclas digitadas nos menus e ainda não lidas (quem digita rápido não perde teclas)
+teclas_menu = deque()
 
-        # print("INFO: pyttsx3 (SAPI) inicializado com sucesso.")
+def inicializar_voz_sapi(backend=None, aguardar=True):
+    """
+    Cria o backend de fala e inicia a thread da fila. Sem voz, o jogo não continua.
+    Com aguardar=False não espera o motor de voz subir: quem chama confere depois com
+    fila_fala.pronta(), e o resto da abertura corre em paralelo com ele.
+    """
+    global fila_fala, jogo_encerrar
+
+    try:
+        fila_fala = FilaFala(backend or criar_backend(), ao_terminar=ao_terminar_fala, lock=voz_sapi_lock, ociosa=voz_sapi_terminou_evento)
+        fila_fala.iniciar(timeout=0)
+
+        # Primeira fala: sai assim que o motor de voz estiver pronto, sem esperar o resto da abertura
+        fila_fala.falar("Carregando...")
+
+        # Cache de frases montado na thread de fala, nos intervalos entre as falas
+        fila_fala.enviar_tarefa(preparar_cache_frases)
+
+        if aguardar and not fila_fala.pronta(timeout=5.0):
+            raise RuntimeError(fila_fala.erro_inicio)
+        # print("INFO: Fila de fala inicializada com sucesso.")
 
     except Exception as e:
-        # print(f"ERRO CRÍTICO: Falha ao inicializar pyttsx3 (SAPI): {e}. O jogo não pode continuar sem voz.")
-        voz_sapi = None
+        # print(f"ERRO CRÍTICO: Falha ao inicializar a voz: {e}. O jogo não pode continuar sem voz.")
+        fila_fala = None
         jogo_encerrar = True
 
-def on_speech_end(name, completed):
-    """Callback chamado pelo pyttsx3 quando uma fala é concluída."""
-    global voz_sapi_ocupada
-    with voz_sapi_lock:
-        voz_sapi_ocupada = False
-        voz_sapi_terminou_evento.set()
-        # print(f"DEBUG: [FALA CALLBACK] Fala '{name}' concluída. voz_sapi_ocupada resetada para False via callback.")
+def preparar_cache_frases(backend):
+    """Tarefa da thread de fala: abre o cache da voz atual e agenda a renderização das frases fixas."""
+    global cache_frases
+    cache_frases = CacheFrases(backend.identificador(), backend.taxa, canais=canais)
+    fila_fala.cache = cache_frases
+    for frase in FRASES_FIXAS:
+        fila_fala.enviar_tarefa(lambda backend, frase=frase: cache_frases.renderizar(backend, frase))
+
+def voz_sapi_ocupada():
+    """True enquanto houver fala tocando ou esperando na fila."""
+    return fila_fala is not None and fila_fala.ocupada()
 
 
 # Funções de Fala Universais
 
-def falar_universal(texto, prioridade=False):
+def falar_universal(texto, prioridade=False, chave=None):
     """
-    Função principal para todas as falas do jogo.
-    Utiliza exclusivamente o SAPI (pyttsx3) de forma assíncrona e não bloqueante.
-    Se 'prioridade' for True, tentará interromper a fala atual para falar este texto.
+    Função principal para todas as falas do jogo. Só enfileira o texto e retorna
+    a mensagem (ou None), que volta no evento EVENTO_FALA_TERMINOU quando a fala acaba.
+    Se 'prioridade' for True, interrompe a fala atual e passa na frente da fila.
+    'chave' agrupa falas que envelhecem (ex.: "vidas"): a nova substitui a antiga ainda na fila.
     """
-    global voz_sapi_ocupada
-    if voz_sapi is None:
-        # print(f"AVISO: Tentativa de falar '{texto}', mas SAPI não está inicializado.")
-        return
-
-    with voz_sapi_lock:
-        if voz_sapi_ocupada:
-            if prioridade:
-                # print(f"DEBUG: [FALA] Prioridade ativada. Parando fala atual para '{texto}'.")
-                try:
-                    voz_sapi.stop()
-                    time.sleep(0.05)
-                except RuntimeError as e:
-                    # print(f"AVISO: [FALA] RuntimeError ao tentar parar SAPI para prioridade: {e}")
-                    pass
-                finally:
-                    voz_sapi_ocupada = False
-                    voz_sapi_terminou_evento.set()
-            # else:
-                # print(f"DEBUG: [FALA] SAPI já ocupado. Não pode falar '{texto}' agora.")
-                return
-
-        if not voz_sapi_ocupada:
-            voz_sapi_ocupada = True
-            voz_sapi_terminou_evento.clear()
-            # print(f"DEBUG: [FALA] Solicitando fala: '{texto}' (voz_sapi_ocupada=True)")
-
-            voz_sapi.say(texto)
+    if fila_fala is None:
+        # print(f"AVISO: Tentativa de falar '{texto}', mas a voz não está inicializada.")
+        return None
+    return fila_fala.falar(texto, PRIORIDADE_ALTA if prioridade else PRIORIDADE_NORMAL, chave)
 
 
 def parar_fala_voz():
     """
-    Interrompe a fala atual do SAPI de forma imediata e reseta a flag de ocupação.
-    Também limpa o buffer de eventos do Pygame.
+    Interrompe a fala atual e descarta as falas na fila.
+    Não mexe nos eventos do Pygame: teclas digitadas durante a fala continuam valendo.
     """
-    global voz_sapi_ocupada
-    if voz_sapi is not None:
-        with voz_sapi_lock:
-            if voz_sapi_ocupada:
-                try:
-                    voz_sapi.stop()
-                    # print("DEBUG: [FALA] SAPI stop() chamado.")
-                    time.sleep(0.05)
-                except RuntimeError as e:
-                    # print(f"AVISO: [FALA] RuntimeError ao tentar parar SAPI: {e}")
-                    pass
-                finally:
-                    voz_sapi_ocupada = False
-                    voz_sapi_terminou_evento.set()
-                    # print("DEBUG: [FALA] voz_sapi_ocupada resetada para False na parada.")
-    pygame.event.clear()
-
-# Inicialização do Pygame
-try:
-    pygame.init()
-    # print("INFO: Pygame inicializado.")
-except Exception as e:
-    # print(f"ERRO CRÍTICO: Falha ao inicializar Pygame: {e}. O jogo não pode ser executado.")
-    sys.exit(1)
-
-try:
-    pygame.mixer.init(frequency=44100, size=-16, channels=2, buffer=512)
-    # print("INFO: Pygame Mixer inicializado.")
-except Exception as e:
-    # print(f"ERRO CRÍTICO: Falha ao inicializar Pygame Mixer: {e}. Verifique sua placa de som ou drivers.")
-    sys.exit(1)
-
-# Tela do Pygame (Aumentada para maior compatibilidade)
-tela = pygame.display.set_mode((100, 100))
-pygame.display.set_caption("Corrida Cega")
-# print("INFO: Janela do Pygame criada com tamanho (100, 100).")
+    if fila_fala is not None:
+        fila_fala.parar()
 
+def ao_terminar_fala(mensagem, concluida):
+    """Chamado na thread de fala: avisa o loop de eventos que uma fala terminou."""
+    try:
+        pygame.event.post(pygame.event.Event(EVENTO_FALA_TERMINOU, mensagem=mensagem, concluida=concluida))
+    except pygame.error:
+        pass # Pygame já encerrado
+
+# Subsistemas do Pygame, criados em inicializar(): importar o play.py não inicializa nada
+canais = None
+canal_jingles = None
+tela = None
+
+# Teclas de jogo e a ação correspondente no MotorJogo
+TECLAS_ACOES = {
+    pygame.K_RIGHT: "seta_direita",
+    pygame.K_LEFT: "seta_esquerda",
+    pygame.K_UP: "seta_cima",
+    pygame.K_DOWN: "seta_baixo",
+    pygame.K_RCTRL: "ctrl_direito",
+}
 
 # Caminhos dos Sons
 sons_paths = {
@@ -194,69 +202,235 @@ sons_paths = {
     "teste_autofalante_base": "sons/obstaculo_1.wav"
 }
 
-# Carregar Sons
-loaded_sounds = {}
-for key, value in sons_paths.items():
-    if isinstance(value, list):
-        loaded_sounds[key] = []
-        for f_path in value:
-            try:
-                full_path = os.path.join(os.getcwd(), f_path)
-                loaded_sounds[key].append(pygame.mixer.Sound(full_path))
-                # print(f"INFO: Som '{f_path}' carregado com sucesso.")
-            except pygame.error as e:
-                # print(f"ERRO: Falha ao carregar som '{f_path}' para '{key}': {e}. Este som pode não tocar.")
-                loaded_sounds[key].append(None)
-            except FileNotFoundError:
-                # print(f"ERRO: Arquivo de som '{f_path}' não encontrado para '{key}'. Este som não tocará.")
-                loaded_sounds[key].append(None)
-    elif key not in ["musica", "instrucoes", "inicio", "fim"]:
+# Pacote de sons pré-decodificados (python pacote_sons.py); None se ausente ou desatualizado
+pacote_sons = None
+
+# Sons carregados e banco de pistas, criados em inicializar_sons()
+loaded_sounds = None
+banco_sons = None
+futuro_banco_sons = None
+
+def carregar_som_do_pacote(caminho):
+    """Cria o Sound a partir do pacote mapeado em memória; sem pacote, decodifica o arquivo."""
+    if pacote_sons is not None and caminho in pacote_sons:
+        try:
+            return pacote_sons.som(caminho)
+        except Exception as e:
+            # print(f"AVISO: Falha ao ler '{caminho}' do pacote de sons: {e}")
+            pass
+    return carregar_som(caminho)
+
+def reconstruir_pacote_sons():
+    """Reconstrói o pacote para a próxima abertura do jogo (em segundo plano)."""
+    try:
+        construir_pacote(fontes_do_pacote(sons_paths))
+    except Exception as e:
+        # print(f"AVISO: Não foi possível gravar o pacote de sons: {e}")
+        pass # Pasta sem permissão de escrita, por exemplo: o jogo segue decodificando os arquivos
+
+def inicializar_audio():
+    """Pygame, mixer no formato do jogo e grupos de canais. Retorna False se o mixer não abrir."""
+    global canais, canal_jingles, jogo_encerrar, calibracao_audio
+    if canais is not None:
+        return True
+    try:
+        pygame.init()
+        # print("INFO: Pygame inicializado.")
+    except Exception as e:
+        # print(f"ERRO CRÍTICO: Falha ao inicializar Pygame: {e}. O jogo não pode ser executado.")
+        jogo_encerrar = True
+        return False
+
+    calibracao_audio = carregar_calibracao()
+    try:
         try:
-            full_path = os.path.join(os.getcwd(), value)
-            loaded_sounds[key] = pygame.mixer.Sound(full_path)
-            # print(f"INFO: Som '{value}' carregado com sucesso.")
-        except pygame.error as e:
-            # print(f"ERRO: Falha ao carregar som '{value}' para '{key}': {e}. Este som não tocará.")
-            loaded_sounds[key] = None
-        except FileNotFoundError:
-            # print(f"ERRO: Arquivo de som '{value}' não encontrado para '{key}'. Este som não tocará.")
-            loaded_sounds[key] = None
+            pygame.mixer.init(frequency=44100, size=-16, channels=2, buffer=buffer_calibrado(calibracao_audio))
+        except pygame.error:
+            pygame.mixer.init(frequency=44100, size=-16, channels=2, buffer=BUFFER_PADRAO) # Calibração de outro dispositivo
+        # print("INFO: Pygame Mixer inicializado.")
+    except Exception as e:
+        # print(f"ERRO CRÍTICO: Falha ao inicializar Pygame Mixer: {e}. Verifique sua placa de som ou drivers.")
+        jogo_encerrar = True
+        return False
+
+    # Canais do mixer em grupos por categoria (pistas, respostas, jingles, fala do cache),
+    # com prioridade e roubo de voz; a música de fundo continua no stream do mixer.music
+    canais = GerenciadorCanais()
+    canal_jingles = canais.canal("jingle")
+    return True
+
+def reabrir_mixer(buffer):
+    """Reabre o mixer com outro buffer (calibração). Os Sounds continuam válidos; os canais são reservados de novo."""
+    with canais.lock:
+        pygame.mixer.stop()
+        pygame.mixer.quit()
+        pygame.mixer.init(frequency=44100, size=-16, channels=2, buffer=buffer)
+        canais.reservar()
+
+def janela_reacao_jogo():
+    """Janela de reação da partida: a base mais a latência de saída calibrada neste computador."""
+    return janela_compensada(tempo_janela_reacao, calibracao_audio)
+
+def inicializar_sons():
+    """Abre o pacote de sons e começa a carregar os sons e o banco de pistas em segundo plano."""
+    global pacote_sons, loaded_sounds, banco_sons, futuro_banco_sons, motor_espacial
+    if loaded_sounds is not None:
+        return
+    pacote_sons = abrir_pacote(fontes_do_pacote(sons_paths))
+
+    # Carregar Sons: em segundo plano, os críticos primeiro; os demais no primeiro uso
+    loaded_sounds = SonsCarregados(sons_paths, carregar=carregar_som_do_pacote)
+
+    # Pré-renderiza as pistas direcionais dos obstáculos (uma vez, fora do loop do jogo),
+    # no mesmo pool, assim que os sons críticos estiverem carregados
+    banco_sons = BancoSonsDirecionais(canais, pan_por_volume=pan_por_volume and not usar_audio_espacial)
+    if usar_audio_espacial:
+        from audio_espacial import MotorEspacial
+        motor_espacial = MotorEspacial()
+        futuro_banco_sons = loaded_sounds.enviar(lambda: banco_sons.construir(loaded_sounds, renderizador=motor_espacial.renderizador_direcoes()))
+    else:
+        futuro_banco_sons = loaded_sounds.enviar(banco_sons.construir, loaded_sounds)
+
+    if pacote_sons is None:
+        loaded_sounds.enviar(reconstruir_pacote_sons) # Depois dos críticos e do banco, na fila do pool
+
+def inicializar(backend_fala=None, com_fala=True):
+    """
+    Inicializa os subsistemas na ordem em que o jogador precisa deles: mixer,
+    fala (o motor de voz sobe na thread de fala enquanto o resto continua),
+    janela, sons em segundo plano e placar. Nada espera por tempo fixo: a fala
+    e os sons avisam quando ficam prontos (fila_fala.pronta, sons_prontos).
+    Retorna False se algo essencial falhar. Chamadas repetidas não fazem nada.
+    """
+    global inicializado, tela, registro_latencias, placar_sessoes, transmissao
+    if inicializado:
+        return not jogo_encerrar
+    linha_tempo.marcar("importação")
+
+    if not inicializar_audio():
+        return False
+    linha_tempo.marcar("pygame e mixer")
 
+    if com_fala:
+        inicializar_voz_sapi(backend_fala, aguardar=False)
+        if jogo_encerrar:
+            return False
+        linha_tempo.marcar("thread de fala")
+
+    # Tela do Pygame (Aumentada para maior compatibilidade)
+    tela = pygame.display.set_mode((100, 100))
+    pygame.display.set_caption("Corrida Cega")
+    # print("INFO: Janela do Pygame criada com tamanho (100, 100).")
+    linha_tempo.marcar("janela")
+
+    inicializar_sons()
+    registro_latencias = RegistroLatencias()
+    placar_sessoes = PlacarSessoes()
+    transmissao = criar_transmissao()
+    linha_tempo.marcar("sons e placar em segundo plano")
+    inicializado = True
+    return True
+
+def sons_prontos():
+    """True quando os sons críticos e o banco de pistas já estão carregados."""
+    return loaded_sounds.criticos_prontos() and futuro_banco_sons.done()
+
+def aguardar_sons_prontos(timeout=15):
+    """
+    Barreira de prontidão: espera os sons críticos e o banco de pistas,
+    processando eventos para detectar QUIT/Escape. Retorna False se o jogo foi encerrado.
+    """
+    inicio = time.time()
+    while not sons_prontos() and time.time() - inicio < timeout:
+        loaded_sounds.aguardar_criticos(timeout=0.05)
+        get_all_pygame_events()
+        if jogo_encerrar:
+            return False
+    return not jogo_encerrar
 
 # Funções Auxiliares de Áudio e Voz
 
 def falar_pontuacao_total(pontos):
-    falar_universal(f"Sua pontuação é de {pontos} pontos.", prioridade=True)
+    falar_universal(f"Sua pontuação é de {pontos} pontos.", prioridade=True, chave="pontuacao")
 
 def falar_nivel_progresso(pontos_atuais):
     nivel = (pontos_atuais // 10) + 1
-    falar_universal(f"Nível {nivel}", prioridade=True)
+    falar_universal(f"Nível {nivel}", prioridade=True, chave="nivel")
+
+def texto_vidas_restantes(colisoes_restantes):
+    return f"Você tem {colisoes_restantes} vidas restantes." if colisoes_restantes != 1 else "Você tem 1 vida restante."
 
 def falar_vidas_restantes(colisoes_restantes):
-    falar_universal(f"Você tem {colisoes_restantes} vidas restantes." if colisoes_restantes != 1 else "Você tem 1 vida restante.", prioridade=True)
+    falar_universal(texto_vidas_restantes(colisoes_restantes), prioridade=True, chave="vidas")
+
+def registrar_partida(motor, dificuldade, semente, duracao, caminho_gravacao, concluida):
+    """Põe a partida na fila do placar; a gravação no banco acontece em segundo plano."""
+    partida = motor.placar()
+    partida.update(dificuldade=dificuldade, duracao=duracao, semente=str(semente),
+                   concluida=int(concluida), gravacao=caminho_gravacao)
+    placar_sessoes.registrar(partida)
+
+def copiar_resultado(placar, agora, dificuldade_texto, pontos, nivel_final):
+    """Monta o texto do resultado e o copia para a área de transferência. Roda na thread do placar."""
+    nome_computador = placar.nome_jogador()
+
+    dia = agora.day
+    mes_extenso = agora.strftime('%B').capitalize()
+    ano = agora.year
+    hora = agora.hour
+    minuto = agora.minute
+
+    resultado = f"Dia {dia} de {mes_extenso} de {ano}, às {hora}:{minuto:02d}, {nome_computador} concluiu o jogo na dificuldade '{dificuldade_texto}' com {pontos} pontos, no nível {nivel_final}."
+
+    import pyperclip # Só no fim da partida, fora da abertura do jogo
+    pyperclip.copy(resultado)
+    # print("Resultado copiado para a área de transferência:")
+    # print(resultado) # Não imprime para o console/log
+
+def falar_recordes():
+    """Fala as melhores pontuações de cada dificuldade e o recorde deste computador; uma tecla interrompe."""
+    frases = ["Recordes."]
+    for dificuldade, config in DIFICULDADES.items():
+        melhores = placar_sessoes.melhores(dificuldade, 3)
+        if not melhores:
+            frases.append(f"{config.texto}: nenhuma partida.")
+            continue
+        frase = f"{config.texto}: " + ", ".join(f"{linha['pontos']} pontos de {linha['jogador']}" for linha in melhores) + "."
+        recorde = placar_sessoes.recorde_pessoal(dificuldade)
+        if recorde is not None:
+            frase += f" Seu recorde, {recorde['pontos']} pontos."
+        frases.append(frase)
+
+    for frase in frases:
+        mensagem = falar_universal(frase)
+        if aguardar_entrada_menu(15, fala_esperada=mensagem, consumir=False) not in (None, 'FALA'):
+            break
+    if voz_sapi_ocupada():
+        parar_fala_voz()
 
 def tocar_som(nome_som):
-    """Toca um som curto (Sound object) de forma não bloqueante."""
+    """Toca um som curto (Sound object) de forma não bloqueante, no grupo de canais das respostas."""
     try:
         if nome_som in loaded_sounds and loaded_sounds[nome_som] is not None:
             if isinstance(loaded_sounds[nome_som], list):
                 playable_sounds = [s for s in loaded_sounds[nome_som] if s is not None]
                 if playable_sounds:
-                    random.choice(playable_sounds).play()
+                    canais.tocar("resposta", random.choice(playable_sounds), prioridade_resposta(nome_som), nome_som)
                 # else:
                     # print(f"AVISO: Nenhuma versão válida do som '{nome_som}' para tocar.")
             else:
-                loaded_sounds[nome_som].play()
+                canais.tocar("resposta", loaded_sounds[nome_som], prioridade_resposta(nome_som), nome_som)
         # else:
             # print(f"AVISO: Som '{nome_som}' não encontrado ou não carregado para tocar.")
     except Exception as e:
         # print(f"ERRO ao tocar som '{nome_som}': {e}")
-        pass # Não exibe erro para o usuário final
+        perfil.marca(f"erro ao tocar {nome_som}") # Não exibe erro para o usuário final
 
-def tocar_e_esperar(som_nome):
+def tocar_e_esperar_streaming(som_nome):
     """
     Toca um som (geralmente MP3 longo) usando pygame.mixer.music e espera sua duração.
-    Bloqueante - usado para introduções, instruções e fim de jogo.
+    Bloqueante. Só é usado quando o jingle não pôde ser carregado na memória,
+    porque substitui a música de fundo no stream.
     """
     global jogo_encerrar
     try:
@@ -288,14 +462,106 @@ def tocar_e_esperar(som_nome):
         # print(f"ERRO inesperado ao tocar e esperar som '{som_nome}': {e}")
         pass # Não exibe erro para o usuário final
 
+def rampa_volume_musica(alvo, duracao=DURACAO_RAMPA_MUSICA):
+    """Leva o volume da música de fundo até 'alvo' aos poucos, sem parar o streaming."""
+    inicial = pygame.mixer.music.get_volume()
+    inicio = time.perf_counter()
+    while not jogo_encerrar:
+        fracao = min(1.0, (time.perf_counter() - inicio) / duracao) if duracao > 0 else 1.0
+        pygame.mixer.music.set_volume(inicial + (alvo - inicial) * fracao)
+        if fracao >= 1.0:
+            break
+        aguardar_eventos_pygame(0.015) # Mantém Escape/QUIT respondendo durante a rampa
+
+def tocar_e_esperar(som_nome, restaurar_musica=True):
+    """
+    Toca um jingle já decodificado na memória, no canal reservado, e espera sua duração.
+    Bloqueante - usado para introduções, instruções e fim de jogo. A música de fundo,
+    se estiver tocando, é abaixada durante o jingle em vez de parada, e volta ao
+    volume normal no fim (a não ser que 'restaurar_musica' seja False).
+    """
+    global jogo_encerrar
+    try:
+        som = loaded_sounds.get(som_nome)
+    except Exception as e:
+        som = None
+    if som is None:
+        tocar_e_esperar_streaming(som_nome)
+        return
+
+    try:
+        pedido = time.perf_counter()
+        musica_tocando = pygame.mixer.music.get_busy()
+        canal_jingles.play(som)
+        latencia_inicio = time.perf_counter() - pedido
+
+        volume_antes = pygame.mixer.music.get_volume()
+        start_time = time.perf_counter()
+        max_wait = 10
+        while canal_jingles.get_busy() and (time.perf_counter() - start_time < max_wait):
+            if musica_tocando:
+                # Ducking: abaixa a música na mesma rampa usada para restaurá-la
+                fracao = min(1.0, (time.perf_counter() - start_time) / DURACAO_RAMPA_MUSICA)
+                pygame.mixer.music.set_volume(volume_antes + (VOLUME_MUSICA_ABAIXADA - volume_antes) * fracao)
+            aguardar_eventos_pygame(1 / 30) # Permite sair durante a reprodução
+            if jogo_encerrar:
+                canal_jingles.stop()
+                return
+        if canal_jingles.get_busy():
+            # print(f"AVISO: Som '{som_nome}' não terminou dentro do tempo limite. Forçando parada.")
+            canal_jingles.stop()
+
+        # Lacuna: do fim do jingle até a música estar de novo no volume normal
+        fim_jingle = time.perf_counter()
+        if musica_tocando and restaurar_musica:
+            rampa_volume_musica(VOLUME_MUSICA)
+        lacuna = time.perf_counter() - fim_jingle if musica_tocando and restaurar_musica else None
+        medicoes_transicao.append((som_nome, latencia_inicio, lacuna))
+        if imprimir_telemetria:
+            texto_lacuna = f"{lacuna * 1000:.0f} ms até o volume normal, sem silêncio" if lacuna is not None else "música não retomada"
+            print(f"Jingle '{som_nome}': começou {latencia_inicio * 1000:.2f} ms após o pedido; {texto_lacuna}")
+    except Exception as e:
+        # print(f"ERRO inesperado ao tocar e esperar som '{som_nome}': {e}")
+        pass # Não exibe erro para o usuário final
+
+def comparar_latencia_jingles(som_nome="inicio", repeticoes=5):
+    """
+    Compara quanto tempo cada caminho leva do pedido até o som estar tocando:
+    carregar do disco no mixer.music (antigo) ou tocar o Sound da memória no canal reservado.
+    Retorna {"streaming_ms": mediana, "memoria_ms": mediana}.
+    """
+    full_path = os.path.join(os.getcwd(), sons_paths[som_nome])
+    som = loaded_sounds[som_nome]
+    streaming, memoria = [], []
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        pygame.mixer.music.load(full_path)
+        pygame.mixer.music.play()
+        streaming.append(time.perf_counter() - inicio)
+        pygame.mixer.music.stop()
+
+        inicio = time.perf_counter()
+        canal_jingles.play(som)
+        memoria.append(time.perf_counter() - inicio)
+        canal_jingles.stop()
+    streaming.sort()
+    memoria.sort()
+    return {"streaming_ms": streaming[len(streaming) // 2] * 1000, "memoria_ms": memoria[len(memoria) // 2] * 1000}
 
-def tocar_som_direcional(nome_evento, direcao, sound_obj=None):
+
+def tocar_som_direcional(nome_evento, direcao, sound_obj=None, intervalo=None):
     """
     Toca um som com efeito de pan direcional (estéreo).
     Direções: "esquerda", "direita", "centro".
-    Pode receber um sound_obj diretamente para teste de autofalantes.
+    Usa as pistas pré-renderizadas do banco_sons; quando recebe um sound_obj
+    (teste de autofalantes) ou a pista não está no banco, toca o som com o pan
+    no volume do canal (pan_por_volume) ou o converte na hora.
+    'intervalo' é o tempo atual entre obstáculos: escolhe a variante acelerada que cabe nele.
     """
     try:
+        if sound_obj is None and banco_sons.tocar(nome_evento, direcao, intervalo):
+            return
+
         original_sound = sound_obj
         if original_sound is None:
             if nome_evento in ["esquerda", "direita"]:
@@ -310,29 +576,20 @@ def tocar_som_direcional(nome_evento, direcao, sound_obj=None):
             # print(f"AVISO: Som direcional para '{nome_evento}' não carregado ou não encontrado.")
             return
 
-        som_array = pygame.sndarray.array(original_sound).astype(np.float32)
-
-        if som_array.ndim == 1:
-            som_array = np.stack((som_array, som_array), axis=-1)
-
-        pan_reduction_factor = 0.1
-        if direcao == "esquerda":
-            som_array[:, 1] *= pan_reduction_factor
-        elif direcao == "direita":
-            som_array[:, 0] *= pan_reduction_factor
-
-        som_modificado = pygame.sndarray.make_sound(som_array.astype(np.int16))
-        som_modificado.play()
+        if banco_sons.pan_por_volume:
+            banco_sons.reproduzir(original_sound, nome_evento, direcao) # Sem cópia: o pan vai no canal
+        else:
+            banco_sons.reproduzir(renderizar_direcional(original_sound, direcao), nome_evento)
     except Exception as e:
         # print(f"ERRO ao tocar som direcional '{nome_evento}': {e}")
-        pass # Não exibe erro para o usuário final
+        perfil.marca(f"erro ao tocar {nome_evento}") # Não exibe erro para o usuário final
 
-def iniciar_musica_fundo():
-    """Inicia a música de fundo em loop."""
+def iniciar_musica_fundo(volume=None):
+    """Inicia a música de fundo em loop (por padrão no volume normal)."""
     try:
         full_path = os.path.join(os.getcwd(), sons_paths["musica"])
         pygame.mixer.music.load(full_path)
-        pygame.mixer.music.set_volume(0.7)
+        pygame.mixer.music.set_volume(VOLUME_MUSICA if volume is None else volume)
         pygame.mixer.music.play(-1)
         # print("INFO: Música de fundo iniciada.")
     except pygame.error as e:
@@ -355,97 +612,169 @@ def get_all_pygame_events():
             jogo_encerrar = True
     return events
 
+def aguardar_eventos_pygame(timeout):
+    """
+    Bloqueia até chegar um evento ou até 'timeout' segundos se passarem, sem
+    ocupar a CPU. Retorna todos os eventos pendentes (lista vazia no timeout).
+    """
+    global jogo_encerrar
+    primeiro = pygame.event.wait(max(1, int(timeout * 1000)))
+    if primeiro.type == pygame.NOEVENT:
+        return []
+    events = [primeiro] + pygame.event.get()
+    for event in events:
+        if event.type == pygame.QUIT or (event.type == pygame.KEYDOWN and event.key == pygame.K_ESCAPE):
+            jogo_encerrar = True
+    return events
+
+def resumo_cpu_reacao(medicoes):
+    """Resume uma lista de (cpu, parede) em médias por janela, em milissegundos."""
+    if not medicoes:
+        return None
+    cpu_total = sum(m[0] for m in medicoes)
+    parede_total = sum(m[1] for m in medicoes)
+    return {
+        "janelas": len(medicoes),
+        "cpu_ms_por_janela": cpu_total / len(medicoes) * 1000,
+        "parede_ms_por_janela": parede_total / len(medicoes) * 1000,
+        "uso_cpu": cpu_total / parede_total if parede_total > 0 else 0.0,
+    }
+
+def comparar_cpu_janela_reacao(janelas=5, duracao=None):
+    """
+    Mede o tempo de CPU de janelas de reação sem nenhuma tecla pressionada,
+    comparando a espera antiga (get_all_pygame_events em laço) com a atual
+    (aguardar_eventos_pygame). Retorna {"antes": resumo, "depois": resumo}.
+    """
+    if duracao is None:
+        duracao = tempo_janela_reacao
+
+    def janela_antiga():
+        inicio = time.time()
+        while time.time() - inicio < duracao and not jogo_encerrar:
+            get_all_pygame_events()
+
+    def janela_atual():
+        inicio = time.time()
+        while not jogo_encerrar:
+            restante = duracao - (time.time() - inicio)
+            if restante <= 0:
+                break
+            aguardar_eventos_pygame(restante)
+
+    resultado = {}
+    for rotulo, janela in (("antes", janela_antiga), ("depois", janela_atual)):
+        medicoes = []
+        for _ in range(janelas):
+            cpu_inicio, parede_inicio = time.process_time(), time.perf_counter()
+            janela()
+            medicoes.append((time.process_time() - cpu_inicio, time.perf_counter() - parede_inicio))
+        resultado[rotulo] = resumo_cpu_reacao(medicoes)
+    return resultado
+
 
 # Função Auxiliar para Processamento de Eventos de Menu com Controle SAPI
-def processar_eventos_menu_com_sapi_check():
+def aguardar_entrada_menu(timeout, fala_esperada=None, consumir=True):
     """
-    Processa eventos Pygame em loops de menu, garantindo interrupção de fala
-    e retorno de input válido. Monitora o estado do SAPI para evitar "puladas".
-    Retorna a tecla pressionada ou None se nenhum input relevante.
+    Bloqueia em pygame.event.wait (sem ocupar a CPU) até chegar uma tecla, terminar
+    a fala 'fala_esperada' (mensagem retornada por falar_universal) ou passar 'timeout'
+    segundos. Retorna a tecla, 'QUIT', 'FALA' (a fala terminou) ou None (timeout).
+    Com consumir=False a tecla fica no buffer para o próximo menu e a fala não é interrompida.
     """
-    global jogo_encerrar
-    for evento in get_all_pygame_events(): # Usa a função unificada
-        if jogo_encerrar: # Verifica se um evento QUIT ou ESC foi detectado na coleta unificada
+    limite = time.perf_counter() + timeout
+    while True:
+        if jogo_encerrar:
             return 'QUIT'
-        elif evento.type == pygame.KEYDOWN:
+        if teclas_menu:
+            if not consumir:
+                return teclas_menu[0]
             parar_fala_voz()
-            return evento.unicode
-    return None
+            return teclas_menu.popleft()
+        restante = limite - time.perf_counter()
+        if restante <= 0:
+            return None
+        fala_terminou = False
+        for evento in aguardar_eventos_pygame(restante):
+            if evento.type == pygame.KEYDOWN:
+                teclas_menu.append(evento.unicode)
+            elif evento.type == EVENTO_FALA_TERMINOU and fala_esperada is not None and evento.mensagem is fala_esperada:
+                fala_terminou = True
+        if fala_terminou and not teclas_menu and not jogo_encerrar:
+            return 'FALA'
 
 def falar_opcoes_segmentado(opcoes_list):
     """
     Fala uma lista de frases segmentadamente, permitindo interrupção
     e garantindo que cada frase seja falada antes da próxima.
-    Retorna a tecla pressionada que interrompeu a fala, ou None.
+    Retorna a tecla pressionada que interrompeu a fala (inclusive uma digitada
+    antes de o menu começar), ou 'QUIT'.
     """
-    global voz_sapi_ocupada, jogo_encerrar
     for frase in opcoes_list:
         if jogo_encerrar:
             return 'QUIT'
+        if teclas_menu: # Tecla digitada antes: nem começa a falar
+            return aguardar_entrada_menu(0)
 
-        # Espera ativa para a fala anterior terminar e o SAPI estar livre
-        wait_start_time = time.time()
-        # print(f"DEBUG: [SAPI_SEGMENTADO] Aguardando SAPI ficar livre para '{frase}'. Ocupado: {voz_sapi_ocupada}")
-
-        # Espera pelo evento ou timeout, permitindo input
-        while voz_sapi_ocupada and not voz_sapi_terminou_evento.is_set() and (time.time() - wait_start_time < 10):
-            input_during_wait = processar_eventos_menu_com_sapi_check()
-            if input_during_wait is not None:
-                return input_during_wait
-            if jogo_encerrar: return 'QUIT'
-            pygame.time.Clock().tick(60)
-
-        # Se a flag ainda está True e o evento não foi setado após o timeout, algo está errado
-        if voz_sapi_ocupada and not voz_sapi_terminou_evento.is_set():
-            # print(f"AVISO: [SAPI_SEGMENTADO] Timeout ({10}s) esperando SAPI liberar. Forçando parada para '{frase}'.")
-            parar_fala_voz()
-
-        if jogo_encerrar: return 'QUIT'
-
-        # Tenta falar a nova frase
-        falar_universal(frase)
-
-        # Pequena pausa ativa para SAPI iniciar a fala e checar input
+        mensagem = falar_universal(frase)
         # print(f"DEBUG: [SAPI_SEGMENTADO] Falando: '{frase}'. Aguardando término ou input.")
-        current_segment_start = time.time()
-        # Tempo de espera aumentado para 8 segundos para frases mais longas
-        while not voz_sapi_terminou_evento.is_set() and (time.time() - current_segment_start < 8):
-            input_event = processar_eventos_menu_com_sapi_check()
-            if input_event is not None:
-                return input_event
-            if jogo_encerrar: return 'QUIT'
-            pygame.time.Clock().tick(60)
-
-        voz_sapi_terminou_evento.clear()
-        # print(f"DEBUG: [SAPI_SEGMENTADO] Segmento para '{frase}' finalizado (ou interrompido/timeout).")
+
+        # Espera o fim da frase ou uma tecla; 8 segundos no máximo por frase
+        entrada = aguardar_entrada_menu(8 if mensagem is not None else 0, fala_esperada=mensagem)
+        if entrada not in (None, 'FALA'):
+            return entrada
 
     # Se todas as frases foram faladas sem interrupção, aguarda um input final
     while True:
-        input_final = processar_eventos_menu_com_sapi_check()
-        if input_final is not None:
-            return input_final
-        if jogo_encerrar:
-            return 'QUIT'
-        pygame.time.Clock().tick(60)
+        entrada = aguardar_entrada_menu(60)
+        if entrada is not None:
+            return entrada
+
+# Opções faladas pelos menus (também pré-renderizadas no cache de frases)
+MENU_OPCOES = [
+    "Qual sua opção?",
+    "1 modo fácil.",
+    "2 modo médio.",
+    "3 modo difícil.",
+    "4 modo impossível.",
+    "5 exibe instruções.",
+    "6 exibe os sons do jogo.",
+    "7 exibe créditos.",
+    "8 testa os autofalantes.",
+    "C calibra o áudio.",
+    "9 sai do jogo.",
+    "P ouve os recordes.",
+    "Zero repete as opções."
+]
+
+OPCOES_SONS = [
+    "Menu de sons.",
+    "1. Caixa com Vida Extra.",
+    "2. Pegou vida extra.",
+    "3. colidiu com obstáculo.",
+    "4. obstáculo acima.",
+    "5. obstáculo no centro.",
+    "6. esquivou com sucesso.",
+    "Pressione zero para voltar ao menu principal."
+]
+
+# Frases fixas renderizadas uma vez para o cache em disco e tocadas pelo mixer
+FRASES_FIXAS = (
+    MENU_OPCOES + OPCOES_SONS
+    + ["Boas vindas ao Corrida Cega", "Vamos lá!", "Você está no menu principal.", "Repetindo.",
+       "Opção inválida, tente novamente.", "Caixa com vida extra.", "Pegou vida extra.",
+       "Colidiu com obstáculo.", "Obstáculo acima.", "Obstáculo no centro.", "Esquivou com sucesso.",
+       "Opção inválida, digite um número de 1 a 6, ou 0 para voltar ao menu."]
+    + [f"Nível {nivel}" for nivel in range(1, 21)]
+    + [texto_vidas_restantes(vidas) for vidas in range(0, 10)]
+)
 
 # Submenu de Teste de Sons
 def exibir_submenu_sons():
     """Exibe e gerencia o submenu para teste de sons."""
 
-    opcoes_sons = [
-        "Menu de sons.",
-        "1. Caixa com Vida Extra.",
-        "2. Pegou vida extra.",
-        "3. colidiu com obstáculo.",
-        "4. obstáculo acima.",
-        "5. obstáculo no centro.",
-        "6. esquivou com sucesso.",
-        "Pressione zero para voltar ao menu principal."
-    ]
-
     selecionando_som = True
     while selecionando_som:
-        input_tecla = falar_opcoes_segmentado(opcoes_sons)
+        input_tecla = falar_opcoes_segmentado(OPCOES_SONS)
 
         if input_tecla == 'QUIT':
             selecionando_som = False
@@ -487,14 +816,9 @@ def exibir_submenu_sons():
         else: # Já tratamos o '0' acima, então qualquer outra coisa aqui é inválida
             falar_universal("Opção inválida, digite um número de 1 a 6, ou 0 para voltar ao menu.")
 
-        if selecionando_som: # Só pausa se ainda estiver no submenu
-            start_response_pause = time.time()
-            while time.time() - start_response_pause < 1.0:
-                input_check = processar_eventos_menu_com_sapi_check()
-                if input_check == 'QUIT':
-                    selecionando_som = False
-                    break
-                pygame.time.Clock().tick(60)
+        if selecionando_som: # Só pausa se ainda estiver no submenu; uma tecla digitada encurta a pausa e fica para o menu
+            if aguardar_entrada_menu(1.0, consumir=False) == 'QUIT':
+                selecionando_som = False
 
 
 # Menu de Teste de Autofalantes
@@ -529,66 +853,92 @@ def exibir_teste_autofalantes():
         tocar_som_direcional("teste_autofalante_base", "esquerda", sound_obj=sound_for_test)
 
         segment_duration = 1.5
-        segment_start_time = time.time()
-        while time.time() - segment_start_time < segment_duration:
-            input_test = processar_eventos_menu_com_sapi_check()
-            if input_test is not None:
-                testando = False
-                break
-            if jogo_encerrar: break
-            pygame.time.Clock().tick(60)
+        if aguardar_entrada_menu(segment_duration) is not None:
+            testando = False
         if not testando or jogo_encerrar: break
 
         falar_universal("Centro.")
         tocar_som_direcional("teste_autofalante_base", "centro", sound_obj=sound_for_test)
 
-        segment_start_time = time.time()
-        while time.time() - segment_start_time < segment_duration:
-            input_test = processar_eventos_menu_com_sapi_check()
-            if input_test is not None:
-                testando = False
-                break
-            if jogo_encerrar: break
-            pygame.time.Clock().tick(60)
+        if aguardar_entrada_menu(segment_duration) is not None:
+            testando = False
         if not testando or jogo_encerrar: break
 
         falar_universal("Direita.")
         tocar_som_direcional("teste_autofalante_base", "direita", sound_obj=sound_for_test)
 
-        segment_start_time = time.time()
-        while time.time() - segment_start_time < segment_duration:
-            input_test = processar_eventos_menu_com_sapi_check()
-            if input_test is not None:
-                testando = False
-                break
-            if jogo_encerrar: break
-            pygame.time.Clock().tick(60)
+        if aguardar_entrada_menu(segment_duration) is not None:
+            testando = False
         if not testando or jogo_encerrar: break
 
         falar_universal("Repetindo teste, tecle algo para voltar ao menu.")
 
-        waiting_for_exit = True
-        wait_start_time = time.time()
-        while waiting_for_exit and (time.time() - wait_start_time < 5):
-            input_test = processar_eventos_menu_com_sapi_check()
-            if input_test is not None:
-                testando = False
-                waiting_for_exit = False
-                break
-            if jogo_encerrar:
-                testando = False
-                break
-            pygame.time.Clock().tick(60)
-
-        if not waiting_for_exit:
+        if aguardar_entrada_menu(5) is not None:
+            testando = False
             break
 
-    falar_universal("Teste terminado.")
+    mensagem = falar_universal("Teste terminado.")
     # Pequeno atraso para a fala de finalização do teste terminar antes de voltar ao menu
-    voz_sapi_terminou_evento.wait(timeout=2)
-    if voz_sapi_ocupada:
+    aguardar_entrada_menu(2, fala_esperada=mensagem, consumir=False)
+    if voz_sapi_ocupada():
+        parar_fala_voz()
+
+def falar_e_aguardar_calibracao(texto, timeout=15):
+    """Fala uma instrução da calibração e espera ela terminar. Retorna False se o jogador cancelou (Escape)."""
+    mensagem = falar_universal(texto, prioridade=True)
+    entrada = aguardar_entrada_menu(timeout, fala_esperada=mensagem)
+    if voz_sapi_ocupada():
+        parar_fala_voz()
+    teclas_menu.clear()
+    return entrada not in ('QUIT', '\x1b') and not jogo_encerrar
+
+def exibir_calibracao_audio():
+    """
+    Calibra a saída de áudio deste computador: o menor buffer estável do mixer
+    e a latência por toque, que passa a ser somada à janela de reação.
+    """
+    global calibracao_audio
+
+    buffer_anterior = buffer_calibrado(calibracao_audio)
+    if not falar_e_aguardar_calibracao("Calibração de áudio. Primeiro, o teste do mixer, em silêncio. Aguarde. Escape cancela."):
+        return
+
+    buffer, _ = menor_buffer_estavel(reabrir_mixer, lambda: canais.canal("jingle"))
+    if buffer is None:
+        reabrir_mixer(buffer_anterior)
+        falar_universal("Calibração cancelada.")
+        return
+
+    # Cancelada daqui em diante, o mixer volta ao buffer de antes: o novo só vale se for salvo
+    if not falar_e_aguardar_calibracao(f"Mixer com buffer de {buffer} amostras. Agora, aperte espaço junto com cada clique que ouvir."):
+        reabrir_mixer(buffer_anterior)
+        return
+
+    toque = medir_latencia_toque(canais.canal("jingle"), gerar_clique())
+    if toque is None:
+        reabrir_mixer(buffer_anterior)
+        falar_universal("Calibração cancelada.")
+        return
+
+    nova = dict(calibracao_audio, buffer=buffer)
+    if toque["valida"]:
+        nova.update(latencia=round(toque["latencia"], 4), dispersao=round(toque["dispersao"], 4))
+    try:
+        salvar_calibracao(nova)
+    except OSError as e:
+        # print(f"AVISO: Não foi possível gravar a calibração: {e}")
+        pass # O jogo usa a calibração até fechar
+    calibracao_audio = nova
+
+    if toque["valida"]:
+        texto = (f"Latência de {toque['latencia'] * 1000:.0f} milissegundos. "
+                 f"A janela de reação passa a ter {janela_reacao_jogo() * 1000:.0f} milissegundos.")
+    else:
+        texto = "Os toques ficaram fora do ritmo; a latência não foi alterada. Tente de novo."
+    mensagem = falar_universal(texto + " Calibração concluída.")
+    aguardar_entrada_menu(10, fala_esperada=mensagem, consumir=False)
+    if voz_sapi_ocupada():
         parar_fala_voz()
-    time.sleep(0.5)
 
 # --- Loop Principal do Menu ---
 def exibir_menu_principal():
@@ -596,25 +946,11 @@ def exibir_menu_principal():
     nivel_dificuldade_escolhido = 0
     global jogo_encerrar
 
-    menu_opcoes = [
-        "Qual sua opção?",
-        "1 modo fácil.",
-        "2 modo médio.",
-        "3 modo difícil.",
-        "4 modo impossível.",
-        "5 exibe instruções.",
-        "6 exibe os sons do jogo.",
-        "7 exibe créditos.",
-        "8 testa os autofalantes.",
-        "9 sai do jogo.",
-        "Zero repete as opções."
-    ]
-
     selecionando_menu = True
     while selecionando_menu and not jogo_encerrar:
-        input_tecla = falar_opcoes_segmentado(menu_opcoes)
+        input_tecla = falar_opcoes_segmentado(MENU_OPCOES)
 
-        if input_tecla == 'QUIT': # Captura QUIT do processar_eventos_menu_com_sapi_check
+        if input_tecla == 'QUIT': # Captura QUIT do aguardar_entrada_menu
             selecionando_menu = False
             break
 
@@ -625,21 +961,25 @@ def exibir_menu_principal():
 
         parar_fala_voz()
 
-        if 1 <= opcao_digitada <= 4:
+        if input_tecla in ('p', 'P'):
+            falar_recordes()
+        elif 1 <= opcao_digitada <= 4:
             nivel_dificuldade_escolhido = opcao_digitada
             selecionando_menu = False
         elif opcao_digitada == 5:
-            falar_universal("Você está passando por um local cheio de obstáculos que impedem a sua corrida. Você cada vez corre mais rápido, mas obstáculos também vem cada vez mais rápido! Seta para a direita desvia dos obstáculos que vem da esquerda. Seta esquerda, dos que vem à direita. Seta para cima, dos que vem no centro. Seta para baixo, dos que vem de cima. Control direito, quebra as caixas bônus que tem vida extra, mas que podem ter inimigos se você não as quebrar. v informa suas vidas atuais. home pausa e retoma a música de fundo. Escape sai do jogo a qualquer momento. Quando suas vidas chegarem a 0, você terá sua pontuação automaticamente copiada para sua área de transferência. É importante conhecer os sons do jogo na opção 6 do menu principal. Os sons que ali não forem exibidos se referem a obstáculos. Boa sorte! Voltando ao menu.")
-            voz_sapi_terminou_evento.wait(timeout=60) # Espera mais tempo pelas instruções
-            if voz_sapi_ocupada: parar_fala_voz()
+            mensagem = falar_universal("Você está passando por um local cheio de obstáculos que impedem a sua corrida. Você cada vez corre mais rápido, mas obstáculos também vem cada vez mais rápido! Seta para a direita desvia dos obstáculos que vem da esquerda. Seta esquerda, dos que vem à direita. Seta para cima, dos que vem no centro. Seta para baixo, dos que vem de cima. Control direito, quebra as caixas bônus que tem vida extra, mas que podem ter inimigos se você não as quebrar. v informa suas vidas atuais. home pausa e retoma a música de fundo. Escape sai do jogo a qualquer momento. Quando suas vidas chegarem a 0, você terá sua pontuação automaticamente copiada para sua área de transferência. É importante conhecer os sons do jogo na opção 6 do menu principal. Os sons que ali não forem exibidos se referem a obstáculos. Boa sorte! Voltando ao menu.")
+            aguardar_entrada_menu(60, fala_esperada=mensagem, consumir=False) # Espera as instruções; uma tecla as interrompe
+            if voz_sapi_ocupada(): parar_fala_voz()
         elif opcao_digitada == 6:
             exibir_submenu_sons()
         elif opcao_digitada == 7:
-            falar_universal("Jogo desenvolvido por Rony. Agradecimentos especiais a: Deus pela capacitação; Apoiadores pelos exaustivos testes e suporte; Comunidade Pygame por suas ferramentas; Pyttsx3 e Numpy pelas funcionalidades de áudio; E a você, pelo prestígio. Divirta-se! Você está de volta ao menu.")
-            voz_sapi_terminou_evento.wait(timeout=20) # Espera mais tempo pelos créditos
-            if voz_sapi_ocupada: parar_fala_voz()
+            mensagem = falar_universal("Jogo desenvolvido por Rony. Agradecimentos especiais a: Deus pela capacitação; Apoiadores pelos exaustivos testes e suporte; Comunidade Pygame por suas ferramentas; Pyttsx3 e Numpy pelas funcionalidades de áudio; E a você, pelo prestígio. Divirta-se! Você está de volta ao menu.")
+            aguardar_entrada_menu(20, fala_esperada=mensagem, consumir=False) # Espera os créditos; uma tecla os interrompe
+            if voz_sapi_ocupada(): parar_fala_voz()
         elif opcao_digitada == 8:
             exibir_teste_autofalantes()
+        elif input_tecla in ('c', 'C'):
+            exibir_calibracao_audio()
         elif opcao_digitada == 9:
             jogo_encerrar = True
             selecionando_menu = False
@@ -649,59 +989,35 @@ def exibir_menu_principal():
             falar_universal("Opção inválida, tente novamente.")
 
         if selecionando_menu and not jogo_encerrar: # Só pausa se ainda estiver no menu e não for sair
-            start_response_pause = time.time()
-            while time.time() - start_response_pause < 1.0:
-                input_check = processar_eventos_menu_com_sapi_check()
-                if input_check == 'QUIT':
-                    selecionando_menu = False
-                    break
-                pygame.time.Clock().tick(60)
+            if aguardar_entrada_menu(1.0, consumir=False) == 'QUIT':
+                selecionando_menu = False
 
     return nivel_dificuldade_escolhido
 
 # Jogo Principal
 def iniciar_jogo():
     """Inicia e gerencia o loop principal do jogo."""
-    global jogo_encerrar, last_home_press_time, last_v_press_time, debounce_interval
+    global jogo_encerrar, last_home_press_time, last_v_press_time, debounce_interval, resumo_latencias
 
-    # Loop de aquecimento do Pygame/SAPI
-    # print("DEBUG: Entrando no loop de aquecimento do Pygame/SAPI para estabilização...")
-    warmup_start_time = time.time()
-    warmup_duration = 2
-
-    while time.time() - warmup_start_time < warmup_duration:
-        get_all_pygame_events() # Coleta eventos para detectar QUIT
-        if jogo_encerrar:
-            # print("DEBUG: QUIT detectado durante o aquecimento. Encerrando o jogo.")
-            return
-        pygame.time.Clock().tick(60)
-        time.sleep(0.01)
-
-    if jogo_encerrar:
-        # print("DEBUG: Jogo já marcado para encerrar após aquecimento. Saindo.")
+    if not inicializar():
+        # print("DEBUG: Pygame ou mixer falharam ao inicializar. Encerrando o jogo.")
+        jogo_encerrar = True
         return
 
-    inicializar_voz_sapi()
-
-    if jogo_encerrar:
+    # Mixer, janela e sons subiram enquanto o motor de voz iniciava; aqui ele precisa estar pronto
+    if not fila_fala.pronta(timeout=5.0):
         # print("DEBUG: SAPI falhou ao inicializar, ou erro crítico. Encerrando o jogo.")
+        jogo_encerrar = True
         return
+    linha_tempo.marcar("motor de voz pronto")
 
-    falar_universal("Boas vindas ao Corrida Cega")
+    mensagem = falar_universal("Boas vindas ao Corrida Cega")
     # print("DEBUG: [INIT] Aguardando a fala de boas-vindas ('Bem-vindo...') terminar ou timeout.")
 
-    sapi_welcome_start = time.time()
-    max_sapi_welcome_wait = 5
-
-    while (time.time() - sapi_welcome_start < max_sapi_welcome_wait) and (not voz_sapi_terminou_evento.is_set()):
-        get_all_pygame_events() # Coleta eventos para detectar QUIT
-        if jogo_encerrar:
-            # print("DEBUG: QUIT detectado durante a espera da fala de boas-vindas. Encerrando o jogo.")
-            break
-        pygame.time.Clock().tick(60)
-        time.sleep(0.01)
+    # Teclas digitadas durante as boas-vindas ficam no buffer para o menu
+    aguardar_entrada_menu(5, fala_esperada=mensagem, consumir=False)
 
-    if voz_sapi_ocupada:
+    if voz_sapi_ocupada():
         # print("AVISO: [INIT] A fala de boas-vindas pode não ter terminado a tempo. Forçando liberação do SAPI.")
         parar_fala_voz()
 
@@ -709,54 +1025,46 @@ def iniciar_jogo():
         # print("DEBUG: Jogo encerrado pelo usuário ou durante a fala inicial. Saindo.")
         return
 
+    # Os sons carregam em segundo plano desde inicializar(), junto com a inicialização
+    # do SAPI e a fala de boas-vindas; aqui só se espera o que ainda faltar.
+    if not aguardar_sons_prontos():
+        return
+    linha_tempo.marcar("sons prontos")
+
     nivel_dificuldade_escolhido = exibir_menu_principal()
 
     if jogo_encerrar:
         # print("DEBUG: Jogo encerrado pelo usuário no menu principal. Saindo.")
         return
 
+    # Teclas que sobraram do menu não valem para a partida
+    teclas_menu.clear()
+    pygame.event.clear(pygame.KEYDOWN)
+
+    # A música de fundo já entra abaixada sob o jingle de início e sobe quando ele acaba
+    iniciar_musica_fundo(volume=VOLUME_MUSICA_ABAIXADA)
     tocar_e_esperar("inicio")
 
     falar_universal("Vamos lá!")
     voz_sapi_terminou_evento.wait(timeout=2)
-    if voz_sapi_ocupada:
+    if voz_sapi_ocupada():
         parar_fala_voz()
 
-    iniciar_musica_fundo()
-
-    colisoes = 0
-    max_colisoes = 3
-    vidas_extra = 0
-    pontos = 0
-
-    # Configurações de Dificuldade (Aceleração Contínua)
-    if nivel_dificuldade_escolhido == 1:
-        tempo_base_entre_obstaculos = 2.0
-        aceleracao_por_ponto = 0.018
-        min_tempo_obstaculo = 0.001
-        caixa_probabilidade = 15
-        dificuldade_texto = "Fácil"
-    elif nivel_dificuldade_escolhido == 2:
-        tempo_base_entre_obstaculos = 1.5
-        aceleracao_por_ponto = 0.025
-        min_tempo_obstaculo = 0.001
-        caixa_probabilidade = 10
-        dificuldade_texto = "Médio"
-    elif nivel_dificuldade_escolhido == 3:
-        tempo_base_entre_obstaculos = 1.0
-        aceleracao_por_ponto = 0.040
-        min_tempo_obstaculo = 0.001
-        caixa_probabilidade = 5
-        dificuldade_texto = "Difícil"
-    else: # Nível impossível (4) ou default
-        tempo_base_entre_obstaculos = 0.8
-        aceleracao_por_ponto = 0.055
-        min_tempo_obstaculo = 0.001
-        caixa_probabilidade = 2
-        dificuldade_texto = "Impossível"
-
-    ultimo_tempo_evento = time.time()
-    tempo_entre_obstaculos_atual = tempo_base_entre_obstaculos
+    # As regras da partida (obstáculos, vidas, aceleração) ficam no MotorJogo da simulação
+    config = config_dificuldade(nivel_dificuldade_escolhido)
+    dificuldade_texto = config.texto
+    semente = random.getrandbits(64)
+    janela_reacao = janela_reacao_jogo()
+    motor = MotorJogo(config, relogio=RelogioReal(), semente=semente, janela_reacao=janela_reacao)
+
+    # Grava a semente e as teclas da partida para replay (python gravacao.py arquivo)
+    try:
+        gravador = GravadorSessao(caminho_nova_gravacao(), semente, nivel_dificuldade_escolhido, janela_reacao)
+    except OSError:
+        gravador = None # Sem gravação se a pasta não puder ser criada
+    caminho_gravacao = gravador.caminho if gravador else None
+    inicio_partida = time.perf_counter()
+    transmissao.publicar("partida", dificuldade=dificuldade_texto, semente=str(semente), janela_reacao=janela_reacao)
 
     last_score_speak_time = time.time()
     score_speak_interval = 30
@@ -764,18 +1072,59 @@ def iniciar_jogo():
     rodando = True
     musica_pausada = False
 
-    # Mapeia as teclas de jogo válidas
-    teclas_de_jogo_validas = {
-        pygame.K_RIGHT, pygame.K_LEFT, pygame.K_UP, pygame.K_DOWN, pygame.K_RCTRL
-    }
+    # Mapeia as teclas de jogo válidas para as ações do motor
+    teclas_de_jogo_validas = TECLAS_ACOES
+
+    # Atraso do loop ao soltar cada obstáculo ainda no ar, por número (para a telemetria)
+    atrasos_loop = {}
+
+    def concluir_obstaculo(obstaculo, resultado, latencia_tecla):
+        """Som de resposta e telemetria de um obstáculo resolvido (por tecla ou por prazo vencido)."""
+        registro_latencias.registrar(obstaculo.tipo, dificuldade_texto, latencia_tecla, resultado.desviou,
+                                     atrasos_loop.pop(obstaculo.numero, 0.0))
+        transmissao.publicar("desvio" if resultado.desviou else "colisao", numero=obstaculo.numero, direcao=obstaculo.tipo,
+                             latencia=round(latencia_tecla, 4) if latencia_tecla is not None else None)
+        if resultado.ganhou_vida:
+            transmissao.publicar("vida", vidas=motor.vidas_restantes)
+        if resultado.subiu_nivel:
+            transmissao.publicar("nivel", nivel=motor.nivel)
+        transmissao.publicar("placar", pontos=motor.pontos, vidas=motor.vidas_restantes, nivel=motor.nivel)
+        if not resultado.desviou:
+            tocar_som("colisao")
+        else:
+            if resultado.ganhou_vida:
+                tocar_som("vida")
+            else:
+                tocar_som("desviou")
+            if resultado.subiu_nivel:
+                falar_nivel_progresso(motor.pontos)
+
+    def vencer_prazos(ate):
+        """Obstáculos cujo prazo passou antes de 'ate' sem tecla de jogo: colisões."""
+        for obstaculo in motor.vencidos(ate):
+            resultado = motor.resolver(obstaculo)
+            if gravador:
+                gravador.sem_tecla(obstaculo.numero)
+            concluir_obstaculo(obstaculo, resultado, None)
+            if resultado.fim_de_jogo:
+                break
 
     while rodando and not jogo_encerrar:
-        events = get_all_pygame_events() # Coleta todos os eventos de uma vez
+        # Vários obstáculos podem estar no ar: dorme até o próximo surgir, o próximo
+        # prazo vencer ou chegar uma tecla; nunca fica preso na janela de um só
+        # CPU gasta pelo loop enquanto há obstáculo esperando tecla (CORRIDA_CEGA_MEDIR_CPU=1)
+        cpu_inicio_reacao = time.process_time() if medir_cpu_reacao and motor.pendentes else None
+        parede_inicio_reacao = time.perf_counter()
+        espera = min(0.25, motor.tempo_ate_proximo_evento())
+        events = aguardar_eventos_pygame(espera) if espera > 0 else get_all_pygame_events()
+        instante_coleta = time.perf_counter() # As teclas são datadas aqui: o pygame 2.6 não dá o timestamp SDL
+        perfil.inicio_quadro()
 
         # Verifica se algum evento de saída foi detectado na coleta
         if jogo_encerrar:
             break
 
+        teclas_jogo = []
         for evento in events: # Processa os eventos coletados
             if evento.type == pygame.KEYDOWN:
                 current_time = time.time()
@@ -792,122 +1141,77 @@ def iniciar_jogo():
 
                 elif evento.key == pygame.K_v:
                     if current_time - last_v_press_time > debounce_interval:
-                        colisoes_restantes = (max_colisoes + vidas_extra) - colisoes
-                        falar_vidas_restantes(colisoes_restantes)
+                        falar_vidas_restantes(motor.vidas_restantes)
                         last_v_press_time = current_time
 
+                elif evento.key in teclas_de_jogo_validas:
+                    teclas_jogo.append((instante_coleta, TECLAS_ACOES[evento.key]))
+
         if not rodando:
             break
 
+        # Teclas de jogo na ordem da fila do SDL (a ordem em que foram apertadas); antes
+        # delas vencem os prazos que já tinham passado no instante da coleta
+        for instante, acao in teclas_jogo:
+            vencer_prazos(instante)
+            if motor.fim_de_jogo:
+                break
+            obstaculo = motor.casar_tecla(acao)
+            transmissao.publicar("tecla", acao=acao, numero=obstaculo.numero if obstaculo else None)
+            if obstaculo is None:
+                continue # Tecla sem nenhum obstáculo no ar
+            # Tempo de reação medido do início da pista até o aperto da tecla
+            latencia_tecla = instante - obstaculo.inicio
+            resultado = motor.resolver(obstaculo, acao, latencia_tecla)
+            if gravador:
+                gravador.tecla(obstaculo.numero, acao, latencia_tecla)
+            concluir_obstaculo(obstaculo, resultado, latencia_tecla)
+            if motor.fim_de_jogo:
+                break
+
+        if not motor.fim_de_jogo:
+            vencer_prazos(time.perf_counter())
+
+        if cpu_inicio_reacao is not None:
+            medicoes_cpu_reacao.append((time.process_time() - cpu_inicio_reacao, time.perf_counter() - parede_inicio_reacao))
+
         current_time_for_score = time.time()
         if current_time_for_score - last_score_speak_time >= score_speak_interval:
-            falar_pontuacao_total(pontos)
+            falar_pontuacao_total(motor.pontos)
             last_score_speak_time = current_time_for_score
 
-        if time.time() - ultimo_tempo_evento >= tempo_entre_obstaculos_atual:
-            evento_aleatorio = random.choices(
-                ["esquerda", "direita", "centro", "cima", "caixa"],
-                weights=[24, 24, 24, 24, caixa_probabilidade],
-                k=1
-            )[0]
-
-            desviou = False
-            # Nova variável para controlar se uma ação já foi tomada para o obstáculo atual
-            acao_de_jogo_processada_neste_obstaculo = False 
-
-            tecla_certa = {
-                "esquerda": pygame.K_RIGHT,
-                "direita": pygame.K_LEFT,
-                "centro": pygame.K_UP,
-                "cima": pygame.K_DOWN,
-                "caixa": pygame.K_RCTRL
-            }[evento_aleatorio]
-
-            tocar_som_direcional(evento_aleatorio, evento_aleatorio)
-            inicio_tempo_reacao = time.time()
-
-            # Loop para tempo de reação
-            while time.time() - inicio_tempo_reacao < 0.7 and not jogo_encerrar:
-                reaction_events = get_all_pygame_events() # Coleta eventos específicos para a reação
-                if jogo_encerrar: break
-
-                for evento in reaction_events:
-                    if evento.type == pygame.KEYDOWN:
-                        current_key_time = time.time()
-
-                        if evento.key == pygame.K_HOME:
-                            if current_key_time - last_home_press_time > debounce_interval:
-                                if musica_pausada:
-                                    pygame.mixer.music.unpause()
-                                    musica_pausada = False
-                                else:
-                                    pygame.mixer.music.pause()
-                                    musica_pausada = True
-                                last_home_press_time = current_key_time
-                        elif evento.key == pygame.K_v:
-                            if current_key_time - last_v_press_time > debounce_interval:
-                                colisoes_restantes = (max_colisoes + vidas_extra) - colisoes
-                                falar_vidas_restantes(colisoes_restantes)
-                                last_v_press_time = current_key_time
-                        
-                        # --- Lógica para processar apenas a primeira tecla de jogo ---
-                        if not acao_de_jogo_processada_neste_obstaculo:
-                            if evento.key in teclas_de_jogo_validas: # Verifica se é uma tecla de jogo
-                                if evento.key == tecla_certa:
-                                    if evento_aleatorio == "caixa":
-                                        vidas_extra += 1
-                                        tocar_som("vida")
-                                    else:
-                                        tocar_som("desviou")
-                                    desviou = True
-                                else: # Tecla errada pressionada como primeira ação
-                                    pass # Não faz nada aqui, a colisão será tratada após o loop de reação
-                                
-                                acao_de_jogo_processada_neste_obstaculo = True # Marca que uma ação já foi tomada
-                                break # Sai do for loop de eventos, processamos a primeira ação válida
-                
-                if acao_de_jogo_processada_neste_obstaculo or jogo_encerrar:
-                    break # Sai do while loop de reação se a ação foi processada ou o jogo encerrou
-
-            # Após o loop de reação, verifica o resultado da ação para o obstáculo
-            if not desviou and not jogo_encerrar:
-                # Se não desviou E uma ação de jogo não foi processada (nenhuma tecla de jogo pressionada)
-                # OU a tecla errada foi pressionada como primeira ação, então conta como colisão.
-                # A condição 'not acao_de_jogo_processada_neste_obstaculo' significa que nenhuma tecla de jogo foi pressionada
-                # A condição 'desviou' ser False significa que a tecla correta não foi a primeira pressionada (ou nenhuma foi)
-                colisoes += 1
-                tocar_som("colisao")
-            elif desviou and not jogo_encerrar: # Se desviou (ou seja, a tecla certa foi a primeira)
-                pontos += 1
-
-                if pontos > 0 and pontos % 10 == 0:
-                    falar_nivel_progresso(pontos)
-
-            tempo_entre_obstaculos_atual = max(min_tempo_obstaculo, tempo_base_entre_obstaculos - (pontos * aceleracao_por_ponto))
-
-            ultimo_tempo_evento = time.time()
-
-        if colisoes >= max_colisoes + vidas_extra:
-            pygame.mixer.music.stop()
-            tocar_e_esperar("fim")
-
+        if not motor.fim_de_jogo and motor.obstaculo_devido():
+            # Quanto o obstáculo saiu depois do previsto (atraso do próprio loop, não do jogador)
+            atraso_loop = time.perf_counter() - motor.proximo_obstaculo_em()
+            obstaculo = motor.gerar_obstaculo()
+            atrasos_loop[obstaculo.numero] = atraso_loop
+            if gravador:
+                gravador.obstaculo(obstaculo.numero, obstaculo)
+            transmissao.publicar("obstaculo", numero=obstaculo.numero, direcao=obstaculo.tipo, prazo=round(obstaculo.prazo - obstaculo.inicio, 4))
+            tocar_som_direcional(obstaculo.tipo, obstaculo.tipo, intervalo=motor.tempo_entre_obstaculos)
+
+        perfil.fim_quadro(len(events), canais.total_tocados, fila_fala.profundidade() if fila_fala else 0)
+
+        if motor.fim_de_jogo:
+            perfil.marca("fim de jogo")
+            transmissao.publicar("fim", pontos=motor.pontos, nivel=motor.nivel, concluida=True)
+            if gravador:
+                gravador.fechar(motor)
+                gravador = None
+            resumo_latencias = registro_latencias.percentis()
+            if imprimir_telemetria:
+                print(registro_latencias.formatar())
+            # A música abaixa sob o jingle de fim e depois sai em fade, sem corte seco
+            tocar_e_esperar("fim", restaurar_musica=False)
+            pygame.mixer.music.fadeout(1000)
+
+            # Placar e área de transferência ficam na thread do placar: o fim de jogo não espera
+            # pelo disco, pelo nome do computador nem pelo pyperclip
+            pontos = motor.pontos
+            nivel_final = motor.nivel
+            registrar_partida(motor, nivel_dificuldade_escolhido, semente, time.perf_counter() - inicio_partida, caminho_gravacao, True)
             agora = datetime.now()
-            nome_computador = socket.gethostname()
-
-            dia = agora.day
-            mes_extenso = agora.strftime('%B').capitalize()
-            ano = agora.year
-            hora = agora.hour
-            minuto = agora.minute
-
-            nivel_final = (pontos // 10) + 1
-
-            resultado = f"Dia {dia} de {mes_extenso} de {ano}, às {hora}:{minuto:02d}, {nome_computador} concluiu o jogo na dificuldade '{dificuldade_texto}' com {pontos} pontos, no nível {nivel_final}."
-
-            pyperclip.copy(resultado)
-            # print("Fim de jogo!")
-            # print("Resultado copiado para a área de transferência:")
-            # print(resultado) # Não imprime para o console/log
+            placar_sessoes.enviar_tarefa(lambda placar: copiar_resultado(placar, agora, dificuldade_texto, pontos, nivel_final))
 
             time.sleep(0.5)
             falar_universal(f"Você fez {pontos} pontos no nível {nivel_final}. Resultado copiado para a área de transferência.", prioridade=True)
@@ -917,7 +1221,7 @@ def iniciar_jogo():
             # Garante que o evento de término da fala final é setado
             voz_sapi_terminou_evento.wait(timeout=max_sapi_wait_at_end)
 
-            if voz_sapi_ocupada:
+            if voz_sapi_ocupada():
                 # print("AVISO: [FIM] Fala final não terminou a tempo. Forçando parada do SAPI para encerrar o jogo.")
                 parar_fala_voz()
 
@@ -926,29 +1230,192 @@ def iniciar_jogo():
             break
 
         pygame.display.flip() # Garante que Pygame atualiza a tela (mesmo que seja 100x100 preta)
-        pygame.time.Clock().tick(60)
+
+    # Partida interrompida (Escape): fecha a gravação, se houver, e registra o placar parcial
+    if not motor.fim_de_jogo:
+        transmissao.publicar("fim", pontos=motor.pontos, nivel=motor.nivel, concluida=False)
+        if gravador:
+            gravador.fechar(motor)
+        registrar_partida(motor, nivel_dificuldade_escolhido, semente, time.perf_counter() - inicio_partida, caminho_gravacao, False)
+
+def jogar_em_rede(endereco=None):
+    """
+    Corrida em rede (--rede host:porta, servidor_corrida.py): a cada largada,
+    toca as pistas da linha do tempo que o servidor sorteou, manda as teclas
+    com a latência medida aqui e toca a resposta quando chega o veredito.
+    Depois de cada corrida o servidor põe o jogador de novo na sala; Escape sai.
+    """
+    global jogo_encerrar
+    from placar import nome_computador
+    from servidor_corrida import PORTA_PADRAO, TOLERANCIA_REDE, ConexaoCorrida
+
+    endereco = endereco or f"127.0.0.1:{PORTA_PADRAO}"
+    if not inicializar() or not fila_fala.pronta(timeout=5.0) or not aguardar_sons_prontos():
+        jogo_encerrar = True
+        return
+    try:
+        conexao = ConexaoCorrida(endereco, nome_computador(), ao_receber=lambda: pygame.event.post(pygame.event.Event(EVENTO_REDE)))
+    except (OSError, ValueError):
+        falar_universal("Não foi possível conectar ao servidor da corrida.", prioridade=True)
+        voz_sapi_terminou_evento.wait(timeout=5)
+        return
+    falar_universal("Conectado. Aguardando a largada.")
+
+    obstaculos = []
+    proximo = 0
+    pendentes = {} # Obstáculos cuja pista já tocou e que ainda não receberam tecla, por número
+    inicio = 0.0 # perf_counter da largada
+    vidas = MAX_COLISOES
+    try:
+        while not jogo_encerrar:
+            espera = 0.25
+            if proximo < len(obstaculos):
+                espera = min(espera, inicio + obstaculos[proximo].inicio - time.perf_counter())
+            events = aguardar_eventos_pygame(espera) if espera > 0 else get_all_pygame_events()
+            instante_coleta = time.perf_counter()
+            if jogo_encerrar:
+                break
+
+            fechada = conexao.fechada
+            for recebida, mensagem in conexao.recebidas():
+                tipo = mensagem.get("tipo")
+                if tipo == "corrida":
+                    config = config_dificuldade(mensagem["dificuldade"])
+                    obstaculos = linha_do_tempo(config, mensagem["semente"], mensagem["obstaculos"], mensagem["janela"])
+                    proximo = 0
+                    pendentes.clear()
+                    inicio = recebida + mensagem["inicio_em"]
+                    vidas = MAX_COLISOES
+                    falar_universal(f"Corrida {mensagem['corrida']}, dificuldade {config.texto}, começa em "
+                                    f"{max(1, round(mensagem['inicio_em']))} segundos.", prioridade=True)
+                elif tipo == "veredito":
+                    pendentes.pop(mensagem["numero"], None)
+                    if not mensagem["desviou"]:
+                        tocar_som("colisao")
+                    elif mensagem["vidas"] > vidas:
+                        tocar_som("vida")
+                    else:
+                        tocar_som("desviou")
+                    vidas = mensagem["vidas"]
+                    if vidas <= 0:
+                        falar_universal("Você foi eliminado. Aguarde o fim da corrida.", prioridade=True)
+                elif tipo == "fim":
+                    obstaculos = []
+                    pendentes.clear()
+                    falar_universal(f"Fim da corrida. Você ficou em {mensagem['posicao']}º lugar entre {mensagem['jogadores']}, "
+                                    f"com {mensagem['pontos']} pontos.", prioridade=True)
+                elif tipo == "cheio":
+                    falar_universal("O servidor da corrida está cheio.", prioridade=True)
+                    fechada = True
+            if fechada:
+                falar_universal("A conexão com o servidor da corrida foi encerrada.", prioridade=True)
+                voz_sapi_terminou_evento.wait(timeout=5)
+                break
+
+            for evento in events:
+                if evento.type != pygame.KEYDOWN:
+                    continue
+                if evento.key == pygame.K_v:
+                    falar_vidas_restantes(vidas)
+                elif evento.key in TECLAS_ACOES and pendentes and vidas > 0:
+                    # Como o MotorJogo.casar_tecla: o mais antigo que a tecla desvia; senão, o mais antigo
+                    acao = TECLAS_ACOES[evento.key]
+                    obstaculo = next((o for o in pendentes.values() if ACAO_CERTA[o.tipo] == acao), next(iter(pendentes.values())))
+                    del pendentes[obstaculo.numero]
+                    conexao.enviar({"tipo": "tecla", "numero": obstaculo.numero, "acao": acao,
+                                    "latencia": round(instante_coleta - inicio - obstaculo.inicio, 4)})
+
+            # Sem tecla até o prazo: o servidor julga como colisão e o veredito chega pela rede
+            for numero in [n for n, o in pendentes.items() if instante_coleta > inicio + o.prazo + TOLERANCIA_REDE]:
+                del pendentes[numero]
+
+            while proximo < len(obstaculos) and time.perf_counter() >= inicio + obstaculos[proximo].inicio:
+                obstaculo = obstaculos[proximo]
+                intervalo = obstaculo.inicio - obstaculos[proximo - 1].inicio if proximo else obstaculo.inicio
+                proximo += 1
+                if vidas > 0:
+                    pendentes[obstaculo.numero] = obstaculo
+                    tocar_som_direcional(obstaculo.tipo, obstaculo.tipo, intervalo=intervalo)
+    finally:
+        conexao.fechar()
 
 # Ponto de Entrada Principal
 if __name__ == "__main__":
+    if "--tempo-inicio" in sys.argv:
+        # Linha do tempo da abertura: fases até a primeira fala e os sons prontos, e as importações mais caras
+        from fala import BackendNulo
+        inicializar(backend_fala=BackendNulo() if "--sem-voz" in sys.argv else None)
+        if fila_fala is not None and fila_fala.pronta(timeout=5.0):
+            linha_tempo.marcar("motor de voz pronto")
+            while fila_fala.primeira_fala is None and not jogo_encerrar:
+                time.sleep(0.001)
+            linha_tempo.marcar("primeira fala", fila_fala.primeira_fala)
+        if aguardar_sons_prontos():
+            linha_tempo.marcar("sons prontos")
+        print(linha_tempo.formatar())
+        total, importacoes = resumo_importtime("play")
+        if total is not None:
+            print(f"\npython -X importtime: import play {total / 1000:.1f} ms")
+            for acumulado, nome in importacoes:
+                print(f"  {nome:28s} {acumulado / 1000:8.1f} ms")
+        if fila_fala is not None:
+            fila_fala.encerrar()
+        loaded_sounds.encerrar()
+        placar_sessoes.encerrar()
+        pygame.quit()
+        sys.exit(0)
+
+    if "--medir-jingles" in sys.argv:
+        inicializar(com_fala=False)
+        # Compara o início do jingle carregado do disco no stream com o da memória
+        r = comparar_latencia_jingles()
+        print(f"Do pedido até tocar: mixer.music do disco {r['streaming_ms']:.2f} ms, canal reservado da memória {r['memoria_ms']:.2f} ms")
+        pygame.quit()
+        sys.exit(0)
+
+    if "--medir-cpu" in sys.argv:
+        inicializar(com_fala=False)
+        # Compara o uso de CPU da janela de reação antiga (laço ocupado) com a atual
+        for rotulo, r in comparar_cpu_janela_reacao().items():
+            print(f"{rotulo:7s} CPU {r['cpu_ms_por_janela']:.1f} ms por janela de {r['parede_ms_por_janela']:.0f} ms ({r['uso_cpu']:.1%} de um núcleo)")
+        pygame.quit()
+        sys.exit(0)
+
     try:
-        iniciar_jogo()
+        if "--rede" in sys.argv:
+            # Corrida em rede: python play.py --rede host:porta (servidor_corrida.py)
+            indice = sys.argv.index("--rede")
+            jogar_em_rede(sys.argv[indice + 1] if len(sys.argv) > indice + 1 else None)
+        else:
+            iniciar_jogo()
     finally:
-        if voz_sapi is not None:
+        if medir_cpu_reacao and medicoes_cpu_reacao:
+            r = resumo_cpu_reacao(medicoes_cpu_reacao)
+            print(f"CPU por janela de reação: {r['cpu_ms_por_janela']:.1f} ms em {r['janelas']} janelas ({r['uso_cpu']:.1%} de um núcleo)")
+
+        if fila_fala is not None:
             try:
-                # print("INFO: Tentando finalizar voz SAPI...")
+                # print("INFO: Tentando finalizar a voz...")
                 parar_fala_voz()
-                time.sleep(0.1)
-                # Desconecta o COM object para liberar recursos do sistema
-                if hasattr(voz_sapi, 'engine') and hasattr(voz_sapi.engine.proxy) and hasattr(voz_sapi.engine.proxy, 'disconnect'):
-                    voz_sapi.engine.proxy.disconnect()
-
-                voz_sapi.stop() # Chamado novamente para garantir a parada do runAndWait na thread
-                voz_sapi = None
-                # print("INFO: Voz SAPI finalizada com sucesso.")
+                fila_fala.encerrar() # Para o backend e a thread de fala
+                fila_fala = None
+                # print("INFO: Voz finalizada com sucesso.")
             except Exception as e:
-                # print(f"AVISO: Erro ao tentar finalizar voz SAPI no encerramento: {e}")
+                # print(f"AVISO: Erro ao tentar finalizar a voz no encerramento: {e}")
                 pass # Não exibe erro para o usuário final
 
+        if loaded_sounds is not None:
+            loaded_sounds.encerrar()
+        if placar_sessoes is not None:
+            placar_sessoes.encerrar() # Grava as partidas que ainda estiverem na fila
+        if transmissao is not None:
+            if transmissao.ativa:
+                for nome, a in transmissao.contadores()["assinantes"].items():
+                    print(f"Transmissão, {nome}: {a['entregues']} eventos entregues, {a['perdidos']} perdidos, "
+                          f"atraso {a['atraso_eventos']} eventos / {a['atraso_ms']:.1f} ms (máximo {a['atraso_max_ms']:.1f} ms)")
+            transmissao.encerrar()
+        perfil.encerrar() # Com o perfil ligado: resumo no console e trace em perfis/
+
         if pygame.get_init():
             pygame.quit()
             # print("INFO: Pygame finalizado.")
@@ -0,0 +1,611 @@
+# -*- coding: utf-8 -*-
+"""
+Corrida em rede: vários jogadores contra os mesmos obstáculos.
+
+Um servidor asyncio (uma thread, um núcleo) junta na sala quem se conecta
+e, a cada corrida, sorteia uma semente e manda a todos a semente, a
+dificuldade, a janela de reação e em quantos segundos a corrida começa.
+Cada cliente gera a mesma linha do tempo (simulacao.linha_do_tempo) e toca
+as pistas no seu relógio; a cada tecla manda o número do obstáculo, a ação
+e a latência, e o servidor julga com a regra do jogo (simulacao.desvia) e
+responde com o veredito. Obstáculo sem tecla até o prazo (mais
+TOLERANCIA_REDE) é colisão. A classificação (os CLASSIFICACAO_TOPO
+primeiros) vai para todos a cada INTERVALO_CLASSIFICACAO segundos,
+serializada uma vez só.
+
+O estado de cada jogador é um registro Sessao com __slots__: pontos,
+colisões, vidas extras e um inteiro usado como conjunto de bits dos
+obstáculos já resolvidos, sem um MotorJogo por jogador.
+
+Buffers limitados por cliente: a leitura aceita linhas de até TAMANHO_LINHA
+bytes, e o servidor nunca espera um cliente na escrita. Se o buffer de
+saída de um cliente passa de LIMITE_BUFFER, as classificações para ele são
+descartadas; se um veredito ou o fim da corrida não couber, o cliente lento
+é desconectado.
+
+O jogo entra numa corrida com python play.py --rede host:porta
+(ConexaoCorrida): toca as pistas da linha do tempo e manda as teclas.
+
+A latência mandada pelo cliente é limitada por baixo pela que o servidor
+observa menos o tempo de ida e volta daquele cliente (medido com o "t" do
+bem_vindo e de cada corrida, que o cliente devolve num pong; no máximo
+TOLERANCIA_REDE, e zero enquanto não houver medida): um cliente não desvia
+de tudo mandando latência zero.
+
+Protocolo (uma mensagem JSON por linha):
+  cliente -> servidor: {"tipo": "entrar", "nome": ...}
+                       {"tipo": "tecla", "numero": n, "acao": "seta_direita", "latencia": 0.41}
+                       {"tipo": "pong", "t": t} (resposta ao bem_vindo e a cada corrida)
+                       {"tipo": "contadores"}
+  servidor -> cliente: bem_vindo, corrida, veredito, classificacao, fim, contadores, cheio
+
+Uso: python servidor_corrida.py [--porta P] [--dificuldade N] [--espera SEGUNDOS]
+     python servidor_corrida.py --carga [clientes] [--corridas N] [--endereco host:porta]
+"""
+import argparse
+import asyncio
+import heapq
+import itertools
+import json
+import os
+import queue
+import random
+import socket
+import subprocess
+import sys
+import threading
+import time
+from collections import deque, namedtuple
+
+from simulacao import (JANELA_REACAO, MAX_COLISOES, TEMPO_MINIMO_ENTRE_TECLAS, JogadorHumano, config_dificuldade,
+                       desvia, linha_do_tempo)
+
+PORTA_PADRAO = 47700
+
+# Sala: espera depois do primeiro jogador, e aviso antes da largada
+ESPERA_SALA = 3.0
+AVISO_LARGADA = 2.0
+
+OBSTACULOS_POR_CORRIDA = 100
+TOLERANCIA_REDE = 0.25 # Folga no prazo de cada obstáculo para a tecla atravessar a rede
+
+INTERVALO_CLASSIFICACAO = 1.0
+CLASSIFICACAO_TOPO = 10
+
+# Limites por cliente
+TAMANHO_LINHA = 1024
+LIMITE_BUFFER = 64 * 1024
+MAX_SESSOES = 1000
+
+INTERVALO_MONITOR = 0.05 # Amostragem do atraso do loop do servidor
+
+
+def codificar(mensagem):
+    return json.dumps(mensagem, separators=(",", ":"), ensure_ascii=False).encode("utf-8") + b"\n"
+
+
+def percentil(valores, p):
+    if not valores:
+        return None
+    ordenados = sorted(valores)
+    return ordenados[min(len(ordenados) - 1, int(len(ordenados) * p / 100))]
+
+
+class Sessao:
+    """Um jogador conectado: só o necessário para julgar e classificar."""
+
+    __slots__ = ("id", "nome", "escritor", "corrida", "folga_rede", "pontos", "colisoes", "vidas_extra", "resolvidos")
+
+    def __init__(self, id, escritor):
+        self.id = id
+        self.nome = f"jogador{id}"
+        self.escritor = escritor
+        self.corrida = None
+        self.folga_rede = None # Menor ida e volta medida (limitada a TOLERANCIA_REDE); None: sem medida
+        self.reiniciar()
+
+    def reiniciar(self):
+        self.pontos = 0
+        self.colisoes = 0
+        self.vidas_extra = 0
+        self.resolvidos = 0 # Bit n ligado: obstáculo n já julgado
+
+    @property
+    def eliminada(self):
+        return self.colisoes >= MAX_COLISOES + self.vidas_extra
+
+    @property
+    def vidas_restantes(self):
+        return MAX_COLISOES + self.vidas_extra - self.colisoes
+
+    def resolver(self, obstaculo, acao, latencia, janela_reacao):
+        """Aplica o resultado do obstáculo (acao None: sem tecla). Retorna True se desviou."""
+        self.resolvidos |= 1 << obstaculo.numero
+        if desvia(obstaculo.tipo, acao, latencia, janela_reacao):
+            if obstaculo.tipo == "caixa":
+                self.vidas_extra += 1
+            self.pontos += 1
+            return True
+        self.colisoes += 1
+        return False
+
+
+class Corrida:
+    """Uma largada: semente, linha do tempo compartilhada e as sessões que correm nela."""
+
+    def __init__(self, numero, semente, dificuldade, inicio, janela_reacao=JANELA_REACAO,
+                 quantidade=OBSTACULOS_POR_CORRIDA):
+        self.numero = numero
+        self.semente = semente
+        self.dificuldade = dificuldade
+        self.inicio = inicio # loop.time() da largada
+        self.janela_reacao = janela_reacao
+        self.obstaculos = linha_do_tempo(config_dificuldade(dificuldade), semente, quantidade, janela_reacao)
+        self.sessoes = {}
+
+    def anuncio(self, agora):
+        return {"tipo": "corrida", "corrida": self.numero, "semente": self.semente, "dificuldade": self.dificuldade,
+                "janela": self.janela_reacao, "obstaculos": len(self.obstaculos), "inicio_em": self.inicio - agora, "t": agora}
+
+    def ativas(self):
+        return [sessao for sessao in self.sessoes.values() if not sessao.eliminada]
+
+    def ordem(self):
+        """Sessões da melhor para a pior: mais pontos, menos colisões, quem entrou antes."""
+        return sorted(self.sessoes.values(), key=lambda s: (-s.pontos, s.colisoes, s.id))
+
+
+class ServidorCorrida:
+    """Sala, corridas e os contadores do servidor."""
+
+    def __init__(self, dificuldade=2, espera=ESPERA_SALA, limite_buffer=LIMITE_BUFFER, max_sessoes=MAX_SESSOES,
+                 quantidade=OBSTACULOS_POR_CORRIDA, semente=None):
+        self.dificuldade = dificuldade
+        self.espera = espera
+        self.limite_buffer = limite_buffer
+        self.max_sessoes = max_sessoes
+        self.quantidade = quantidade
+        self.rng = random.Random(semente)
+        self.ids = itertools.count(1)
+        self.numeros_corrida = itertools.count(1)
+        self.sessoes = {}
+        self.sala = {}
+        self.corrida = None
+        self.tem_jogador = None
+        self.servidor = None
+        self.atrasos_loop = deque(maxlen=4096)
+        self.contadores = {"conexoes": 0, "sessoes_max": 0, "recusadas": 0, "corridas": 0, "teclas": 0,
+                           "tardias": 0, "invalidas": 0, "vereditos": 0, "colisoes_prazo": 0,
+                           "classificacoes": 0, "classificacoes_descartadas": 0, "desconectadas_lentas": 0,
+                           "bytes_enviados": 0}
+
+    async def iniciar(self, host="127.0.0.1", porta=PORTA_PADRAO):
+        self.tem_jogador = asyncio.Event()
+        self.servidor = await asyncio.start_server(self._atender, host, porta, limit=TAMANHO_LINHA)
+        asyncio.get_running_loop().create_task(self._salao())
+        asyncio.get_running_loop().create_task(self._monitorar_loop())
+        return self.servidor.sockets[0].getsockname()[:2]
+
+    # Escrita sem espera: o loop nunca fica parado por um cliente lento
+
+    def enviar(self, sessao, dados, essencial=True):
+        transporte = sessao.escritor.transport
+        if transporte.is_closing():
+            return False
+        if transporte.get_write_buffer_size() + len(dados) > self.limite_buffer:
+            if not essencial:
+                self.contadores["classificacoes_descartadas"] += 1
+                return False
+            self.contadores["desconectadas_lentas"] += 1
+            transporte.abort()
+            return False
+        sessao.escritor.write(dados)
+        self.contadores["bytes_enviados"] += len(dados)
+        return True
+
+    # Conexões
+
+    async def _atender(self, leitor, escritor):
+        self.contadores["conexoes"] += 1
+        if len(self.sessoes) >= self.max_sessoes:
+            self.contadores["recusadas"] += 1
+            escritor.write(codificar({"tipo": "cheio"}))
+            escritor.close()
+            return
+        sessao = Sessao(next(self.ids), escritor)
+        self.sessoes[sessao.id] = sessao
+        self.contadores["sessoes_max"] = max(self.contadores["sessoes_max"], len(self.sessoes))
+        try:
+            while True:
+                linha = await leitor.readline()
+                if not linha:
+                    break
+                mensagem = json.loads(linha)
+                tipo = mensagem.get("tipo")
+                if tipo == "tecla":
+                    self._tecla(sessao, mensagem)
+                elif tipo == "entrar":
+                    sessao.nome = str(mensagem.get("nome", sessao.nome))[:32]
+                    self.sala[sessao.id] = sessao
+                    self.tem_jogador.set()
+                    self.enviar(sessao, codificar({"tipo": "bem_vindo", "id": sessao.id,
+                                                   "t": asyncio.get_running_loop().time()}))
+                elif tipo == "pong":
+                    self._pong(sessao, mensagem.get("t"))
+                elif tipo == "contadores":
+                    self.enviar(sessao, codificar(dict(self.resumo(), tipo="contadores")))
+                else:
+                    self.contadores["invalidas"] += 1
+        except (ValueError, AttributeError, ConnectionError):
+            self.contadores["invalidas"] += 1 # Linha longa demais, JSON inválido ou conexão caída
+        finally:
+            self.sessoes.pop(sessao.id, None)
+            self.sala.pop(sessao.id, None)
+            if sessao.corrida is not None:
+                sessao.corrida.sessoes.pop(sessao.id, None)
+            escritor.close()
+
+    def _tecla(self, sessao, mensagem):
+        self.contadores["teclas"] += 1
+        corrida = sessao.corrida
+        numero = mensagem.get("numero")
+        if corrida is None or not isinstance(numero, int) or not 1 <= numero <= len(corrida.obstaculos):
+            self.contadores["invalidas"] += 1
+            return
+        if sessao.eliminada:
+            self.contadores["tardias"] += 1 # Tecla que já estava na rede quando o jogador caiu
+            return
+        if sessao.resolvidos >> numero & 1:
+            self.contadores["tardias"] += 1 # Já julgado (segunda tecla ou prazo vencido)
+            return
+        obstaculo = corrida.obstaculos[numero - 1]
+        agora = asyncio.get_running_loop().time() - corrida.inicio
+        if agora < obstaculo.inicio - TOLERANCIA_REDE:
+            self.contadores["invalidas"] += 1 # Tecla antes de a pista tocar
+            return
+        latencia = mensagem.get("latencia")
+        if not isinstance(latencia, (int, float)) or latencia < 0:
+            latencia = agora - obstaculo.inicio # Sem medida do cliente: a do servidor
+        else:
+            # A medida do cliente desconta a rede, mas só até a ida e volta medida deste cliente
+            folga = sessao.folga_rede if sessao.folga_rede is not None else 0.0
+            latencia = max(latencia, agora - obstaculo.inicio - folga)
+        desviou = sessao.resolver(obstaculo, mensagem.get("acao"), latencia, corrida.janela_reacao)
+        self._veredito(sessao, numero, desviou)
+
+    def _pong(self, sessao, t):
+        """Ida e volta de uma mensagem com 't': a folga de rede do cliente é a menor medida."""
+        agora = asyncio.get_running_loop().time()
+        if not isinstance(t, (int, float)) or t > agora:
+            self.contadores["invalidas"] += 1
+            return
+        ida_volta = min(agora - t, TOLERANCIA_REDE)
+        sessao.folga_rede = ida_volta if sessao.folga_rede is None else min(sessao.folga_rede, ida_volta)
+
+    def _veredito(self, sessao, numero, desviou):
+        self.contadores["vereditos"] += 1
+        self.enviar(sessao, codificar({"tipo": "veredito", "numero": numero, "desviou": desviou,
+                                       "pontos": sessao.pontos, "vidas": sessao.vidas_restantes}))
+
+    # Corridas
+
+    async def _salao(self):
+        """Junta quem está na sala e larga uma corrida; depois da corrida, todos voltam para a sala."""
+        loop = asyncio.get_running_loop()
+        while True:
+            await self.tem_jogador.wait()
+            await asyncio.sleep(self.espera)
+            if not self.sala:
+                self.tem_jogador.clear()
+                continue
+            corrida = Corrida(next(self.numeros_corrida), self.rng.getrandbits(63), self.dificuldade,
+                              loop.time() + AVISO_LARGADA, quantidade=self.quantidade)
+            corrida.sessoes = dict(self.sala)
+            self.sala.clear()
+            self.tem_jogador.clear()
+            self.corrida = corrida
+            self.contadores["corridas"] += 1
+            anuncio = corrida.anuncio(loop.time())
+            for sessao in corrida.sessoes.values():
+                sessao.reiniciar()
+                sessao.corrida = corrida
+                self.enviar(sessao, codificar(anuncio))
+            await self._correr(corrida)
+            for sessao in corrida.sessoes.values():
+                sessao.corrida = None
+                if sessao.id in self.sessoes:
+                    self.sala[sessao.id] = sessao
+            if self.sala:
+                self.tem_jogador.set()
+
+    async def _correr(self, corrida):
+        """Vence os prazos na ordem da linha do tempo e manda a classificação até todos caírem."""
+        loop = asyncio.get_running_loop()
+        proxima_classificacao = loop.time() + INTERVALO_CLASSIFICACAO
+        for obstaculo in corrida.obstaculos: # Janela fixa: a ordem dos prazos é a dos inícios
+            prazo = corrida.inicio + obstaculo.prazo + TOLERANCIA_REDE
+            while True:
+                agora = loop.time()
+                if agora >= prazo:
+                    break
+                if agora >= proxima_classificacao:
+                    self._classificacao(corrida)
+                    proxima_classificacao += INTERVALO_CLASSIFICACAO
+                await asyncio.sleep(min(prazo, proxima_classificacao) - agora)
+            bit = 1 << obstaculo.numero
+            for sessao in corrida.ativas():
+                if not sessao.resolvidos & bit:
+                    self.contadores["colisoes_prazo"] += 1
+                    self._veredito(sessao, obstaculo.numero, sessao.resolver(obstaculo, None, None, corrida.janela_reacao))
+            if not corrida.ativas():
+                break
+
+        topo = self._topo(corrida)
+        ordem = corrida.ordem()
+        for posicao, sessao in enumerate(ordem, 1):
+            self.enviar(sessao, codificar({"tipo": "fim", "corrida": corrida.numero, "posicao": posicao,
+                                           "jogadores": len(ordem), "pontos": sessao.pontos, "topo": topo}))
+
+    def _topo(self, corrida):
+        melhores = heapq.nsmallest(CLASSIFICACAO_TOPO, corrida.sessoes.values(), key=lambda s: (-s.pontos, s.colisoes, s.id))
+        return [[s.nome, s.pontos, s.vidas_restantes] for s in melhores]
+
+    def _classificacao(self, corrida):
+        """A mesma mensagem para todos, serializada uma vez; clientes atrasados ficam sem ela."""
+        dados = codificar({"tipo": "classificacao", "corrida": corrida.numero, "jogadores": len(corrida.sessoes),
+                           "ativos": len(corrida.ativas()), "topo": self._topo(corrida)})
+        for sessao in list(corrida.sessoes.values()):
+            if self.enviar(sessao, dados, essencial=False):
+                self.contadores["classificacoes"] += 1
+
+    async def _monitorar_loop(self):
+        """Quanto o loop atrasa para acordar uma tarefa: o custo de todas as sessões juntas."""
+        loop = asyncio.get_running_loop()
+        while True:
+            antes = loop.time()
+            await asyncio.sleep(INTERVALO_MONITOR)
+            self.atrasos_loop.append(loop.time() - antes - INTERVALO_MONITOR)
+
+    def resumo(self):
+        atrasos = list(self.atrasos_loop)
+        return dict(self.contadores, sessoes=len(self.sessoes),
+                    atraso_loop_p99_ms=(percentil(atrasos, 99) or 0.0) * 1000,
+                    atraso_loop_max_ms=(max(atrasos) if atrasos else 0.0) * 1000)
+
+
+# Cliente do jogo (play.py --rede): socket bloqueante e uma thread de leitura
+
+class ConexaoCorrida:
+    """
+    Conexão do jogo com o servidor. Uma thread lê as mensagens para uma fila,
+    com o instante (perf_counter) em que chegaram, e chama 'ao_receber' para
+    acordar o loop do jogo; recebidas() as retira sem esperar.
+    """
+
+    def __init__(self, endereco, nome, ao_receber=None, timeout=5.0):
+        host, porta = endereco.rsplit(":", 1)
+        self.sock = socket.create_connection((host, int(porta)), timeout=timeout)
+        self.sock.settimeout(None)
+        self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1) # Teclas saem na hora
+        self.ao_receber = ao_receber
+        self.fila = queue.SimpleQueue()
+        self.fechada = False
+        self.lock_envio = threading.Lock() # Pongs saem da thread de leitura, teclas da do jogo
+        self.thread = threading.Thread(target=self._ler, name="corrida_rede", daemon=True)
+        self.thread.start()
+        self.enviar({"tipo": "entrar", "nome": nome})
+
+    def _ler(self):
+        try:
+            with self.sock.makefile("rb") as arquivo:
+                for linha in arquivo:
+                    instante = time.perf_counter()
+                    mensagem = json.loads(linha)
+                    if mensagem.get("tipo") in ("bem_vindo", "corrida"):
+                        self.enviar({"tipo": "pong", "t": mensagem["t"]}) # Já, para medir só a rede
+                    self.fila.put((instante, mensagem))
+                    if self.ao_receber:
+                        self.ao_receber()
+        except (OSError, ValueError):
+            pass
+        self.fechada = True
+        if self.ao_receber:
+            self.ao_receber()
+
+    def recebidas(self):
+        mensagens = []
+        while True:
+            try:
+                mensagens.append(self.fila.get_nowait())
+            except queue.Empty:
+                return mensagens
+
+    def enviar(self, mensagem):
+        try:
+            with self.lock_envio:
+                self.sock.sendall(codificar(mensagem))
+        except OSError:
+            self.fechada = True
+
+    def fechar(self):
+        try:
+            self.sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+        self.sock.close()
+
+
+# Gerador de carga: clientes simulados com o modelo de jogador da simulação
+
+Ritmo = namedtuple("Ritmo", "tempo_entre_obstaculos janela_reacao")
+
+
+class ClienteSimulado:
+    """Um jogador simulado: reage aos obstáculos da linha do tempo com o JogadorHumano."""
+
+    def __init__(self, nome, corridas, semente):
+        self.nome = nome
+        self.corridas = corridas
+        self.rng = random.Random(semente)
+        self.jogador = JogadorHumano()
+        self.enviadas = {}
+        self.rtts = []
+        self.vereditos = 0
+        self.classificacoes = 0
+        self.concluidas = 0
+        self.vidas = MAX_COLISOES
+        self.erro = None
+
+    async def executar(self, host, porta):
+        try:
+            leitor, escritor = await asyncio.open_connection(host, porta)
+        except OSError as e:
+            self.erro = f"conexão: {e}"
+            return
+        escritor.write(codificar({"tipo": "entrar", "nome": self.nome}))
+        jogo = None
+        try:
+            while self.concluidas < self.corridas:
+                linha = await leitor.readline()
+                if not linha:
+                    self.erro = "servidor fechou a conexão"
+                    break
+                mensagem = json.loads(linha)
+                tipo = mensagem["tipo"]
+                agora = asyncio.get_running_loop().time()
+                if tipo == "veredito":
+                    self.vereditos += 1
+                    self.vidas = mensagem["vidas"]
+                    enviada = self.enviadas.pop(mensagem["numero"], None)
+                    if enviada is not None:
+                        self.rtts.append(agora - enviada)
+                elif tipo == "classificacao":
+                    self.classificacoes += 1
+                elif tipo in ("bem_vindo", "corrida"):
+                    escritor.write(codificar({"tipo": "pong", "t": mensagem["t"]}))
+                if tipo == "corrida":
+                    if jogo is not None:
+                        jogo.cancel()
+                    self.vidas = MAX_COLISOES
+                    self.enviadas.clear()
+                    jogo = asyncio.get_running_loop().create_task(self._jogar(escritor, mensagem, agora + mensagem["inicio_em"]))
+                elif tipo == "fim":
+                    if jogo is not None:
+                        jogo.cancel() # Teclas que sobraram não valem mais
+                    self.concluidas += 1
+                elif tipo == "cheio":
+                    self.erro = "servidor cheio"
+                    break
+        except (ValueError, ConnectionError) as e:
+            self.erro = f"protocolo: {e}"
+        finally:
+            if jogo is not None:
+                jogo.cancel()
+            escritor.close()
+
+    async def _jogar(self, escritor, anuncio, inicio):
+        """Agenda as teclas como o simular_partida: uma reação por obstáculo, sem teclas amontoadas."""
+        loop = asyncio.get_running_loop()
+        config = config_dificuldade(anuncio["dificuldade"])
+        obstaculos = linha_do_tempo(config, anuncio["semente"], anuncio["obstaculos"], anuncio["janela"])
+        teclas = []
+        ultima = -1.0
+        anterior = 0.0
+        for obstaculo in obstaculos:
+            ritmo = Ritmo(obstaculo.inicio - anterior, anuncio["janela"])
+            anterior = obstaculo.inicio
+            acao, latencia = self.jogador.reagir(obstaculo, ritmo, self.rng)
+            if acao is not None:
+                ultima = max(obstaculo.inicio + latencia, ultima + TEMPO_MINIMO_ENTRE_TECLAS)
+                teclas.append((ultima, obstaculo, acao))
+        for instante, obstaculo, acao in teclas:
+            espera = inicio + instante - loop.time()
+            if espera > 0:
+                await asyncio.sleep(espera)
+            if self.vidas <= 0:
+                return
+            self.enviadas[obstaculo.numero] = loop.time()
+            escritor.write(codificar({"tipo": "tecla", "numero": obstaculo.numero, "acao": acao,
+                                      "latencia": round(instante - obstaculo.inicio, 4)}))
+
+
+async def consultar_contadores(host, porta):
+    leitor, escritor = await asyncio.open_connection(host, porta)
+    escritor.write(codificar({"tipo": "contadores"}))
+    resposta = json.loads(await leitor.readline())
+    escritor.close()
+    return resposta
+
+
+async def gerar_carga(host, porta, clientes, corridas, semente=1, escalonar=0.002):
+    """Conecta 'clientes' jogadores simulados e espera todos correrem 'corridas' corridas."""
+    simulados = [ClienteSimulado(f"sim{i}", corridas, semente + i) for i in range(clientes)]
+    tarefas = []
+    for cliente in simulados:
+        tarefas.append(asyncio.get_running_loop().create_task(cliente.executar(host, porta)))
+        await asyncio.sleep(escalonar) # Não abre todas as conexões no mesmo instante
+    await asyncio.gather(*tarefas)
+    return simulados, await consultar_contadores(host, porta)
+
+
+def iniciar_servidor_local(dificuldade, espera):
+    """Sobe o servidor num processo próprio (o seu núcleo) numa porta livre. Retorna (processo, host, porta)."""
+    processo = subprocess.Popen([sys.executable, os.path.abspath(__file__), "--porta", "0", "--dificuldade", str(dificuldade),
+                                 "--espera", str(espera)], stdout=subprocess.PIPE, text=True)
+    linha = processo.stdout.readline() # "Servidor em host:porta"
+    host, porta = linha.split()[-1].rsplit(":", 1)
+    return processo, host, int(porta)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Servidor de corrida em rede e gerador de carga.")
+    parser.add_argument("--porta", type=int, default=PORTA_PADRAO)
+    parser.add_argument("--dificuldade", type=int, default=2)
+    parser.add_argument("--espera", type=float, default=ESPERA_SALA, help="segundos de sala antes da largada")
+    parser.add_argument("--carga", nargs="?", type=int, const=300, help="roda N clientes simulados (padrão 300)")
+    parser.add_argument("--corridas", type=int, default=2, help="corridas por cliente simulado")
+    parser.add_argument("--endereco", help="host:porta de um servidor já rodando (padrão: sobe um local)")
+    args = parser.parse_args()
+
+    if args.carga is None:
+        async def servir():
+            servidor = ServidorCorrida(args.dificuldade, args.espera)
+            host, porta = await servidor.iniciar("127.0.0.1", args.porta)
+            print(f"Servidor em {host}:{porta}", flush=True)
+            await asyncio.Event().wait()
+        try:
+            asyncio.run(servir())
+        except KeyboardInterrupt:
+            pass
+        sys.exit(0)
+
+    processo = None
+    if args.endereco:
+        host, porta = args.endereco.rsplit(":", 1)
+        porta = int(porta)
+    else:
+        processo, host, porta = iniciar_servidor_local(args.dificuldade, args.espera)
+    try:
+        inicio = time.perf_counter()
+        simulados, servidor = asyncio.run(gerar_carga(host, porta, args.carga, args.corridas))
+        decorrido = time.perf_counter() - inicio
+    finally:
+        if processo is not None:
+            processo.terminate()
+            processo.wait()
+
+    rtts = [rtt for cliente in simulados for rtt in cliente.rtts]
+    falhas = [cliente for cliente in simulados if cliente.erro or cliente.concluidas < args.corridas]
+    print(f"{args.carga} clientes, {args.corridas} corridas cada, em {decorrido:.1f} s; "
+          f"{sum(c.vereditos for c in simulados)} vereditos, {sum(c.classificacoes for c in simulados)} classificações recebidas")
+    if rtts:
+        print(f"tecla -> veredito: p50 {percentil(rtts, 50) * 1000:.1f} ms, p99 {percentil(rtts, 99) * 1000:.1f} ms, "
+              f"máx {max(rtts) * 1000:.1f} ms")
+    print(f"servidor: {servidor['sessoes_max']} sessões no pico, {servidor['teclas']} teclas, "
+          f"{servidor['tardias']} tardias, {servidor['invalidas']} inválidas, "
+          f"{servidor['classificacoes_descartadas']} classificações descartadas, "
+          f"{servidor['desconectadas_lentas']} desconectados por lentidão")
+    print(f"atraso do loop do servidor: p99 {servidor['atraso_loop_p99_ms']:.1f} ms, máx {servidor['atraso_loop_max_ms']:.1f} ms")
+    for cliente in falhas[:5]:
+        print(f"FALHA {cliente.nome}: {cliente.erro or f'{cliente.concluidas} corridas concluídas'}")
+    sys.exit(1 if falhas else 0)
@@ -0,0 +1,339 @@
+# -*- coding: utf-8 -*-
+"""
+Núcleo de regras do Corrida Cega, sem áudio, tela ou relógio de parede.
+
+O MotorJogo guarda o estado de uma partida (pontos, colisões, vidas extras,
+aceleração) e decide obstáculos e resultados. Vários obstáculos podem estar
+no ar ao mesmo tempo, cada um com o seu prazo: os obstáculos surgem a cada
+tempo_entre_obstaculos, contado do anterior, e os prazos ficam numa fila de
+prioridade por tempo. O jogo interativo (play.py) usa o motor com o
+RelogioReal; a simulação usa um RelogioVirtual e um modelo de jogador, e
+roda milhares de partidas por segundo.
+"""
+import heapq
+import itertools
+import math
+import random
+import sys
+import time
+from collections import namedtuple
+
+ConfigDificuldade = namedtuple(
+    "ConfigDificuldade",
+    "texto tempo_base_entre_obstaculos aceleracao_por_ponto min_tempo_obstaculo caixa_probabilidade",
+)
+
+# Menor intervalo entre obstáculos que os canais do mixer aguentam sem perder som crítico:
+# a resposta mais longa (colisão, 0,62 s) nos 4 canais de resposta cabe a cada 0,155 s, e a
+# pista mais rápida (0,24 s) nos 6 canais de pista, a cada 0,04 s. Vale também para a aceleração.
+TEMPO_MINIMO_OBSTACULO = 0.16
+
+# Configurações de Dificuldade (Aceleração Contínua), pela opção do menu
+DIFICULDADES = {
+    1: ConfigDificuldade("Fácil", 2.0, 0.018, TEMPO_MINIMO_OBSTACULO, 15),
+    2: ConfigDificuldade("Médio", 1.5, 0.025, TEMPO_MINIMO_OBSTACULO, 10),
+    3: ConfigDificuldade("Difícil", 1.0, 0.040, TEMPO_MINIMO_OBSTACULO, 5),
+    4: ConfigDificuldade("Impossível", 0.8, 0.055, TEMPO_MINIMO_OBSTACULO, 2),
+}
+
+OBSTACULOS = ("esquerda", "direita", "centro", "cima", "caixa")
+PESO_OBSTACULO = 24
+
+# Ação que desvia de cada obstáculo (o jogo mapeia as teclas para estas ações)
+ACAO_CERTA = {
+    "esquerda": "seta_direita",
+    "direita": "seta_esquerda",
+    "centro": "seta_cima",
+    "cima": "seta_baixo",
+    "caixa": "ctrl_direito",
+}
+ACOES = tuple(ACAO_CERTA.values())
+
+MAX_COLISOES = 3
+# Intervalo mínimo entre duas teclas do jogador simulado (dez teclas por segundo)
+TEMPO_MINIMO_ENTRE_TECLAS = 0.1
+JANELA_REACAO = 0.7
+PONTOS_POR_NIVEL = 10
+
+Obstaculo = namedtuple("Obstaculo", "tipo inicio prazo numero")
+Resultado = namedtuple("Resultado", "desviou ganhou_vida subiu_nivel fim_de_jogo")
+
+
+def config_dificuldade(nivel):
+    """Retorna a configuração da opção do menu (qualquer outra vira Impossível)."""
+    return DIFICULDADES.get(nivel, DIFICULDADES[4])
+
+
+def desvia(tipo, acao, latencia, janela_reacao):
+    """Regra do desvio: a ação certa para o obstáculo, dentro da janela (latência None = sem medida)."""
+    return acao is not None and acao == ACAO_CERTA[tipo] and (latencia is None or latencia <= janela_reacao)
+
+
+class RelogioReal:
+    """Relógio monotônico de parede, usado no jogo interativo."""
+
+    def agora(self):
+        return time.perf_counter()
+
+
+class RelogioVirtual:
+    """Relógio controlado pela simulação; só anda quando avancar() é chamado."""
+
+    def __init__(self, inicio=0.0):
+        self.tempo = inicio
+
+    def agora(self):
+        return self.tempo
+
+    def avancar(self, segundos):
+        self.tempo += segundos
+
+    def avancar_ate(self, instante):
+        if instante > self.tempo:
+            self.tempo = instante
+
+
+class MotorJogo:
+    """Estado e regras de uma partida."""
+
+    def __init__(self, config, relogio=None, rng=None, semente=None,
+                 janela_reacao=JANELA_REACAO, max_colisoes=MAX_COLISOES):
+        self.config = config
+        self.relogio = relogio if relogio is not None else RelogioReal()
+        self.rng = rng if rng is not None else random.Random(semente)
+        self.janela_reacao = janela_reacao
+        self.max_colisoes = max_colisoes
+        self.pesos_acumulados = list(itertools.accumulate([PESO_OBSTACULO] * 4 + [config.caixa_probabilidade]))
+
+        self.pontos = 0
+        self.colisoes = 0
+        self.vidas_extra = 0
+        self.obstaculos = 0
+        self.tempo_entre_obstaculos = config.tempo_base_entre_obstaculos
+        self.ultimo_tempo_evento = self.relogio.agora() # Surgimento do último obstáculo
+
+        # Obstáculos no ar: por número, em ordem de surgimento, e os prazos num heap
+        # (entradas de obstáculos já resolvidos são descartadas ao sair do heap)
+        self.pendentes = {}
+        self.prazos = []
+
+    @property
+    def nivel(self):
+        return (self.pontos // PONTOS_POR_NIVEL) + 1
+
+    @property
+    def vidas_restantes(self):
+        return (self.max_colisoes + self.vidas_extra) - self.colisoes
+
+    @property
+    def fim_de_jogo(self):
+        return self.colisoes >= self.max_colisoes + self.vidas_extra
+
+    def proximo_obstaculo_em(self):
+        """Instante em que o próximo obstáculo deve surgir."""
+        return self.ultimo_tempo_evento + self.tempo_entre_obstaculos
+
+    def tempo_ate_proximo_obstaculo(self):
+        return self.proximo_obstaculo_em() - self.relogio.agora()
+
+    def proximo_prazo(self):
+        """Prazo mais próximo entre os obstáculos no ar (None se não houver nenhum)."""
+        while self.prazos and self.prazos[0][1] not in self.pendentes:
+            heapq.heappop(self.prazos)
+        return self.prazos[0][0] if self.prazos else None
+
+    def tempo_ate_proximo_evento(self):
+        """Segundos até o próximo obstáculo surgir ou o próximo prazo vencer."""
+        prazo = self.proximo_prazo()
+        instante = self.proximo_obstaculo_em() if prazo is None else min(prazo, self.proximo_obstaculo_em())
+        return instante - self.relogio.agora()
+
+    def obstaculo_devido(self):
+        return self.relogio.agora() >= self.proximo_obstaculo_em()
+
+    def gerar_obstaculo(self):
+        """Sorteia o próximo obstáculo, abre sua janela de reação e o coloca entre os pendentes."""
+        tipo = self.rng.choices(OBSTACULOS, cum_weights=self.pesos_acumulados, k=1)[0]
+        inicio = self.relogio.agora()
+        self.obstaculos += 1
+        obstaculo = Obstaculo(tipo, inicio, inicio + self.janela_reacao, self.obstaculos)
+        self.pendentes[obstaculo.numero] = obstaculo
+        heapq.heappush(self.prazos, (obstaculo.prazo, obstaculo.numero))
+        self.ultimo_tempo_evento = inicio
+        return obstaculo
+
+    def vencidos(self, ate):
+        """Retira do heap e retorna, do mais antigo ao mais novo, os pendentes com prazo antes de 'ate'."""
+        lista = []
+        while self.prazos and self.prazos[0][0] < ate:
+            _, numero = heapq.heappop(self.prazos)
+            obstaculo = self.pendentes.get(numero)
+            if obstaculo is not None:
+                lista.append(obstaculo)
+        return lista
+
+    def casar_tecla(self, acao):
+        """
+        Obstáculo que uma tecla de jogo resolve: o pendente mais antigo que ela
+        desvia; se nenhum, o pendente mais antigo (que colide). None se não há pendentes.
+        """
+        for obstaculo in self.pendentes.values():
+            if ACAO_CERTA[obstaculo.tipo] == acao:
+                return obstaculo
+        return next(iter(self.pendentes.values()), None)
+
+    def resolver(self, obstaculo, acao=None, latencia=None):
+        """
+        Aplica a ação de jogo que resolveu o obstáculo (None se nenhuma) e o tira dos pendentes.
+        'latencia' é o tempo do início da pista até a ação; fora da janela conta como colisão.
+        """
+        self.pendentes.pop(obstaculo.numero, None)
+        desviou = desvia(obstaculo.tipo, acao, latencia, self.janela_reacao)
+        ganhou_vida = False
+        subiu_nivel = False
+        if desviou:
+            if obstaculo.tipo == "caixa":
+                self.vidas_extra += 1
+                ganhou_vida = True
+            self.pontos += 1
+            subiu_nivel = self.pontos % PONTOS_POR_NIVEL == 0
+        else:
+            self.colisoes += 1
+
+        config = self.config
+        self.tempo_entre_obstaculos = max(config.min_tempo_obstaculo,
+                                          config.tempo_base_entre_obstaculos - (self.pontos * config.aceleracao_por_ponto))
+        return Resultado(desviou, ganhou_vida, subiu_nivel, self.fim_de_jogo)
+
+    def placar(self):
+        return {"pontos": self.pontos, "colisoes": self.colisoes, "vidas_extra": self.vidas_extra,
+                "nivel": self.nivel, "obstaculos": self.obstaculos}
+
+
+# Modelos de jogador: reagir() retorna (acao, latencia) ou (None, None) se não reagir
+
+class JogadorPerfeito:
+    """Sempre aperta a tecla certa, com uma latência fixa."""
+
+    def __init__(self, latencia=0.25):
+        self.latencia = latencia
+
+    def reagir(self, obstaculo, motor, rng):
+        return ACAO_CERTA[obstaculo.tipo], self.latencia
+
+
+class JogadorAleatorio:
+    """Aperta uma tecla de jogo qualquer, em um instante qualquer da janela."""
+
+    def reagir(self, obstaculo, motor, rng):
+        return rng.choice(ACOES), rng.uniform(0.05, motor.janela_reacao * 1.2)
+
+
+class JogadorHumano:
+    """
+    Tempo de reação log-normal, com erros e omissões que aumentam quando o
+    intervalo entre obstáculos fica menor que 'intervalo_conforto'.
+    """
+
+    def __init__(self, tempo_medio=0.40, desvio=0.12, taxa_erro=0.02, taxa_omissao=0.01,
+                 pressao=0.25, intervalo_conforto=1.0):
+        self.mu = math.log(tempo_medio ** 2 / math.sqrt(desvio ** 2 + tempo_medio ** 2))
+        self.sigma = math.sqrt(math.log(1 + (desvio / tempo_medio) ** 2))
+        self.taxa_erro = taxa_erro
+        self.taxa_omissao = taxa_omissao
+        self.pressao = pressao
+        self.intervalo_conforto = intervalo_conforto
+
+    def reagir(self, obstaculo, motor, rng):
+        aperto = max(0.0, 1.0 - motor.tempo_entre_obstaculos / self.intervalo_conforto)
+        if rng.random() < self.taxa_omissao + self.pressao * aperto * 0.25:
+            return None, None
+        latencia = rng.lognormvariate(self.mu, self.sigma)
+        if rng.random() < self.taxa_erro + self.pressao * aperto:
+            erradas = [a for a in ACOES if a != ACAO_CERTA[obstaculo.tipo]]
+            return rng.choice(erradas), latencia
+        return ACAO_CERTA[obstaculo.tipo], latencia
+
+
+def simular_partida(config, jogador, semente=None, max_obstaculos=100000):
+    """
+    Joga uma partida inteira em tempo virtual e retorna o placar final, com
+    'duracao' em segundos simulados.
+    """
+    relogio = RelogioVirtual()
+    rng = random.Random(semente)
+    motor = MotorJogo(config, relogio=relogio, rng=rng)
+    teclas = [] # Heap de (instante, sequência, ação) das teclas ainda por apertar
+    sequencia = itertools.count()
+    ultima_tecla = -math.inf # O jogador reage a um obstáculo por vez: teclas não se amontoam
+    while not motor.fim_de_jogo:
+        proximo = motor.proximo_obstaculo_em() if motor.obstaculos < max_obstaculos else math.inf
+        if teclas and teclas[0][0] <= proximo:
+            instante, _, acao = heapq.heappop(teclas)
+        elif proximo < math.inf:
+            instante, acao = proximo, None
+        else:
+            instante = motor.proximo_prazo()
+            if instante is None:
+                break
+            instante, acao = instante + 1e-9, None # Só falta vencer os prazos
+        relogio.avancar_ate(instante)
+
+        # Prazos vencidos antes deste instante: colisões
+        for obstaculo in motor.vencidos(instante):
+            motor.resolver(obstaculo)
+        if motor.fim_de_jogo:
+            break
+
+        if acao is not None:
+            obstaculo = motor.casar_tecla(acao)
+            if obstaculo is not None:
+                motor.resolver(obstaculo, acao, instante - obstaculo.inicio)
+        elif motor.obstaculos < max_obstaculos and instante >= motor.proximo_obstaculo_em():
+            obstaculo = motor.gerar_obstaculo()
+            acao, latencia = jogador.reagir(obstaculo, motor, rng)
+            if acao is not None:
+                ultima_tecla = max(obstaculo.inicio + latencia, ultima_tecla + TEMPO_MINIMO_ENTRE_TECLAS)
+                heapq.heappush(teclas, (ultima_tecla, next(sequencia), acao))
+    placar = motor.placar()
+    placar["duracao"] = relogio.agora()
+    return placar
+
+
+def linha_do_tempo(config, semente, quantidade, janela_reacao=JANELA_REACAO):
+    """
+    Obstáculos de uma corrida compartilhada (servidor_corrida.py), com os
+    instantes contados do início dela. O ritmo acelera como se cada
+    obstáculo fosse desviado, então todos os jogadores com a mesma semente
+    enfrentam a mesma sequência nos mesmos instantes, errando ou não.
+    """
+    relogio = RelogioVirtual()
+    motor = MotorJogo(config, relogio=relogio, semente=semente, janela_reacao=janela_reacao)
+    obstaculos = []
+    for _ in range(quantidade):
+        relogio.avancar_ate(motor.proximo_obstaculo_em())
+        obstaculo = motor.gerar_obstaculo()
+        motor.resolver(obstaculo, ACAO_CERTA[obstaculo.tipo])
+        obstaculos.append(obstaculo)
+    return obstaculos
+
+
+def simular_lote(config, jogador, partidas, semente=0, max_obstaculos=100000):
+    """Simula 'partidas' partidas com sementes consecutivas a partir de 'semente'."""
+    return [simular_partida(config, jogador, semente + i, max_obstaculos) for i in range(partidas)]
+
+
+if __name__ == "__main__":
+    # Uso: python simulacao.py [partidas] [dificuldade 1-4]
+    partidas = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    nivel = int(sys.argv[2]) if len(sys.argv) > 2 else 1
+    config = config_dificuldade(nivel)
+
+    inicio = time.perf_counter()
+    resultados = simular_lote(config, JogadorHumano(), partidas)
+    decorrido = time.perf_counter() - inicio
+
+    pontos = sorted(r["pontos"] for r in resultados)
+    duracao = sum(r["duracao"] for r in resultados) / len(resultados)
+    print(f"Dificuldade {config.texto}: {partidas} partidas em {decorrido:.2f} s ({partidas / decorrido:.0f} partidas/s)")
+    print(f"Pontos: mediana {pontos[len(pontos) // 2]}, máximo {pontos[-1]}; duração média {duracao:.1f} s simulados")
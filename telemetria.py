@@ -0,0 +1,84 @@
+# -*- coding: utf-8 -*-
+"""
+Telemetria de latência de reação por obstáculo.
+
+Os tempos vêm de time.perf_counter (monotônico). O pygame 2.6 não preenche
+o timestamp dos eventos SDL, então a tecla é datada quando sai da fila: o
+jogo a coleta logo ao acordar de pygame.event.wait, e com o loop dormindo
+esse instante é o da chegada da tecla. Com o loop ocupado (som, fala), o
+tempo de reação medido inclui a espera na fila.
+"""
+
+DIRECOES = ("esquerda", "direita", "centro", "cima", "caixa")
+DIFICULDADES = ("Fácil", "Médio", "Difícil", "Impossível")
+
+PERCENTIS = (50, 95, 99)
+
+
+class RegistroLatencias:
+    """
+    Buffer circular pré-alocado com a latência de cada obstáculo.
+    Quando enche, os registros mais antigos são sobrescritos.
+    """
+
+    def __init__(self, capacidade=4096):
+        import numpy as np # Só quando o jogo cria o registro: importar o módulo fica barato
+        self.capacidade = capacidade
+        self.latencias = np.full(capacidade, np.nan, dtype=np.float64) # NaN = sem tecla
+        self.atrasos_loop = np.zeros(capacidade, dtype=np.float64)
+        self.direcoes = np.zeros(capacidade, dtype=np.int8)
+        self.dificuldades = np.zeros(capacidade, dtype=np.int8)
+        self.desvios = np.zeros(capacidade, dtype=np.bool_)
+        self.total = 0
+
+    def registrar(self, direcao, dificuldade, latencia, desviou, atraso_loop=0.0):
+        """
+        Guarda um obstáculo. 'latencia' é o tempo do início da pista até a tecla
+        (None se nenhuma tecla de jogo foi pressionada) e 'atraso_loop' é quanto o
+        obstáculo saiu depois do horário previsto.
+        """
+        i = self.total % self.capacidade
+        self.latencias[i] = float("nan") if latencia is None else latencia
+        self.atrasos_loop[i] = atraso_loop
+        self.direcoes[i] = DIRECOES.index(direcao)
+        self.dificuldades[i] = DIFICULDADES.index(dificuldade)
+        self.desvios[i] = desviou
+        self.total += 1
+
+    def _validos(self):
+        return slice(0, min(self.total, self.capacidade))
+
+    def percentis(self):
+        """
+        Retorna {(direcao, dificuldade): {"n", "sem_tecla", "p50", "p95", "p99", "atraso_loop_p95"}}
+        com as latências em milissegundos.
+        """
+        import numpy as np
+        validos = self._validos()
+        latencias = self.latencias[validos]
+        atrasos = self.atrasos_loop[validos]
+        direcoes = self.direcoes[validos]
+        dificuldades = self.dificuldades[validos]
+
+        resumo = {}
+        for codigo_dif in np.unique(dificuldades):
+            for codigo_dir in np.unique(direcoes):
+                mascara = (dificuldades == codigo_dif) & (direcoes == codigo_dir)
+                if not mascara.any():
+                    continue
+                grupo = latencias[mascara]
+                com_tecla = grupo[~np.isnan(grupo)] * 1000
+                item = {"n": int(mascara.sum()), "sem_tecla": int(np.isnan(grupo).sum())}
+                for p in PERCENTIS:
+                    item[f"p{p}"] = float(np.percentile(com_tecla, p)) if com_tecla.size else None
+                item["atraso_loop_p95"] = float(np.percentile(atrasos[mascara], 95) * 1000)
+                resumo[(DIRECOES[codigo_dir], DIFICULDADES[codigo_dif])] = item
+        return resumo
+
+    def formatar(self):
+        """Texto em tabela com os percentis, para imprimir no fim do jogo."""
+        linhas = [f"{'direção':10s} {'dificuldade':11s} {'n':>5s} {'p50':>7s} {'p95':>7s} {'p99':>7s} {'loop p95':>9s}"]
+        for (direcao, dificuldade), item in sorted(self.percentis().items()):
+            valores = " ".join(f"{item[f'p{p}']:7.1f}" if item[f"p{p}"] is not None else f"{'-':>7s}" for p in PERCENTIS)
+            linhas.append(f"{direcao:10s} {dificuldade:11s} {item['n']:5d} {valores} {item['atraso_loop_p95']:9.1f}")
+        return "\n".join(linhas)
@@ -0,0 +1,404 @@
+# -*- coding: utf-8 -*-
+"""
+Transmissão ao vivo dos eventos do jogo, ligada por CORRIDA_CEGA_TRANSMISSAO ou --transmitir.
+
+Os eventos da partida (obstáculo com a direção, tecla, desvio, colisão,
+nível, vida extra, placar, fim) saem como JSON, um por linha, para quem se
+conectar ao endereço (TCP, padrão 127.0.0.1:47800, ou unix:/caminho): um
+narrador, uma linha braille, um painel de estatísticas.
+
+publicar() só põe o evento numa fila e acorda a thread da transmissão, que
+serializa cada evento uma vez e o distribui. Cada assinante tem a sua fila
+limitada (TAMANHO_FILA); se ele não der conta, o evento mais antigo da
+fila é descartado e, antes do próximo entregue, ele recebe
+{"tipo": "perdidos", "quantidade": n}. Eventos de estado (COALESCIVEIS,
+como o placar) não se acumulam: o que ainda estava na fila sai e o novo
+entra no fim. O atraso de cada assinante (eventos publicados depois do
+último aceito pelo socket e idade do mais antigo ainda não aceito, contando
+os descartados) fica nos contadores. Nada disso espera pela rede: os sockets são não
+bloqueantes e a thread do jogo nunca toca neles.
+
+Desligada, criar_transmissao() retorna uma TransmissaoDesligada, cujo
+publicar() não faz nada.
+
+Uso: python transmissao.py [endereco]           (assina e imprime os eventos)
+     python transmissao.py --carga [eventos]    (mede publicar() com assinantes rápido, lento e parado)
+"""
+import itertools
+import json
+import os
+import selectors
+import socket
+import stat
+import sys
+import threading
+import time
+from collections import deque
+
+ENDERECO_PADRAO = "127.0.0.1:47800"
+
+TAMANHO_FILA = 256 # Eventos por assinante
+TAMANHO_ENTRADA = 4096 # Eventos publicados e ainda não distribuídos
+MAX_ASSINANTES = 16
+LOTE_ENVIO = 64 # Eventos juntados num send()
+BUFFER_SOCKET = 64 * 1024 # Buffer de envio do kernel por assinante; o atraso além disso aparece na fila
+
+# Eventos de estado: o mais novo substitui o que ainda estiver na fila do assinante
+COALESCIVEIS = ("placar",)
+
+
+def transmissao_pedida():
+    return os.environ.get("CORRIDA_CEGA_TRANSMISSAO") or ("--transmitir" in sys.argv and ENDERECO_PADRAO)
+
+
+def criar_transmissao(endereco=None):
+    """Transmissão no endereço pedido (variável de ambiente ou --transmitir); senão, a desligada."""
+    endereco = endereco or transmissao_pedida()
+    if not endereco:
+        return TransmissaoDesligada()
+    try:
+        return TransmissaoEventos(endereco)
+    except OSError as e:
+        # print(f"AVISO: Não foi possível abrir a transmissão em {endereco}: {e}")
+        return TransmissaoDesligada()
+
+
+def abrir_socket(endereco, servidor):
+    """Socket de 'unix:/caminho' ou 'host:porta' (servidor=True escuta nele; senão conecta)."""
+    if endereco.startswith("unix:"):
+        caminho = endereco[len("unix:"):]
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        if servidor:
+            if os.path.exists(caminho):
+                if not stat.S_ISSOCK(os.stat(caminho).st_mode):
+                    raise FileExistsError(f"{caminho} já existe e não é um socket")
+                os.unlink(caminho) # Socket que sobrou de uma execução anterior
+            sock.bind(caminho)
+        else:
+            sock.connect(caminho)
+        return sock
+    host, porta = endereco.removeprefix("tcp:").rsplit(":", 1)
+    if servidor:
+        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        sock.bind((host, int(porta)))
+        return sock
+    return socket.create_connection((host, int(porta)))
+
+
+class TransmissaoDesligada:
+    """Não transmite nada: o custo no loop é só a chamada de um método vazio."""
+
+    ativa = False
+
+    def publicar(self, tipo, **campos):
+        pass
+
+    def contadores(self):
+        return {}
+
+    def encerrar(self):
+        pass
+
+
+class Assinante:
+    __slots__ = ("sock", "nome", "fila", "por_chave", "parcial", "seq_parcial", "eventos_parcial", "instante_parcial",
+                 "entregue", "entregues", "perdidos", "perdidos_avisar", "coalescidos", "atraso_max")
+
+    def __init__(self, sock, nome, distribuido):
+        self.sock = sock
+        self.nome = nome
+        self.fila = deque() # Itens [seq, instante, dados, chave], em ordem de seq
+        self.por_chave = {}
+        self.parcial = b"" # Lote montado que o socket ainda não aceitou inteiro
+        self.seq_parcial = 0
+        self.eventos_parcial = 0
+        self.instante_parcial = None # Distribuição do evento mais antigo do lote
+        self.entregue = distribuido # Sequência do último evento aceito inteiro pelo socket
+        self.entregues = 0
+        self.perdidos = 0
+        self.perdidos_avisar = 0
+        self.coalescidos = 0
+        self.atraso_max = 0.0
+
+    def enfileirar(self, item, tamanho):
+        chave = item[3]
+        if chave is not None:
+            antigo = self.por_chave.get(chave)
+            if antigo is not None:
+                # O estado velho sai e o novo vai para o fim: chega depois dos eventos que o produziram
+                self.fila.remove(antigo)
+                self.coalescidos += 1
+            self.por_chave[chave] = item
+        if len(self.fila) >= tamanho:
+            descartado = self.fila.popleft()
+            if descartado[3] is not None:
+                del self.por_chave[descartado[3]]
+            self.perdidos += 1
+            self.perdidos_avisar += 1
+            # Um evento descartado conta no atraso com a idade que tinha ao ser perdido
+            self.atraso_max = max(self.atraso_max, item[1] - descartado[1])
+        self.fila.append(item)
+
+    def atraso(self, agora):
+        """Segundos desde a distribuição do evento mais antigo que o socket ainda não aceitou."""
+        if self.instante_parcial is not None:
+            return agora - self.instante_parcial
+        return agora - self.fila[0][1] if self.fila else 0.0
+
+
+class TransmissaoEventos:
+    """Servidor de eventos numa thread própria, com uma fila limitada por assinante."""
+
+    ativa = True
+
+    def __init__(self, endereco=ENDERECO_PADRAO, tamanho_fila=TAMANHO_FILA, max_assinantes=MAX_ASSINANTES):
+        self.endereco = endereco
+        self.tamanho_fila = tamanho_fila
+        self.max_assinantes = max_assinantes
+        self.origem = time.perf_counter()
+        self.servidor = abrir_socket(endereco, servidor=True)
+        self.servidor.listen(max_assinantes)
+        self.servidor.setblocking(False)
+        self.despertar_leitura, self.despertar_escrita = socket.socketpair()
+        self.despertar_leitura.setblocking(False)
+        self.despertar_escrita.setblocking(False)
+        self.sinalizada = False
+        self.entrada = deque(maxlen=TAMANHO_ENTRADA)
+        self.sequencia = itertools.count(1)
+        self.publicados = 0
+        self.distribuido = 0
+        self.perdidos_entrada = 0
+        self.assinantes = {}
+        self.conectados = 0
+        self.rodando = True
+        self.thread = threading.Thread(target=self._executar, name="transmissao", daemon=True)
+        self.thread.start()
+
+    def publicar(self, tipo, **campos):
+        """Enfileira o evento e retorna na hora; nunca espera a rede nem os assinantes."""
+        campos["tipo"] = tipo
+        campos["t"] = round(time.perf_counter() - self.origem, 4)
+        self.entrada.append((next(self.sequencia), campos)) # deque com maxlen: cheia, descarta a mais antiga
+        self.publicados += 1
+        if not self.sinalizada:
+            self.sinalizada = True
+            try:
+                self.despertar_escrita.send(b"\0")
+            except OSError:
+                pass # Buffer do par de sockets cheio: a thread já tem o que acordar
+
+    def _executar(self):
+        seletor = selectors.DefaultSelector()
+        seletor.register(self.servidor, selectors.EVENT_READ, None)
+        seletor.register(self.despertar_leitura, selectors.EVENT_READ, None)
+        while self.rodando:
+            for chave, mascara in seletor.select(timeout=1.0):
+                if chave.fileobj is self.servidor:
+                    self._aceitar(seletor)
+                elif chave.fileobj is self.despertar_leitura:
+                    self.sinalizada = False
+                    try:
+                        while self.despertar_leitura.recv(4096):
+                            pass
+                    except OSError:
+                        pass
+                else:
+                    assinante = chave.data
+                    if mascara & selectors.EVENT_READ and not self._ler(assinante):
+                        self._remover(seletor, assinante)
+                        continue
+                    if mascara & selectors.EVENT_WRITE:
+                        self._escrever(seletor, assinante)
+            self._distribuir()
+            for assinante in list(self.assinantes.values()):
+                if assinante.fila or assinante.parcial:
+                    self._escrever(seletor, assinante)
+        for assinante in list(self.assinantes.values()):
+            self._remover(seletor, assinante)
+        seletor.close()
+
+    def _aceitar(self, seletor):
+        try:
+            sock, endereco = self.servidor.accept()
+        except OSError:
+            return
+        if len(self.assinantes) >= self.max_assinantes:
+            sock.close()
+            return
+        sock.setblocking(False)
+        try:
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, BUFFER_SOCKET)
+        except OSError:
+            pass
+        self.conectados += 1
+        assinante = Assinante(sock, f"assinante {self.conectados}", self.distribuido)
+        self.assinantes[sock.fileno()] = assinante
+        seletor.register(sock, selectors.EVENT_READ, assinante)
+
+    def _ler(self, assinante):
+        """Assinantes não mandam nada; só se lê para descobrir que desconectaram. False se desconectou."""
+        try:
+            return bool(assinante.sock.recv(4096))
+        except BlockingIOError:
+            return True
+        except OSError:
+            return False
+
+    def _remover(self, seletor, assinante):
+        self.assinantes.pop(assinante.sock.fileno(), None)
+        try:
+            seletor.unregister(assinante.sock)
+        except (KeyError, ValueError):
+            pass
+        assinante.sock.close()
+
+    def _distribuir(self):
+        """Serializa cada evento publicado uma vez e o põe na fila de cada assinante."""
+        agora = time.perf_counter()
+        while self.entrada:
+            seq, campos = self.entrada.popleft()
+            if seq != self.distribuido + 1:
+                self.perdidos_entrada += seq - self.distribuido - 1
+            self.distribuido = seq
+            if not self.assinantes:
+                continue
+            dados = json.dumps(campos, separators=(",", ":"), ensure_ascii=False).encode("utf-8") + b"\n"
+            chave = campos["tipo"] if campos["tipo"] in COALESCIVEIS else None
+            for assinante in self.assinantes.values():
+                assinante.enfileirar([seq, agora, dados, chave], self.tamanho_fila)
+
+    def _escrever(self, seletor, assinante):
+        """Manda o que couber no socket; o resto espera o socket aceitar mais (EVENT_WRITE)."""
+        try:
+            while True:
+                if not assinante.parcial:
+                    if not assinante.fila:
+                        break
+                    partes = []
+                    if assinante.perdidos_avisar:
+                        partes.append(json.dumps({"tipo": "perdidos", "quantidade": assinante.perdidos_avisar}).encode() + b"\n")
+                        assinante.perdidos_avisar = 0
+                    assinante.instante_parcial = assinante.fila[0][1]
+                    assinante.eventos_parcial = min(LOTE_ENVIO, len(assinante.fila))
+                    for _ in range(assinante.eventos_parcial):
+                        seq, instante, dados, chave = item = assinante.fila.popleft()
+                        if chave is not None and assinante.por_chave.get(chave) is item:
+                            del assinante.por_chave[chave]
+                        partes.append(dados)
+                        assinante.seq_parcial = seq
+                    assinante.parcial = b"".join(partes)
+                enviados = assinante.sock.send(assinante.parcial)
+                assinante.parcial = assinante.parcial[enviados:]
+                if assinante.parcial:
+                    break
+                # Lote aceito inteiro pelo socket: só agora conta como entregue
+                assinante.atraso_max = max(assinante.atraso_max, assinante.atraso(time.perf_counter()))
+                assinante.entregue = assinante.seq_parcial
+                assinante.entregues += assinante.eventos_parcial
+                assinante.instante_parcial = None
+        except BlockingIOError:
+            pass
+        except OSError:
+            self._remover(seletor, assinante)
+            return
+        mascara = selectors.EVENT_READ | (selectors.EVENT_WRITE if assinante.parcial or assinante.fila else 0)
+        try:
+            seletor.modify(assinante.sock, mascara, assinante)
+        except (KeyError, ValueError):
+            pass
+
+    def contadores(self):
+        """Eventos publicados e, por assinante, entregues, perdidos, coalescidos e o atraso (eventos e ms)."""
+        agora = time.perf_counter()
+        assinantes = {}
+        for assinante in list(self.assinantes.values()):
+            atraso = assinante.atraso(agora)
+            assinantes[assinante.nome] = {
+                "entregues": assinante.entregues, "perdidos": assinante.perdidos, "coalescidos": assinante.coalescidos,
+                "atraso_eventos": self.distribuido - assinante.entregue,
+                "atraso_ms": atraso * 1000,
+                "atraso_max_ms": max(assinante.atraso_max, atraso) * 1000}
+        return {"publicados": self.publicados, "perdidos_entrada": self.perdidos_entrada, "assinantes": assinantes}
+
+    def encerrar(self, timeout=1.0):
+        self.rodando = False
+        try:
+            self.despertar_escrita.send(b"\0")
+        except OSError:
+            pass
+        self.thread.join(timeout)
+        self.servidor.close()
+        self.despertar_leitura.close()
+        self.despertar_escrita.close()
+        if self.endereco.startswith("unix:"):
+            try:
+                os.unlink(self.endereco[len("unix:"):])
+            except OSError:
+                pass
+
+
+if __name__ == "__main__":
+    if "--carga" not in sys.argv:
+        # Assina a transmissão de um jogo rodando e imprime os eventos
+        endereco = sys.argv[1] if len(sys.argv) > 1 else ENDERECO_PADRAO
+        try:
+            with abrir_socket(endereco, servidor=False).makefile("r", encoding="utf-8") as eventos:
+                for linha in eventos:
+                    print(linha, end="", flush=True)
+        except (OSError, KeyboardInterrupt) as e:
+            print(f"Transmissão encerrada: {e}")
+        sys.exit(0)
+
+    # Carga: rajadas de eventos como as do jogo, com um assinante rápido, um lento e um parado
+    indice = sys.argv.index("--carga")
+    total = int(sys.argv[indice + 1]) if len(sys.argv) > indice + 1 else 20000
+    transmissao = TransmissaoEventos("127.0.0.1:0")
+
+    def ler(nome, pausa, recebidos):
+        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 16 * 1024) # Para a fila do servidor encher logo
+        sock.connect(transmissao.servidor.getsockname())
+        if pausa is None:
+            recebidos[nome] = sock # Parado: conecta e nunca lê
+            return
+        with sock.makefile("r", encoding="utf-8") as eventos:
+            for linha in eventos:
+                evento = json.loads(linha)
+                recebidos[nome] = recebidos.get(nome, 0) + (evento["quantidade"] if evento["tipo"] == "perdidos" else 0)
+                recebidos[nome + "_eventos"] = recebidos.get(nome + "_eventos", 0) + 1
+                if pausa:
+                    time.sleep(pausa)
+
+    recebidos = {}
+    leitores = [threading.Thread(target=ler, args=(nome, pausa, recebidos), daemon=True)
+                for nome, pausa in (("rapido", 0.0), ("lento", 0.002), ("parado", None))]
+    for leitor in leitores:
+        leitor.start() # Conectam em ordem: assinante 1 é o rápido, 2 o lento, 3 o parado
+        while len(transmissao.assinantes) < leitores.index(leitor) + 1:
+            time.sleep(0.01)
+
+    tempos = []
+    for i in range(total):
+        antes = time.perf_counter()
+        if i % 4 == 3:
+            transmissao.publicar("placar", pontos=i, vidas=3, nivel=i // 10 + 1)
+        else:
+            transmissao.publicar("obstaculo", numero=i, direcao="esquerda", prazo=0.7)
+        tempos.append(time.perf_counter() - antes)
+        if i % 50 == 49:
+            time.sleep(0.001) # Um quadro do loop a cada 50 eventos: bem mais que uma partida real
+    time.sleep(0.5)
+    c = transmissao.contadores()
+    transmissao.encerrar()
+
+    tempos.sort()
+    print(f"publicar: p50 {tempos[len(tempos) // 2] * 1e6:.1f} us, p99 {tempos[int(len(tempos) * 0.99)] * 1e6:.1f} us, "
+          f"máx {tempos[-1] * 1e6:.0f} us ({total} eventos)")
+    for nome, a in c["assinantes"].items():
+        print(f"{nome}: {a['entregues']} entregues, {a['perdidos']} perdidos, {a['coalescidos']} coalescidos, "
+              f"atraso {a['atraso_eventos']} eventos / {a['atraso_ms']:.1f} ms (máx {a['atraso_max_ms']:.1f} ms)")
+    print(f"perdidos antes da distribuição: {c['perdidos_entrada']}; avisos de perda recebidos: "
+          f"rápido {recebidos.get('rapido', 0)}, lento {recebidos.get('lento', 0)}")
+    # O leitor rápido não pode perder nada, e publicar() não pode travar o loop
+    sys.exit(1 if c["perdidos_entrada"] or recebidos.get("rapido", 0) or tempos[-1] > 0.02 else 0)